@@ -1,15 +1,18 @@
 import os
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-import cv2
-import numpy as np
 
 from segmentation import start_segmentation
-from ocr_processor import run_ocr_on_table
+from grid_template import load_template, propose_from_template, save_template
+from preprocessing import chain_for
+from ocr_processor import run_ocr_on_table, OCR_BACKEND
+from ocr_backends import BACKENDS
+from page_ocr import run_page_ocr_on_table
 
 # === SETTINGS ===
 INPUT_ROOT = "input_tables"
 OUTPUT_ROOT = "output"
+OCR_MODE = "cell"  # "cell" = one request per cell, "page" = one request per page (see page_ocr.py)
 
 calendar_order = [
     "january", "february", "march", "april", "may", "june",
@@ -44,33 +47,6 @@ def get_csv_output_folder(month: str, data_type: str):
     os.makedirs(base, exist_ok=True)
     return base
 
-def sharpen_image(img):
-
-    """
-    Applies a sharpening kernel to the given image and returns the sharpened image.
-    """
-
-    kernel = np.array([[0, -1, 0],
-                       [-1, 5, -1],
-                       [0, -1, 0]])
-    return cv2.filter2D(img, -1, kernel)
-
-def sharpen_segmented_images(folder_path):
-
-    """
-    Iterates through all image files in the specified folder and applies sharpening to each.
-    Used after segmentation to improve OCR performance.
-    """
-
-    for root, _, files in os.walk(folder_path):
-        for file in files:
-            if file.lower().endswith(('.png', '.jpg', '.jpeg')):
-                img_path = os.path.join(root, file)
-                img = cv2.imread(img_path)
-                if img is not None:
-                    sharpened = sharpen_image(img)
-                    cv2.imwrite(img_path, sharpened)
-
 
 #----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------                    
 #----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------                    
@@ -91,12 +67,13 @@ class OCRAppGUI:
 
         self.root = root
         root.title("OCR Table Pipeline")
-        root.geometry("500x400")
+        root.geometry("500x450")
 
         self.month = tk.StringVar()
         self.data_type = tk.StringVar()
         self.table_file = tk.StringVar()
         self.table_number = tk.StringVar(value="1")
+        self.backend = tk.StringVar(value=OCR_BACKEND)
 
         self.build_gui()
 
@@ -127,6 +104,11 @@ class OCRAppGUI:
         self.num_entry = tk.Entry(self.root, textvariable=self.table_number)
         self.num_entry.pack()
 
+        #OCR backend (defaults to the OCR_BACKEND environment variable)
+        tk.Label(self.root, text="OCR Backend:").pack(pady=5)
+        self.backend_menu = ttk.Combobox(self.root, textvariable=self.backend, values=list(BACKENDS), state="readonly")
+        self.backend_menu.pack()
+
         #launch segmentation
         tk.Button(self.root, text="Start Segmentation", command=self.run_segmentation).pack(pady=8)
         tk.Button(self.root, text="Run OCR", command=self.run_ocr).pack(pady=4)
@@ -159,7 +141,11 @@ class OCRAppGUI:
         """
         Starts the segmentation process on the selected table image.
         If output already exists, prompts user before overwriting.
-        Sharpens all output images post-segmentation.
+        The ledger's preprocessing chain runs once over the whole page before cropping.
+        If the ledger (month + type) has a grid template that registers confidently
+        onto the page, the grid starts from it; otherwise it starts from the lines
+        detected on the deskewed page, and without a template the user is offered
+        to save the new grid as the template.
         """
 
         if not self.table_file.get():
@@ -176,9 +162,18 @@ class OCRAppGUI:
             if not overwrite:
                 return
 
-        start_segmentation(self.table_file.get(), out_dir)
-        sharpen_segmented_images(out_dir)
-        messagebox.showinfo("Segmentation Complete", f"Segmentation and sharpening saved to:\n{out_dir}")
+        template = f"{self.month.get()}_{self.data_type.get()}"
+        has_template = load_template(template) is not None
+        proposal = propose_from_template(template, self.table_file.get()) if has_template else None
+
+        if not start_segmentation(self.table_file.get(), out_dir, proposal=proposal,
+                                  chain=chain_for(self.month.get(), self.data_type.get())):
+            return
+        if not has_template and self.month.get() and self.data_type.get() and messagebox.askyesno(
+                "Save Grid Template?",
+                f"Use this grid as the starting point for the other {self.month.get()} {self.data_type.get()} pages?"):
+            save_template(out_dir, template)
+        messagebox.showinfo("Segmentation Complete", f"Segmentation and preprocessing saved to:\n{out_dir}")
 
     def run_ocr(self):
 
@@ -194,11 +189,13 @@ class OCRAppGUI:
         segment_path = get_output_folder(self.month.get(), self.data_type.get(), self.table_number.get())
         csv_out = get_csv_output_folder(self.month.get(), self.data_type.get())
         messagebox.showinfo("Running OCR", f"Hang Tight! This might take a couple minutes!")
-        run_ocr_on_table(
+        run = run_page_ocr_on_table if OCR_MODE == "page" else run_ocr_on_table
+        run(
             segment_path, csv_out,
             self.month.get() or "miscellaneous",
             self.data_type.get() or "miscellaneous",
-            self.table_number.get()
+            self.table_number.get(),
+            backend=self.backend.get()
         )
 
     def launch_checker(self):
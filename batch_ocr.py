@@ -0,0 +1,178 @@
+import argparse
+import os
+import re
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from app import INPUT_ROOT, calendar_order, get_output_folder, get_csv_output_folder
+from segmentation import load_grid
+from grid_check import BLOCKS_OCR, load_report
+import ocr_processor
+from ocr_processor import OCR_BACKEND, configure_engine
+from cell_encoding import ENCODINGS
+from cell_pipeline import run_streaming_ocr
+from page_ocr import run_page_ocr_on_table
+
+# === SETTINGS ===
+DATA_TYPES = ["max", "min", "precipitation"]
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg")
+PAGE_NAME = re.compile(r"_(\d{4})_(\d{4})\.\w+$")  # daily_prec_1893_1912.PNG -> 1893, 1912
+
+
+def start_year(filename):
+
+    """
+    Sort key for page images: the first year in the filename, then the name.
+    """
+
+    match = PAGE_NAME.search(filename)
+    return (int(match.group(1)) if match else float("inf"), filename)
+
+
+def find_pages(input_root=INPUT_ROOT, months=None, data_types=None):
+
+    """
+    Finds every page image under input_root/<month>/<type>/ and infers its table
+    number from the year range in its filename: within a folder, pages are numbered
+    1, 2, 3... in order of their first year (1893_1912 -> 1, 1913_1932 -> 2, ...).
+    Returns a list of dicts with image_path, month, data_type and table_number.
+    """
+
+    pages = []
+    for month in calendar_order:
+        if months and month not in months:
+            continue
+        for data_type in DATA_TYPES:
+            if data_types and data_type not in data_types:
+                continue
+            folder = os.path.join(input_root, month, data_type)
+            if not os.path.isdir(folder):
+                continue
+            files = [f for f in os.listdir(folder) if f.lower().endswith(IMAGE_EXTENSIONS)]
+            for number, filename in enumerate(sorted(files, key=start_year), start=1):
+                pages.append({
+                    "image_path": os.path.join(folder, filename),
+                    "month": month,
+                    "data_type": data_type,
+                    "table_number": str(number),
+                })
+    return pages
+
+
+def init_worker(backend, quota_share, encoding=None):
+
+    """
+    Gives each worker process its share of the backend's rate limit and the cell
+    encoding to upload with.
+    """
+
+    configure_engine(backend, quota_share=quota_share)
+    if encoding:
+        ocr_processor.OCR_ENCODING = encoding
+
+
+def process_page(page, backend=None, mode="cell", write_cells=True, check=None):
+
+    """
+    Runs crop -> preprocess -> OCR -> CSV for one page from its saved grid, in memory.
+    Cell images are only written to disk (for the checker) if write_cells is set.
+    With check (default grid_check.BLOCKS_OCR), pages whose grid check found lines
+    cutting through handwriting are not sent to OCR; without it they are only
+    reported. Returns a result dict with status "done", "no grid", "bad grid" or
+    "failed".
+    """
+
+    start = time.perf_counter()
+    result = dict(page, status="done", cells=0, seconds=0.0, error=None)
+    try:
+        table_path = get_output_folder(page["month"], page["data_type"], page["table_number"])
+        grid = load_grid(table_path)
+        if grid is None:
+            result["status"] = "no grid"
+            return result
+        report = load_report(table_path)
+        if report and not report["ok"]:
+            if BLOCKS_OCR if check is None else check:
+                result["status"] = "bad grid"
+                return result
+            print(f"⚠️ {table_path}: grid check failed, OCRing anyway")
+
+        csv_out = get_csv_output_folder(page["month"], page["data_type"])
+        if mode == "page":
+            run_page_ocr_on_table(table_path, csv_out, page["month"], page["data_type"],
+                                  page["table_number"], backend=backend)
+        elif run_streaming_ocr(table_path, csv_out, page["month"], page["data_type"], page["table_number"],
+                               backend=backend, write_cells=write_cells) is None:
+            raise FileNotFoundError(f"Could not crop from grid: {grid['image_path']}")
+        result["cells"] = (len(grid["row_lines"]) - 1) * (len(grid["col_lines"]) - 1)
+    except Exception as e:
+        result["status"] = "failed"
+        result["error"] = f"{e.__class__.__name__}: {e}"
+        traceback.print_exc()
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def run_batch(pages, backend=None, mode="cell", workers=4, write_cells=True, encoding=None, check=None):
+
+    """
+    Processes pages in a process pool and prints a throughput/failure summary.
+    Returns the per-page results.
+    """
+
+    backend = backend or OCR_BACKEND
+    start = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                             initargs=(backend, 1.0 / workers, encoding)) as pool:
+        futures = [pool.submit(process_page, page, backend, mode, write_cells, check) for page in pages]
+        for future in as_completed(futures):
+            r = future.result()
+            results.append(r)
+            icon = {"done": "✅", "no grid": "⏭️", "bad grid": "✂️", "failed": "❌"}[r["status"]]
+            print(f"{icon} [{len(results)}/{len(pages)}] {r['month']}/{r['data_type']}/table_{r['table_number']}"
+                  f" ({r['status']}, {r['seconds']:.1f}s)")
+
+    elapsed = time.perf_counter() - start
+    done = [r for r in results if r["status"] == "done"]
+    failed = [r for r in results if r["status"] == "failed"]
+    cells = sum(r["cells"] for r in done)
+
+    print("\n=== Batch summary ===")
+    print(f"Pages found:      {len(pages)}")
+    print(f"Processed:        {len(done)}")
+    print(f"Skipped (no grid): {sum(r['status'] == 'no grid' for r in results)}")
+    print(f"Skipped (bad grid): {sum(r['status'] == 'bad grid' for r in results)}")
+    print(f"Failed:           {len(failed)}")
+    print(f"Elapsed:          {elapsed:.1f}s")
+    if elapsed > 0 and done:
+        print(f"Throughput:       {len(done) / elapsed * 60:.1f} pages/min, {cells / elapsed:.1f} cells/s")
+    for r in failed:
+        print(f"   ❌ {r['image_path']}: {r['error']}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the OCR pipeline headlessly over the whole input_tables archive.")
+    parser.add_argument("--month", action="append", help="only this month (repeatable)")
+    parser.add_argument("--type", action="append", choices=DATA_TYPES, help="only this data type (repeatable)")
+    parser.add_argument("--backend", default=OCR_BACKEND)
+    parser.add_argument("--mode", choices=["cell", "page"], default="cell")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--encoding", choices=list(ENCODINGS), help="cell encoding for upload (default OCR_ENCODING)")
+    parser.add_argument("--no-cells", action="store_true", help="don't write cell images (faster, but the checker can't show them)")
+    parser.add_argument("--require-grid-check", dest="check", action="store_true", default=None,
+                        help="skip pages whose grid check failed (default: grid_check.BLOCKS_OCR)")
+    parser.add_argument("--ignore-grid-check", dest="check", action="store_false",
+                        help="OCR pages even if their grid check failed")
+    parser.add_argument("--list", action="store_true", help="only list the pages that were found")
+    args = parser.parse_args()
+
+    pages = find_pages(months=args.month, data_types=args.type)
+    if args.list:
+        for p in pages:
+            print(f"{p['month']}/{p['data_type']}/table_{p['table_number']}: {p['image_path']}")
+    else:
+        run_batch(pages, backend=args.backend, mode=args.mode, workers=args.workers,
+                  write_cells=not args.no_cells, encoding=args.encoding, check=args.check)
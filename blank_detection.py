@@ -0,0 +1,154 @@
+import json
+import os
+import cv2
+import numpy as np
+
+# === SETTINGS ===
+INK_RATIO = 0.6         # a pixel is ink if darker than this fraction of the paper brightness
+LINE_FRACTION = 0.5     # pixel rows/cols that are more than this much ink are ruling lines
+BORDER_MARGIN = 0.08    # fraction of the cell on each side ignored (grid lines, neighbour bleed)
+BLANK_DENSITY = 0.004   # cells with less ink than this fraction of their interior are blank
+
+# Table layout: column 1 is the year, columns 2-32 are days 1-31, column 33 is the monthly average
+FIRST_DAY_COL = 2
+DAYS_IN_MONTH = {
+    "january": 31, "february": 29, "march": 31, "april": 30, "may": 31, "june": 30,
+    "july": 31, "august": 31, "september": 30, "october": 31, "november": 30, "december": 31
+}
+
+REPORT_NAME = "blank_report.json"
+
+
+def is_impossible_day(month, col):
+
+    """
+    Returns True if the 1-based column `col` holds a day that does not exist in `month`
+    (e.g. day 31 in April, day 30/31 in February).
+    """
+
+    days = DAYS_IN_MONTH.get((month or "").lower())
+    if days is None:
+        return False
+    day = col - FIRST_DAY_COL + 1
+    return days < day <= 31
+
+
+def ink_mask(img):
+
+    """
+    Returns a boolean mask of the handwriting inside a cell crop: pixels darker than
+    the paper brightness allows, with a border margin and any ruling lines removed.
+    The mask covers the cell interior only (the margin is cut off).
+    """
+
+    gray = img if img.ndim == 2 else cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    h, w = gray.shape
+    my, mx = int(h * BORDER_MARGIN), int(w * BORDER_MARGIN)
+    inner = gray[my:h - my, mx:w - mx]
+    if inner.size == 0:
+        return np.zeros((0, 0), bool)
+
+    paper = np.percentile(inner, 90)
+    ink = inner < paper * INK_RATIO
+
+    # Blank out pixel rows/columns that are mostly ink; those are ruling lines
+    ink[ink.mean(axis=1) > LINE_FRACTION, :] = False
+    ink[:, ink.mean(axis=0) > LINE_FRACTION] = False
+    return ink
+
+
+def ink_density(img):
+
+    """
+    Returns the fraction of dark pixels inside a cell crop (see ink_mask).
+    """
+
+    ink = ink_mask(img)
+    return float(ink.mean()) if ink.size else 0.0
+
+
+def blank_reason(img):
+
+    """
+    Decides whether a cell image has too little ink to be worth OCRing.
+    Returns (reason, density) where reason is "ink" or None if the cell should be
+    sent to OCR.
+    """
+
+    if img is None:
+        return None, None
+    density = ink_density(img)
+    if density < BLANK_DENSITY:
+        return "ink", density
+    return None, density
+
+
+def decode(content):
+    return cv2.imdecode(np.frombuffer(content, np.uint8), cv2.IMREAD_GRAYSCALE)
+
+
+def decode_color(content):
+    return cv2.imdecode(np.frombuffer(content, np.uint8), cv2.IMREAD_COLOR)
+
+
+def detect_blank_cells(contents_grid, month=None, images_grid=None):
+
+    """
+    Runs the blank pre-pass over a table given as rows of encoded cell images.
+    Returns a matching grid of booleans (True = skip OCR) and a report holding the
+    thresholds and every per-cell decision. Cells given as None (already done) are
+    left out. If the decoded cells are already in memory, pass them as images_grid
+    (None where unknown) so they are not decoded again.
+    """
+
+    skip = []
+    decisions = []
+    for r, row in enumerate(contents_grid):
+        skip_row = []
+        for c, content in enumerate(row):
+            col = c + 1
+            if content is None:
+                skip_row.append(False)
+                continue
+            if is_impossible_day(month, col):
+                reason, density = "schema", None
+            else:
+                img = images_grid[r][c] if images_grid else None
+                reason, density = blank_reason(decode(content) if img is None else img)
+            skip_row.append(reason is not None)
+            decisions.append({
+                "row": r + 1, "col": col,
+                "density": None if density is None else round(density, 5),
+                "skipped": reason,
+            })
+        skip.append(skip_row)
+
+    report = {
+        "month": month,
+        "thresholds": {
+            "ink_ratio": INK_RATIO, "line_fraction": LINE_FRACTION,
+            "border_margin": BORDER_MARGIN, "blank_density": BLANK_DENSITY,
+        },
+        "summary": {
+            "cells": len(decisions),
+            "skipped_schema": sum(d["skipped"] == "schema" for d in decisions),
+            "skipped_ink": sum(d["skipped"] == "ink" for d in decisions),
+        },
+        "decisions": decisions,
+    }
+    return skip, report
+
+
+def save_report(report, table_path):
+
+    """
+    Writes the blank-detection report into the table folder and prints a summary.
+    """
+
+    path = os.path.join(table_path, REPORT_NAME)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=1)
+    s = report["summary"]
+    print(f"⏭️ Skipped {s['skipped_schema'] + s['skipped_ink']}/{s['cells']} blank cells "
+          f"({s['skipped_schema']} impossible days, {s['skipped_ink']} no ink). Report: {path}")
+    return path
@@ -0,0 +1,210 @@
+import argparse
+import mmap
+import os
+import shutil
+import struct
+import cv2
+import numpy as np
+
+# === SETTINGS ===
+CONTAINER_NAME = "cells.pack"
+MAGIC = b"CELLPAK1"
+FOOTER = struct.Struct("<8sQQQ")   # magic, index offset, rows, cols
+
+
+def encode_cell(img):
+
+    """
+    Encodes a cell image as PNG bytes, the format sent to OCR and stored on disk.
+    """
+
+    ok, buf = cv2.imencode(".png", img)
+    if not ok:
+        raise ValueError("Could not encode cell image")
+    return buf.tobytes()
+
+
+def container_path(table_path):
+    return os.path.join(table_path, CONTAINER_NAME)
+
+
+def write_container(path, shape, cells):
+
+    """
+    Packs the encoded cells of one table into a single file. `cells` yields
+    (row, col, PNG bytes, (height, width)) in any order. Layout: the images back to
+    back, then an int64 index of shape (rows, cols, 4) holding offset, length,
+    height and width of every cell (length 0 = no cell), then a fixed-size footer.
+    The file is written under a temporary name and renamed, so readers never see
+    half a container.
+    """
+
+    rows, cols = shape
+    index = np.zeros((rows, cols, 4), np.int64)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        offset = 0
+        for r, c, content, (h, w) in cells:
+            f.write(content)
+            index[r, c] = (offset, len(content), h, w)
+            offset += len(content)
+        f.write(index.tobytes())
+        f.write(FOOTER.pack(MAGIC, offset, rows, cols))
+    os.replace(tmp_path, path)
+    return path
+
+
+class CellContainer:
+
+    """
+    Read access to a packed cell file. The file is memory-mapped, so opening it
+    costs one system call and any cell can be read by (row, col) without touching
+    the others; cells() streams them in file order.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, index_offset, rows, cols = FOOTER.unpack_from(self._map, len(self._map) - FOOTER.size)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"Not a cell container: {path}")
+        # A copy, not a view: a view would keep the mmap from being closed
+        self.index = np.frombuffer(self._map, np.int64, rows * cols * 4, index_offset).reshape(rows, cols, 4).copy()
+        self.shape = (rows, cols)
+
+    def __contains__(self, cell):
+        r, c = cell
+        return 0 <= r < self.shape[0] and 0 <= c < self.shape[1] and self.index[r, c, 1] > 0
+
+    def read(self, row, col):
+
+        """
+        Returns the PNG bytes of a cell, or None if the container has no such cell.
+        """
+
+        if (row, col) not in self:
+            return None
+        offset, length = self.index[row, col, :2]
+        return self._map[offset:offset + length]
+
+    def get_cell(self, row, col, flags=cv2.IMREAD_COLOR):
+        content = self.read(row, col)
+        if content is None:
+            return None
+        return cv2.imdecode(np.frombuffer(content, np.uint8), flags)
+
+    def cells(self):
+
+        """
+        Yields (row, col, PNG bytes) for every cell in file order (sequential reads).
+        """
+
+        rows, cols = np.nonzero(self.index[:, :, 1] > 0)
+        for i in np.argsort(self.index[rows, cols, 0], kind="stable"):
+            yield int(rows[i]), int(cols[i]), self.read(rows[i], cols[i])
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+
+def remove_container(table_path):
+
+    """
+    Deletes a table's container, e.g. after its cells were written out as a tree, so
+    readers (which prefer the container) see the new cells. Returns True if one existed.
+    """
+
+    path = container_path(table_path)
+    if not os.path.exists(path):
+        return False
+    os.remove(path)
+    return True
+
+
+def open_container(table_path):
+
+    """
+    Returns the CellContainer of a table folder, or None if it has none.
+    """
+
+    path = container_path(table_path)
+    return CellContainer(path) if os.path.exists(path) else None
+
+
+def export_tree(table_path):
+
+    """
+    Writes the cells of a table's container out as the classic row_i/col_j.png
+    directory tree. Returns the number of files written.
+    """
+
+    container = open_container(table_path)
+    if container is None:
+        return 0
+    n = 0
+    try:
+        for r, c, content in container.cells():
+            row_folder = os.path.join(table_path, f"row_{r+1}")
+            os.makedirs(row_folder, exist_ok=True)
+            with open(os.path.join(row_folder, f"col_{c+1}.png"), "wb") as f:
+                f.write(content)
+            n += 1
+    finally:
+        container.close()
+    return n
+
+
+def pack_tree(table_path, remove_tree=False):
+
+    """
+    Packs an existing row_i/col_j.png tree into a container (for tables cropped
+    before containers existed), optionally deleting the tree afterwards.
+    Returns the number of cells packed.
+    """
+
+    cells = []
+    for row_folder in os.listdir(table_path):
+        row_path = os.path.join(table_path, row_folder)
+        if not (row_folder.startswith("row_") and os.path.isdir(row_path)):
+            continue
+        r = int(row_folder.split("_")[-1]) - 1
+        for name in os.listdir(row_path):
+            if name.startswith("col_") and name.lower().endswith(".png"):
+                cells.append((r, int(name[4:-4]) - 1, os.path.join(row_path, name)))
+    if not cells:
+        return 0
+
+    def items():
+        for r, c, path in sorted(cells):
+            with open(path, "rb") as f:
+                content = f.read()
+            img = cv2.imdecode(np.frombuffer(content, np.uint8), cv2.IMREAD_UNCHANGED)
+            yield r, c, content, img.shape[:2]
+
+    shape = (max(r for r, _, _ in cells) + 1, max(c for _, c, _ in cells) + 1)
+    write_container(container_path(table_path), shape, items())
+    if remove_tree:
+        for row_folder in {os.path.dirname(p) for _, _, p in cells}:
+            shutil.rmtree(row_folder)
+    return len(cells)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pack cell trees into one file per table, or export them back.")
+    parser.add_argument("command", choices=["pack", "export"])
+    parser.add_argument("tables", nargs="*", help="table folders (default: every table under output/)")
+    parser.add_argument("--remove-tree", action="store_true", help="delete the row_i folders after packing")
+    args = parser.parse_args()
+
+    tables = args.tables or sorted(
+        root for root, dirs, _ in os.walk("output")
+        if any(d.startswith("row_") for d in dirs) or CONTAINER_NAME in os.listdir(root))
+    for table_path in tables:
+        if args.command == "pack":
+            n = pack_tree(table_path, args.remove_tree)
+        else:
+            n = export_tree(table_path)
+        print(f"{'✅' if n else '⏭️'} {table_path}: {n} cells")
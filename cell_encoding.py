@@ -0,0 +1,147 @@
+import argparse
+import json
+import os
+import cv2
+import numpy as np
+
+from blank_detection import BORDER_MARGIN, ink_mask
+
+# === SETTINGS ===
+# Named encodings for the bytes sent to OCR. "png" keeps the cell exactly as cropped.
+ENCODINGS = {
+    "png": {},
+    "gray": {"mode": "gray"},
+    "ocr": {"mode": "gray", "glyph_height": 40, "tight": True},
+    "bilevel": {"mode": "bilevel", "glyph_height": 40, "tight": True},
+    "webp": {"mode": "gray", "glyph_height": 40, "tight": True, "fmt": "webp", "quality": 80},
+}
+MARGIN = 6                  # pixels kept around the ink when cropping tightly
+REPORT_PATH = os.path.join("output", "encoding_benchmark.json")
+
+
+def ink_box(gray):
+
+    """
+    Returns the (x0, y0, x1, y1) bounding box of the handwriting in a cell, in cell
+    pixels, or None if the cell has no ink (see blank_detection.ink_mask).
+    """
+
+    ink = ink_mask(gray)
+    ys, xs = np.nonzero(ink)
+    if ys.size == 0:
+        return None
+    my, mx = int(gray.shape[0] * BORDER_MARGIN), int(gray.shape[1] * BORDER_MARGIN)
+    return xs.min() + mx, ys.min() + my, xs.max() + mx + 1, ys.max() + my + 1
+
+
+def encode_for_ocr(img, mode="color", glyph_height=None, tight=False, fmt="png", quality=90):
+
+    """
+    Encodes a cell for upload with as few bytes as the OCR needs:
+      mode          "color" (as cropped), "gray" or "bilevel" (Otsu, 1-bit PNG)
+      tight         crop to the ink bounding box plus MARGIN pixels
+      glyph_height  downscale (never upscale) so the ink is about this many pixels tall
+      fmt, quality  "png", or a lossy "webp"/"jpg" at this quality
+    Returns the encoded bytes.
+    """
+
+    if mode == "color" and not tight and not glyph_height and fmt == "png":
+        return cv2.imencode(".png", img)[1].tobytes()
+
+    gray = img if img.ndim == 2 else cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    out = gray if mode != "color" else img
+    box = ink_box(gray) if (tight or glyph_height) else None
+
+    if tight and box:
+        x0, y0, x1, y1 = box
+        out = out[max(y0 - MARGIN, 0):y1 + MARGIN, max(x0 - MARGIN, 0):x1 + MARGIN]
+    if glyph_height and box:
+        scale = glyph_height / (box[3] - box[1])
+        if scale < 1:
+            out = cv2.resize(out, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+    if mode == "bilevel":
+        _, out = cv2.threshold(out, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        return cv2.imencode(".png", out, [cv2.IMWRITE_PNG_BILEVEL, 1])[1].tobytes()
+    if fmt == "webp":
+        return cv2.imencode(".webp", out, [cv2.IMWRITE_WEBP_QUALITY, quality])[1].tobytes()
+    if fmt == "jpg":
+        return cv2.imencode(".jpg", out, [cv2.IMWRITE_JPEG_QUALITY, quality])[1].tobytes()
+    return cv2.imencode(".png", out, [cv2.IMWRITE_PNG_COMPRESSION, 9])[1].tobytes()
+
+
+def encode_named(img, name):
+
+    """
+    Encodes a cell with one of the ENCODINGS presets.
+    """
+
+    if name not in ENCODINGS:
+        raise ValueError(f"Unknown cell encoding '{name}'. Choose from: {', '.join(ENCODINGS)}")
+    return encode_for_ocr(img, **ENCODINGS[name])
+
+
+def benchmark(backend=None, limit=500, encodings=None):
+
+    """
+    OCRs up to `limit` verified cells (tables with a corrected CSV) under every
+    encoding and reports payload size against accuracy. Results go through the OCR
+    cache, so re-running the benchmark is free.
+    """
+
+    # Imported here: the benchmark needs the OCR stack, the encoder itself doesn't
+    from cell_store import CellStore
+    from digit_model import clean_label, labelled_tables
+    from ocr_processor import ocr_contents
+
+    cells = []
+    for table_path, df in labelled_tables():
+        store = CellStore(table_path)
+        for r in range(df.shape[0]):
+            for c in range(df.shape[1]):
+                label = clean_label(df.iat[r, c])
+                img = store.get_cell(r, c) if label else None
+                if img is not None:
+                    cells.append((img, label))
+                if len(cells) >= limit:
+                    break
+            if len(cells) >= limit:
+                break
+        store.close()
+        if len(cells) >= limit:
+            break
+
+    if not cells:
+        print("❌ No verified cells found.")
+        return None
+
+    rows = []
+    for name in encodings or ENCODINGS:
+        contents = [encode_named(img, name) for img, _ in cells]
+        texts = ocr_contents(contents, backend)
+        correct = sum(t.replace(" ", "").replace("\n", "") == label for t, (_, label) in zip(texts, cells))
+        sizes = np.array([len(c) for c in contents])
+        rows.append({"encoding": name, "settings": ENCODINGS[name], "mean_bytes": float(sizes.mean()),
+                     "total_bytes": int(sizes.sum()), "accuracy": correct / len(cells)})
+
+    print(f"{'encoding':10} {'mean bytes':>11} {'vs png':>7} {'accuracy':>9}")
+    base = rows[0]["mean_bytes"]
+    for row in rows:
+        print(f"{row['encoding']:10} {row['mean_bytes']:11.0f} {row['mean_bytes'] / base:7.0%} {row['accuracy']:9.1%}")
+
+    report = {"cells": len(cells), "backend": backend, "encodings": rows}
+    os.makedirs(os.path.dirname(REPORT_PATH), exist_ok=True)
+    with open(REPORT_PATH, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=1)
+    print(f"📄 Report: {REPORT_PATH}")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark OCR accuracy against payload size for each cell encoding.")
+    parser.add_argument("--backend")
+    parser.add_argument("--limit", type=int, default=500, help="verified cells to use")
+    parser.add_argument("--encoding", action="append", choices=list(ENCODINGS), help="only this encoding (repeatable)")
+    args = parser.parse_args()
+
+    benchmark(args.backend, args.limit, args.encoding)
@@ -0,0 +1,107 @@
+import sys
+import time
+import cv2
+
+from segmentation import cell_path, iter_cells, load_grid, load_rotated_page
+from cell_container import container_path, encode_cell, write_container
+from preprocessing import apply_chain, record_chain, recorded_chain
+from ocr_processor import ocr_table
+
+
+def stream_cells(table_path, chain=None):
+
+    """
+    Yields (row, col, processed cell) for a table straight from its saved grid: the
+    page is loaded, rotated and preprocessed once with `chain` (default: the chain
+    the table was cropped with), and every cell is a view into it. Nothing is read
+    from the table's stored cells. Yields nothing if the table has no saved grid or
+    page image.
+    """
+
+    grid = load_grid(table_path)
+    rotated = load_rotated_page(grid) if grid else None
+    if rotated is None:
+        return
+    page = apply_chain(rotated, recorded_chain(table_path) if chain is None else chain)
+    yield from iter_cells(page, grid["row_lines"], grid["col_lines"])
+
+
+def run_streaming_ocr(table_path, csv_output_folder, month, data_type, table_number,
+                      backend=None, write_cells=True, chain=None):
+
+    """
+    Runs segment -> preprocess -> OCR for a table in one pass from its saved grid,
+    without reading any cell back from disk. Each cell is encoded once; the same
+    bytes are sent to OCR and, if write_cells is set, packed into the table's cell
+    container for the checker. Returns the CSV path, or None if the table has no grid.
+    """
+
+    grid = load_grid(table_path)
+    if grid is None:
+        print(f"❌ No saved grid in {table_path}")
+        return None
+
+    cells = {}
+    for r, c, img in stream_cells(table_path, chain):
+        cells[(r, c)] = (encode_cell(img), img)
+    if not cells:
+        return None
+    n_rows, n_cols = len(grid["row_lines"]) - 1, len(grid["col_lines"]) - 1
+    if write_cells:
+        write_container(container_path(table_path), (n_rows, n_cols),
+                        ((r, c, content, img.shape[:2]) for (r, c), (content, img) in cells.items()))
+        record_chain(table_path, recorded_chain(table_path) if chain is None else chain)
+
+    def read_cell(r, c):
+        return cells.pop((r, c))
+
+    return ocr_table(table_path, [n_cols] * n_rows, read_cell,
+                     csv_output_folder, month, data_type, table_number, backend)
+
+
+def benchmark(table_path):
+
+    """
+    Times the old round trip (write crops, read back, preprocess each cell, write,
+    read again) against the in-memory pipeline (preprocess the page once, crop views,
+    encode) for one table with its recorded chain, without any OCR. The old path
+    writes into a scratch folder so the table itself is left untouched.
+    """
+
+    import shutil
+    import tempfile
+    from segmentation import crop_cells
+
+    grid = load_grid(table_path)
+    rotated = load_rotated_page(grid) if grid else None
+    if rotated is None:
+        print(f"❌ No saved grid in {table_path}")
+        return
+    chain = recorded_chain(table_path)
+
+    scratch = tempfile.mkdtemp()
+    try:
+        start = time.perf_counter()
+        crop_cells(rotated, grid["row_lines"], grid["col_lines"], scratch, tree=True)
+        for r, c, _ in iter_cells(rotated, grid["row_lines"], grid["col_lines"]):
+            path = cell_path(scratch, r, c)
+            cv2.imwrite(path, apply_chain(cv2.imread(path), chain))
+            with open(path, "rb") as f:
+                f.read()
+        disk = time.perf_counter() - start
+    finally:
+        shutil.rmtree(scratch)
+
+    start = time.perf_counter()
+    n = sum(1 for _, _, img in stream_cells(table_path, chain) if encode_cell(img))
+    memory = time.perf_counter() - start
+
+    print(f"{n} cells: disk round trip {disk:.2f}s, in memory {memory:.2f}s ({disk / max(memory, 1e-9):.1f}x)")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python cell_pipeline.py <table_folder>   (benchmark, no OCR)")
+        sys.exit(1)
+
+    benchmark(sys.argv[1])
@@ -0,0 +1,230 @@
+import argparse
+import json
+import os
+from functools import lru_cache
+import cv2
+import numpy as np
+
+from segmentation import GRID_FILE, cell_path, load_grid, rotate_image
+from preprocessing import apply_chain, chain_for, record_chain, recorded_chain
+from cell_encoding import encode_named
+from cell_container import container_path, encode_cell, open_container, remove_container, write_container
+
+# === SETTINGS ===
+OUTPUT_ROOT = "output"
+PAGE_CACHE_SIZE = 2         # processed pages kept in memory (a page is tens of MB)
+
+
+@lru_cache(maxsize=PAGE_CACHE_SIZE)
+def processed_page(image_path, angle, chain_json):
+
+    """
+    Loads a page, rotates it by `angle` and runs the preprocessing chain (given as
+    JSON so it can be a cache key) over it, once per combination while it stays in
+    the cache. Returns None if the image is missing.
+    """
+
+    img = cv2.imread(image_path)
+    if img is None:
+        print(f"❌ Could not load image: {image_path}")
+        return None
+    page = apply_chain(rotate_image(img, angle), json.loads(chain_json))
+    page.setflags(write=False)  # shared between stores; crops are views into it
+    return page
+
+
+def cell_row_lengths(table_path):
+
+    """
+    Returns the number of cell images in each row_i folder of a table, in row order.
+    """
+
+    row_folders = [f for f in os.listdir(table_path)
+                   if f.startswith("row_") and os.path.isdir(os.path.join(table_path, f))]
+    return [len([f for f in os.listdir(os.path.join(table_path, row)) if f.lower().endswith(".png")])
+            for row in sorted(row_folders, key=lambda x: int(x.split('_')[-1]))]
+
+
+class CellStore:
+
+    """
+    On-demand access to the cells of one table. Cells come from the table's cell
+    container (cells.pack) if it has one, which is one file read with random access.
+    Otherwise, if the table has a saved grid, cells are cut when they are asked for
+    from the rotated page, preprocessed once as a whole with `chain` (default: the
+    chain recorded for the table) and cached; `padding` extends every crop by that
+    many pixels on each side. Asking for a chain or padding explicitly bypasses the
+    container, since it holds the cells as recorded. Tables with neither fall back
+    to the row_i/col_j PNG files written by older versions of the pipeline.
+    """
+
+    def __init__(self, table_path, chain=None, padding=0):
+        self.table_path = table_path
+        self.chain = recorded_chain(table_path) if chain is None else chain
+        self.padding = padding
+        self.grid = load_grid(table_path)
+        self.container = open_container(table_path) if chain is None and not padding else None
+        if self.grid:
+            self.row_lengths = [len(self.grid["col_lines"]) - 1] * (len(self.grid["row_lines"]) - 1)
+        elif self.container:
+            self.row_lengths = [int(n) for n in np.count_nonzero(self.container.index[:, :, 1], axis=1)]
+        elif os.path.isdir(table_path):
+            self.row_lengths = cell_row_lengths(table_path)
+        else:
+            self.row_lengths = []
+
+    @property
+    def shape(self):
+        return len(self.row_lengths), max(self.row_lengths, default=0)
+
+    @property
+    def page(self):
+        if not self.grid:
+            return None
+        return processed_page(self.grid["image_path"], self.grid["rotation_angle"], json.dumps(self.chain))
+
+    def __contains__(self, cell):
+        r, c = cell
+        return 0 <= r < len(self.row_lengths) and 0 <= c < self.row_lengths[r]
+
+    def cells(self):
+
+        """
+        Yields every (row, col) of the table in reading order.
+        """
+
+        for r, n_cols in enumerate(self.row_lengths):
+            for c in range(n_cols):
+                yield r, c
+
+    def crop(self, row, col):
+
+        """
+        Returns the crop of a cell as a view into the processed page, or None if it
+        can only be read from disk.
+        """
+
+        page = self.page
+        if page is None:
+            return None
+        rows, cols, pad = self.grid["row_lines"], self.grid["col_lines"], self.padding
+        y0, y1 = max(rows[row] - pad, 0), min(rows[row + 1] + pad, page.shape[0])
+        x0, x1 = max(cols[col] - pad, 0), min(cols[col + 1] + pad, page.shape[1])
+        return page[y0:y1, x0:x1]
+
+    def read(self, row, col):
+
+        """
+        Returns (PNG bytes, image) for a cell. Cells read from the container or from
+        disk come back as their stored bytes and None, so they are not decoded unless
+        needed.
+        """
+
+        if self.container and (row, col) in self.container:
+            return bytes(self.container.read(row, col)), None
+        crop = self.crop(row, col)
+        if crop is None:
+            with open(cell_path(self.table_path, row, col), "rb") as f:
+                return f.read(), None
+        return encode_cell(crop), crop
+
+    def get_cell(self, row, col):
+
+        """
+        Returns the image of a cell (BGR), or None if it does not exist.
+        """
+
+        if (row, col) not in self:
+            return None
+        if self.container and (row, col) in self.container:
+            return self.container.get_cell(row, col)
+        crop = self.crop(row, col)
+        if crop is None:
+            return cv2.imread(cell_path(self.table_path, row, col))
+        return crop
+
+    def close(self):
+
+        """
+        Closes the table's cell container, if one is open.
+        """
+
+        if self.container:
+            self.container.close()
+            self.container = None
+
+    def materialize(self, gray=False, tree=False):
+
+        """
+        Re-crops every cell of a gridded table from the page (e.g. after changing the
+        preprocessing or the padding), packs them into the table's container and
+        records the chain used. With gray, cells are stored as single-channel PNGs,
+        which are much smaller; with tree, they are written as row_i/col_j.png files
+        and the container is removed, since it would otherwise still be read first.
+        Returns the number of cells written.
+        """
+
+        if self.page is None:
+            return 0
+
+        def encoded():
+            for r, c in self.cells():
+                crop = self.crop(r, c)
+                yield r, c, encode_named(crop, "gray") if gray else encode_cell(crop), crop.shape[:2]
+
+        n = 0
+        if tree:
+            self.close()
+            for r in range(len(self.row_lengths)):
+                os.makedirs(os.path.join(self.table_path, f"row_{r+1}"), exist_ok=True)
+            for r, c, content, _ in encoded():
+                with open(cell_path(self.table_path, r, c), "wb") as f:
+                    f.write(content)
+                n += 1
+            remove_container(self.table_path)
+        else:
+            self.close()
+            write_container(container_path(self.table_path), self.shape, encoded())
+            self.container = open_container(self.table_path)
+            n = int(np.count_nonzero(self.container.index[:, :, 1]))
+        record_chain(self.table_path, self.chain)
+        return n
+
+
+def find_gridded_tables(output_root=OUTPUT_ROOT, month=None, data_type=None):
+
+    """
+    Returns every table folder under output_root that has a saved grid.
+    """
+
+    tables = []
+    for root, dirs, files in os.walk(output_root):
+        dirs.sort()
+        if GRID_FILE not in files:
+            continue
+        parts = os.path.relpath(root, output_root).split(os.sep)
+        if month and parts[0] != month:
+            continue
+        if data_type and (len(parts) < 2 or parts[1] != data_type):
+            continue
+        tables.append(root)
+    return tables
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-crop cell images from the saved grids, without redrawing them, "
+                                                 "with each ledger's preprocessing chain from preprocessing.json.")
+    parser.add_argument("--month")
+    parser.add_argument("--type", choices=["max", "min", "precipitation"])
+    parser.add_argument("--padding", type=int, default=0, help="extra pixels around every cell")
+    parser.add_argument("--raw", action="store_true", help="don't preprocess the crops")
+    parser.add_argument("--gray", action="store_true", help="store single-channel PNGs to save disk")
+    parser.add_argument("--tree", action="store_true", help="write row_i/col_j.png files instead of the container")
+    args = parser.parse_args()
+
+    for table_path in find_gridded_tables(month=args.month, data_type=args.type):
+        month, data_type = os.path.relpath(table_path, OUTPUT_ROOT).split(os.sep)[:2]
+        store = CellStore(table_path, chain=[] if args.raw else chain_for(month, data_type), padding=args.padding)
+        n = store.materialize(gray=args.gray, tree=args.tree)
+        store.close()
+        print(f"✅ {table_path}: {n} cells" if n else f"❌ {table_path}: page image missing")
@@ -0,0 +1,103 @@
+import argparse
+import json
+import os
+import cv2
+import numpy as np
+
+# === SETTINGS ===
+DESKEW_WIDTH = 1500         # pages are binarized and searched at this width
+MAX_SKEW = 5.0              # degrees searched either side of level
+SEARCH_STEPS = [(MAX_SKEW, 0.5), (0.5, 0.1), (0.1, 0.02)]   # (half range, step) per refinement
+CACHE_PATH = os.path.join("output", "deskew_cache.json")
+
+
+def binarize_small(img):
+
+    """
+    Returns a downscaled float32 ink mask (1 = ink) of a page for the skew search.
+    """
+
+    gray = img if img.ndim == 2 else cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    scale = min(1.0, DESKEW_WIDTH / gray.shape[1])
+    small = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    _, ink = cv2.threshold(small, 0, 1, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    return ink.astype(np.float32)
+
+
+def profile_score(ink, angle):
+
+    """
+    Variance of the horizontal projection profile of the ink after rotating it by
+    `angle`; it peaks when the ruling lines and rows of writing are level.
+    """
+
+    h, w = ink.shape
+    matrix = cv2.getRotationMatrix2D((w / 2, h / 2), angle, 1.0)
+    rotated = cv2.warpAffine(ink, matrix, (w, h), flags=cv2.INTER_LINEAR)
+    return float(rotated.sum(axis=1).var())
+
+
+def estimate_skew(img):
+
+    """
+    Estimates the angle (degrees, rotate_image's convention) that levels a page,
+    by a coarse-to-fine search for the rotation with the sharpest projection profile.
+    Each refinement searches around the best angle of the previous one, down to 0.02°.
+    """
+
+    ink = binarize_small(img)
+    best = 0.0
+    for half_range, step in SEARCH_STEPS:
+        angles = best + np.arange(-half_range, half_range + step / 2, step)
+        scores = [profile_score(ink, a) for a in angles]
+        best = float(angles[int(np.argmax(scores))])
+    return round(best, 2)
+
+
+def load_cache():
+    if not os.path.exists(CACHE_PATH):
+        return {}
+    with open(CACHE_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def cached_skew(image_path, img=None):
+
+    """
+    Returns the skew angle of an input page, computing it only if the page is new or
+    has changed since it was last measured (the cache is keyed by path, size and
+    modification time). Pass the loaded image to avoid reading it again.
+    """
+
+    stat = os.stat(image_path)
+    key = os.path.abspath(image_path)
+    stamp = [stat.st_size, int(stat.st_mtime)]
+    cache = load_cache()
+    if key in cache and cache[key]["stamp"] == stamp:
+        return cache[key]["angle"]
+
+    if img is None:
+        img = cv2.imread(image_path)
+    angle = estimate_skew(img)
+
+    cache = load_cache()  # another process may have added pages meanwhile
+    cache[key] = {"stamp": stamp, "angle": angle}
+    os.makedirs(os.path.dirname(CACHE_PATH), exist_ok=True)
+    tmp_path = CACHE_PATH + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(cache, f, indent=1)
+    os.replace(tmp_path, CACHE_PATH)
+    return angle
+
+
+if __name__ == "__main__":
+    # Imported here: batch_ocr pulls in the whole GUI/OCR stack
+    from batch_ocr import DATA_TYPES, find_pages
+
+    parser = argparse.ArgumentParser(description="Measure (and cache) the skew of every input page.")
+    parser.add_argument("--month", action="append", help="only this month (repeatable)")
+    parser.add_argument("--type", action="append", choices=DATA_TYPES, help="only this data type (repeatable)")
+    args = parser.parse_args()
+
+    for page in find_pages(months=args.month, data_types=args.type):
+        print(f"📐 {page['image_path']}: {cached_skew(page['image_path']):+.2f}°")
@@ -0,0 +1,351 @@
+import argparse
+import hashlib
+import json
+import os
+import cv2
+import numpy as np
+import pandas as pd
+
+from blank_detection import BORDER_MARGIN, ink_mask
+from cell_store import CellStore
+
+# === SETTINGS ===
+OUTPUT_ROOT = "output"
+COLLECTED_ROOT = "collected_csvs"
+MODEL_PATH = os.path.join("models", "digit_model.npz")
+REPORT_PATH = os.path.join("models", "digit_model_report.json")
+
+CHARSET = "0123456789.-"
+GLYPH_SIZE = 16             # glyphs are normalised to GLYPH_SIZE x GLYPH_SIZE
+MIN_GLYPH_AREA = 4          # smaller components are specks (a decimal point is bigger than this)
+MAX_GLYPHS = 6
+MAX_ALTERNATES = 2
+HOLDOUT = 0.2               # share of tables kept out of training for the report
+VISION_PRICE_PER_1000 = 1.50  # USD, text detection list price
+
+
+def find_glyphs(img):
+
+    """
+    Splits a cell into glyphs, left to right. Connected ink components that overlap
+    horizontally (broken strokes, the bar of a 5) are merged into one glyph.
+    Returns a list of (mask crop, (x0, y0, x1, y1)) in the coordinates of the ink mask,
+    and the mask height.
+    """
+
+    ink = ink_mask(img)
+    if ink.size == 0 or not ink.any():
+        return [], 0
+    n, labels, stats, _ = cv2.connectedComponentsWithStats(ink.astype(np.uint8), connectivity=8)
+
+    boxes = []
+    for i in range(1, n):
+        x, y, w, h, area = stats[i]
+        if area >= MIN_GLYPH_AREA:
+            boxes.append([x, y, x + w, y + h, [i]])
+    boxes.sort(key=lambda b: b[0])
+
+    merged = []
+    for box in boxes:
+        if merged:
+            last = merged[-1]
+            overlap = min(last[2], box[2]) - max(last[0], box[0])
+            if overlap > 0.5 * min(last[2] - last[0], box[2] - box[0]):
+                last[0], last[1] = min(last[0], box[0]), min(last[1], box[1])
+                last[2], last[3] = max(last[2], box[2]), max(last[3], box[3])
+                last[4] += box[4]
+                continue
+        merged.append(box)
+
+    glyphs = []
+    for x0, y0, x1, y1, ids in merged:
+        crop = np.isin(labels[y0:y1, x0:x1], ids)
+        glyphs.append((crop, (x0, y0, x1, y1)))
+    return glyphs, ink.shape[0]
+
+
+def glyph_features(crop, box, cell_height):
+
+    """
+    Returns the feature vector of one glyph: its shape scaled into a square
+    (aspect ratio kept) plus its size and vertical position relative to the cell,
+    which is what separates a decimal point from a zero.
+    """
+
+    h, w = crop.shape
+    side = max(h, w)
+    square = np.zeros((side, side), np.float32)
+    y, x = (side - h) // 2, (side - w) // 2
+    square[y:y + h, x:x + w] = crop
+    pixels = cv2.resize(square, (GLYPH_SIZE, GLYPH_SIZE), interpolation=cv2.INTER_AREA).ravel()
+
+    x0, y0, x1, y1 = box
+    cell_height = max(cell_height, 1)
+    extra = [(y1 - y0) / cell_height, (x1 - x0) / cell_height, (y0 + y1) / 2 / cell_height]
+    return np.concatenate([pixels, extra]).astype(np.float32)
+
+
+def cell_features(img):
+
+    """
+    Returns a (n_glyphs, n_features) array for a cell image.
+    """
+
+    glyphs, height = find_glyphs(img)
+    if not glyphs:
+        return np.zeros((0, GLYPH_SIZE * GLYPH_SIZE + 3), np.float32)
+    return np.stack([glyph_features(crop, box, height) for crop, box in glyphs])
+
+
+def softmax(z):
+    z = z - z.max(axis=1, keepdims=True)
+    e = np.exp(z)
+    return e / e.sum(axis=1, keepdims=True)
+
+
+class DigitModel:
+
+    """
+    Multinomial logistic regression over normalised glyphs.
+    read() returns the text of a cell and a confidence, the product of the
+    per-glyph probabilities.
+    """
+
+    def __init__(self, weights, mean, std, charset=CHARSET):
+        self.weights = weights
+        self.mean = mean
+        self.std = std
+        self.charset = charset
+
+    @classmethod
+    def load(cls, path=MODEL_PATH):
+        data = np.load(path)
+        return cls(data["weights"], data["mean"], data["std"], str(data["charset"]))
+
+    def save(self, path=MODEL_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.savez(path, weights=self.weights, mean=self.mean, std=self.std, charset=self.charset)
+
+    def fingerprint(self):
+        return hashlib.sha256(self.weights.tobytes()).hexdigest()[:16]
+
+    def predict(self, features):
+        x = (features - self.mean) / self.std
+        x = np.hstack([x, np.ones((len(x), 1), np.float32)])
+        return softmax(x @ self.weights)
+
+    def read(self, img, details=False):
+
+        """
+        Returns (text, confidence) for a cell image. With details=True also returns
+        alternate readings (the least certain glyphs swapped for their runner-up) and
+        the ink bounding box in cell coordinates.
+        """
+
+        glyphs, height = find_glyphs(img)
+        if not glyphs or len(glyphs) > MAX_GLYPHS:
+            return ("", 0.0, [], None) if details else ("", 0.0)
+
+        features = np.stack([glyph_features(crop, box, height) for crop, box in glyphs])
+        probs = self.predict(features)
+        order = np.argsort(probs, axis=1)
+        best, second = order[:, -1], order[:, -2]
+        best_p = probs[np.arange(len(best)), best]
+        text = "".join(self.charset[i] for i in best)
+        confidence = float(np.prod(best_p))
+        if not details:
+            return text, confidence
+
+        alternates = []
+        for g in np.argsort(best_p)[:MAX_ALTERNATES]:
+            chars = [self.charset[i] for i in best]
+            chars[g] = self.charset[second[g]]
+            alternates.append("".join(chars))
+
+        # Glyph boxes are relative to the ink mask, which starts after the border margin
+        h, w = img.shape[:2]
+        my, mx = int(h * BORDER_MARGIN), int(w * BORDER_MARGIN)
+        boxes = np.array([box for _, box in glyphs])
+        bbox = (int(boxes[:, 0].min()) + mx, int(boxes[:, 1].min()) + my,
+                int(boxes[:, 2].max()) + mx, int(boxes[:, 3].max()) + my)
+        return text, confidence, alternates, bbox
+
+
+def train_softmax(X, y, n_classes, epochs=300, lr=0.5, l2=1e-4):
+
+    """
+    Fits softmax regression with full-batch gradient descent.
+    Returns (weights, mean, std); the last weight row is the bias.
+    """
+
+    mean = X.mean(axis=0)
+    std = X.std(axis=0) + 1e-6
+    Xn = np.hstack([(X - mean) / std, np.ones((len(X), 1), np.float32)])
+    onehot = np.eye(n_classes, dtype=np.float32)[y]
+
+    W = np.zeros((Xn.shape[1], n_classes), np.float32)
+    for epoch in range(epochs):
+        p = softmax(Xn @ W)
+        grad = Xn.T @ (p - onehot) / len(Xn) + l2 * W
+        W -= lr * grad
+        if epoch % 50 == 0:
+            loss = -np.log(p[np.arange(len(y)), y] + 1e-9).mean()
+            print(f"   epoch {epoch}: loss {loss:.4f}")
+    return W, mean.astype(np.float32), std.astype(np.float32)
+
+
+def clean_label(value):
+
+    """
+    Returns a verified cell value as a string of CHARSET characters, or None if the
+    value contains anything else.
+    """
+
+    value = str(value).strip()
+    if value.lower() in {"", "nan", "x"}:
+        return None
+    return value if all(ch in CHARSET for ch in value) else None
+
+
+def labelled_tables(root=OUTPUT_ROOT):
+
+    """
+    Yields (table folder, DataFrame of verified values) for every table that has
+    cell images and a corrected CSV in csv_output (or collected_csvs as a fallback).
+    """
+
+    for month in sorted(os.listdir(root)):
+        month_path = os.path.join(root, month)
+        if not os.path.isdir(month_path):
+            continue
+        for dtype in sorted(os.listdir(month_path)):
+            dtype_path = os.path.join(month_path, dtype)
+            if not os.path.isdir(dtype_path):
+                continue
+            for table in sorted(os.listdir(dtype_path)):
+                if not table.startswith("table_"):
+                    continue
+                number = table.split("_")[-1]
+                csv_name = f"{month}_{dtype}_{number}.csv"
+                for csv_path in (os.path.join(dtype_path, "csv_output", csv_name),
+                                 os.path.join(COLLECTED_ROOT, month, csv_name)):
+                    if os.path.exists(csv_path):
+                        df = pd.read_csv(csv_path, header=None, dtype=str, keep_default_na=False)
+                        yield os.path.join(dtype_path, table), df
+                        break
+
+
+def is_holdout(table_path):
+    digest = hashlib.sha256(table_path.replace(os.sep, "/").encode("utf-8")).digest()
+    return digest[0] / 255 < HOLDOUT
+
+
+def labelled_cells(holdout):
+
+    """
+    Yields (grayscale cell image, verified value) pairs from the training tables
+    (holdout=False) or the held-out tables (holdout=True).
+    """
+
+    for table_path, df in labelled_tables():
+        if is_holdout(table_path) != holdout:
+            continue
+        store = CellStore(table_path)
+        for r in range(df.shape[0]):
+            for c in range(df.shape[1]):
+                label = clean_label(df.iat[r, c])
+                img = store.get_cell(r, c) if label else None
+                if img is not None:
+                    yield cv2.cvtColor(img, cv2.COLOR_BGR2GRAY), label
+        store.close()
+
+
+def train(model_path=MODEL_PATH):
+
+    """
+    Trains the digit model on all non-held-out tables. Only cells that split into
+    exactly as many glyphs as their verified value has characters are used, so each
+    glyph gets a reliable label.
+    """
+
+    X, y = [], []
+    used = skipped = 0
+    for img, label in labelled_cells(holdout=False):
+        features = cell_features(img)
+        if len(features) != len(label):
+            skipped += 1
+            continue
+        used += 1
+        X.append(features)
+        y.extend(CHARSET.index(ch) for ch in label)
+
+    if not X:
+        print("❌ No usable training cells found.")
+        return None
+
+    print(f"🧠 Training on {sum(len(f) for f in X)} glyphs from {used} cells ({skipped} cells skipped)")
+    W, mean, std = train_softmax(np.vstack(X), np.array(y), len(CHARSET))
+    model = DigitModel(W, mean, std)
+    model.save(model_path)
+    print(f"✅ Model saved: {model_path}")
+    return model
+
+
+def evaluate(model_path=MODEL_PATH, thresholds=(0.5, 0.7, 0.8, 0.9, 0.95, 0.99)):
+
+    """
+    Reads every held-out cell with the local model and reports, per confidence
+    threshold, how many Vision calls the cascade would save and how accurate the
+    cells answered locally are.
+    """
+
+    model = DigitModel.load(model_path)
+    reads = []
+    for img, label in labelled_cells(holdout=True):
+        text, confidence = model.read(img)
+        reads.append((confidence, text == label))
+
+    if not reads:
+        print("❌ No held-out cells found.")
+        return None
+
+    conf = np.array([r[0] for r in reads])
+    correct = np.array([r[1] for r in reads])
+    rows = []
+    for t in thresholds:
+        local = conf >= t
+        n_local = int(local.sum())
+        rows.append({
+            "threshold": t,
+            "local_share": n_local / len(reads),
+            "local_accuracy": float(correct[local].mean()) if n_local else None,
+            "errors_per_1000_cells": float((local & ~correct).sum() / len(reads) * 1000),
+            "usd_saved_per_1000_cells": n_local / len(reads) * VISION_PRICE_PER_1000,
+        })
+
+    report = {"model": model.fingerprint(), "cells": len(reads),
+              "overall_accuracy": float(correct.mean()), "thresholds": rows}
+    os.makedirs(os.path.dirname(REPORT_PATH) or ".", exist_ok=True)
+    with open(REPORT_PATH, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=1)
+
+    print(f"📊 {len(reads)} held-out cells, accuracy if everything were read locally: {correct.mean():.1%}")
+    print("threshold  local  local acc  errors/1000  $ saved/1000")
+    for r in rows:
+        acc = f"{r['local_accuracy']:.1%}" if r["local_accuracy"] is not None else "-"
+        print(f"{r['threshold']:>9}  {r['local_share']:>5.0%}  {acc:>9}  "
+              f"{r['errors_per_1000_cells']:>11.1f}  {r['usd_saved_per_1000_cells']:>12.2f}")
+    print(f"Report: {REPORT_PATH}")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train or evaluate the local handwritten-digit model.")
+    parser.add_argument("command", choices=["train", "evaluate"])
+    parser.add_argument("--model", default=MODEL_PATH)
+    args = parser.parse_args()
+
+    if args.command == "train":
+        train(args.model)
+    else:
+        evaluate(args.model)
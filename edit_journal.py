@@ -0,0 +1,338 @@
+import argparse
+import getpass
+import json
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+import pandas as pd
+
+from ocr_journal import atomic_write_csv
+
+# === SETTINGS ===
+JOURNAL_DIR = os.path.join("output", "edit_journals")
+COMPACT_SECONDS = 5         # how often pending edits are folded into the CSVs
+STALE_LOCK_SECONDS = 120    # a lock file not refreshed for this long was left by a crashed checker
+LOCK_TIMEOUT = 30           # seconds to wait for another checker to finish writing a CSV
+
+
+def journal_path(journal_dir=JOURNAL_DIR):
+
+    """
+    Returns the journal file of this checker. Every user, machine and process gets
+    its own, so two checkers never fold or recover each other's live journal.
+    """
+
+    return os.path.join(journal_dir, f"{getpass.getuser()}@{socket.gethostname()}.{os.getpid()}.jsonl")
+
+
+def lock_path(path):
+    return path + ".lock"
+
+
+def is_stale(path):
+
+    """
+    True if a journal has no owner any more: its lock file is missing or has not
+    been refreshed for STALE_LOCK_SECONDS.
+    """
+
+    try:
+        return time.time() - os.path.getmtime(lock_path(path)) > STALE_LOCK_SECONDS
+    except FileNotFoundError:
+        return True
+
+
+@contextmanager
+def locked(path, timeout=LOCK_TIMEOUT):
+
+    """
+    Holds an exclusive lock on a file shared between checkers (e.g. an OCR CSV)
+    for the duration of the with block, through a lock file created with O_EXCL.
+    A lock left behind by a crashed process is broken after STALE_LOCK_SECONDS.
+    """
+
+    deadline = time.time() + timeout
+    while True:
+        try:
+            fd = os.open(lock_path(path), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            if is_stale(path):
+                try:
+                    os.remove(lock_path(path))
+                except FileNotFoundError:
+                    pass
+                continue
+            if time.time() > deadline:
+                raise TimeoutError(f"{path} is locked by another checker")
+            time.sleep(0.05)
+    try:
+        os.write(fd, f"{getpass.getuser()}@{socket.gethostname()}:{os.getpid()}".encode())
+        os.close(fd)
+        yield
+    finally:
+        os.remove(lock_path(path))
+
+
+def read_records(path, bad=None):
+
+    """
+    Returns the edit records of a journal file. Lines that are not valid records
+    (e.g. a last line cut off by a crash) are skipped, and collected in `bad` if a
+    list is given.
+    """
+
+    if not os.path.exists(path):
+        return []
+    records = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+                if not {"csv", "row", "col", "new"} <= record.keys():
+                    raise ValueError("missing fields")
+                records.append(record)
+            except (ValueError, AttributeError):
+                if bad is not None:
+                    bad.append(line)
+    return records
+
+
+def fold(records):
+
+    """
+    Applies edit records to their CSVs, one atomic rewrite per table. Each table is
+    locked (see locked) from reading to writing, so checkers folding into the same
+    CSV never overwrite each other's edits. Each record sets a cell to its new
+    value, so folding the same records twice is harmless. Returns the number of
+    tables written.
+    """
+
+    by_csv = {}
+    for record in records:
+        by_csv.setdefault(record["csv"], []).append(record)
+    for csv_path, edits in by_csv.items():
+        with locked(csv_path):
+            df = pd.read_csv(csv_path, header=None, dtype=str, keep_default_na=False)
+            for e in edits:
+                df.iat[e["row"], e["col"]] = "" if e["new"] is None else e["new"]
+            atomic_write_csv(df, csv_path)
+    return len(by_csv)
+
+
+class EditJournal:
+
+    """
+    Append-only journal of the checker's edits. Every edit is one JSON line (table,
+    row, col, old and new value), flushed as it is made, so a crash loses nothing; a
+    background thread folds the pending lines into the CSVs every COMPACT_SECONDS
+    (see fold) and empties the file. Edits are grouped (one confirm, or one bulk
+    action) and undo/redo walk those groups, logging the reversal as new edits.
+    The same thread keeps the journal's lock file fresh, which tells other checkers
+    that the journal is still in use.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or journal_path()
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.lock = threading.Lock()
+        self.done = []          # edit groups that can be undone, latest last
+        self.undone = []        # groups undone since the last new edit
+        self.seq = 0
+        self.last_compact = None
+        with open(lock_path(self.path), "w", encoding="utf-8") as f:
+            f.write(str(os.getpid()))
+        try:
+            self.recovered = self.recover()
+        except Exception as e:
+            # A journal that cannot be recovered must not keep the checker from starting
+            print(f"⚠️ Could not recover unsaved edits: {e}")
+            self.recovered = 0
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._stop = threading.Event()
+        self.worker = threading.Thread(target=self.run, daemon=True)
+        self.worker.start()
+
+    def recover(self):
+
+        """
+        Folds the journals left behind by checkers that did not shut down cleanly
+        (see is_stale). A journal is renamed before it is folded, so when two
+        checkers start at once only one of them recovers it. Lines that are not valid
+        records are moved to <journal>.bad instead of stopping the recovery; a
+        journal that cannot be folded is kept as <journal>.failed for replay.
+        Returns the number of edits recovered.
+        """
+
+        journal_dir = os.path.dirname(self.path)
+        recovered = 0
+        for name in sorted(os.listdir(journal_dir)):
+            path = os.path.join(journal_dir, name)
+            if not name.endswith(".jsonl") or path == self.path or not is_stale(path):
+                continue
+            claimed = f"{path}.recovering.{os.getpid()}"
+            try:
+                os.rename(path, claimed)
+            except OSError:
+                continue    # another checker got to it first
+            try:
+                bad = []
+                records = read_records(claimed, bad)
+                fold(records)
+            except Exception as e:
+                print(f"⚠️ Could not recover {path}: {e}")
+                os.replace(claimed, path + ".failed")
+                continue
+            if bad:
+                with open(path + ".bad", "a", encoding="utf-8") as f:
+                    f.writelines(bad)
+                print(f"⚠️ {len(bad)} unreadable lines of {path} moved to {path}.bad")
+            if records:
+                print(f"♻️ Recovered {len(records)} unsaved edits from {path}")
+            os.remove(claimed)
+            if os.path.exists(lock_path(path)):
+                os.remove(lock_path(path))
+            recovered += len(records)
+        return recovered
+
+    def write(self, records):
+        with self.lock:
+            for record in records:
+                self.seq += 1
+                self._file.write(json.dumps(dict(record, seq=self.seq, time=time.time())) + "\n")
+            self._file.flush()
+
+    def append(self, edits):
+
+        """
+        Logs a group of edits, each a dict with csv, row, col, old and new (None for
+        an empty cell), as one undoable step.
+        """
+
+        edits = list(edits)
+        if not edits:
+            return
+        self.write(edits)
+        self.done.append(edits)
+        self.undone.clear()
+
+    def undo(self):
+
+        """
+        Logs the reversal of the latest group and returns its edits (with old and new
+        swapped) for the caller to apply, or None if there is nothing to undo.
+        """
+
+        if not self.done:
+            return None
+        group = self.done.pop()
+        reverse = [dict(e, old=e["new"], new=e["old"]) for e in reversed(group)]
+        self.write(reverse)
+        self.undone.append(group)
+        return reverse
+
+    def redo(self):
+
+        """
+        Logs the latest undone group again and returns its edits, or None.
+        """
+
+        if not self.undone:
+            return None
+        group = self.undone.pop()
+        self.write(group)
+        self.done.append(group)
+        return group
+
+    def compact(self):
+
+        """
+        Folds the pending edits into the CSVs and drops them from the journal. Edits
+        logged while the CSVs are being written stay in the journal for next time.
+        Returns the number of edits folded.
+        """
+
+        with self.lock:
+            self._file.flush()
+            records = read_records(self.path)
+        if not records:
+            return 0
+        fold(records)
+        with self.lock:
+            # Keep whatever was appended meanwhile
+            remaining = read_records(self.path)[len(records):]
+            self._file.close()
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.writelines(json.dumps(r) + "\n" for r in remaining)
+            os.replace(tmp_path, self.path)
+            self._file = open(self.path, "a", encoding="utf-8")
+            self.last_compact = time.time()
+        return len(records)
+
+    def run(self):
+        while not self._stop.wait(COMPACT_SECONDS):
+            try:
+                os.utime(lock_path(self.path))
+                self.compact()
+            except Exception as e:
+                print(f"⚠️ Could not fold the edit journal: {e}")
+
+    def close(self):
+
+        """
+        Stops the background thread and folds what is left. The emptied journal
+        and its lock file are removed. If folding fails (a CSV stays locked, or
+        cannot be written) the error is reported and both are left in place, so the
+        next checker to start recovers the edits once the lock goes stale.
+        Returns True if every edit was folded.
+        """
+
+        self._stop.set()
+        self.worker.join()
+        try:
+            self.compact()
+        except Exception as e:
+            print(f"⚠️ Could not fold the edit journal, it will be recovered on the next start: {e}")
+            self._file.close()
+            return False
+        self._file.close()
+        if not read_records(self.path):
+            os.remove(self.path)
+        os.remove(lock_path(self.path))
+        return True
+
+
+def replay(path, until=None):
+
+    """
+    Folds a journal (or a copy of one) into the CSVs, optionally only the edits
+    up to sequence number `until`. Returns the number of edits applied.
+    """
+
+    records = [r for r in read_records(path) if until is None or r.get("seq", 0) <= until]
+    fold(records)
+    return len(records)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or replay a checker edit journal.")
+    parser.add_argument("command", choices=["show", "replay"])
+    parser.add_argument("journal", nargs="?", help="journal file (default: this user's journals on this machine)")
+    parser.add_argument("--until", type=int, help="replay only up to this sequence number")
+    args = parser.parse_args()
+
+    prefix = f"{getpass.getuser()}@{socket.gethostname()}."
+    names = os.listdir(JOURNAL_DIR) if os.path.isdir(JOURNAL_DIR) else []
+    paths = [args.journal] if args.journal else sorted(
+        os.path.join(JOURNAL_DIR, name) for name in names if name.startswith(prefix) and name.endswith(".jsonl"))
+    for path in paths:
+        if args.command == "show":
+            print(path)
+            for r in read_records(path):
+                print(f"{r.get('seq', '?'):>5} {os.path.basename(r['csv'])} row {r['row'] + 1} col {r['col'] + 1}: "
+                      f"{r.get('old')!r} -> {r['new']!r}")
+        else:
+            print(f"✅ Replayed {replay(path, args.until)} edits from {path}")
@@ -1,12 +1,24 @@
+import heapq
 import os
+import time
+from bisect import bisect_left
+from collections import OrderedDict
 import tkinter as tk
 from tkinter import ttk, messagebox
 from PIL import Image, ImageTk
 import pandas as pd
-import cv2
 import numpy as np
 
+from ocr_metadata import load_metadata, low_confidence_cells, describe_cell
+from validation import ValidationEngine, is_invalid_value, next_position
+from cell_store import CellStore
+from grid_view import TableGridView
+from thumbnail_cache import PREFETCH, ThumbnailCache
+from review_queue import ReviewQueue
+from edit_journal import EditJournal
+
 BASE_DIR = "output"
+TABLE_CACHE_SIZE = 8        # tables kept loaded while the review queue moves between them
 calendar_order = [
     "january", "february", "march", "april", "may", "june",
     "july", "august", "september", "october", "november", "december"
@@ -22,11 +34,23 @@ class OCRCheckerGUI:
         self.csv_var = tk.StringVar()
         self.ignore_nan_var = tk.BooleanVar()
 
-        self.outlier_indices = set()
+        self.validator = None
+        self.low_conf_indices = set()
+        self.low_conf_sorted = []
+        self.meta = None
         self.checking_outliers = False
+        self.stores = {}
+        self.thumbnails = ThumbnailCache(self.load_cell_image)
+        self.tables = OrderedDict()     # csv path -> loaded table state, most recent last
+        self.journal = EditJournal()
+        self.queue = None
+        self.queue_item = None
 
         self.create_widgets()
         self.master.bind('<Return>', self.handle_enter_key)
+        self.master.bind('<Control-z>', lambda e: self.undo())
+        self.master.bind('<Control-y>', lambda e: self.redo())
+        self.master.protocol("WM_DELETE_WINDOW", self.on_close)
 
 
     def create_widgets(self):
@@ -64,6 +88,12 @@ class OCRCheckerGUI:
         self.image_panel = tk.Label(left_column)
         self.image_panel.pack()
 
+        # OCR confidence / alternates of the current cell (from the .ocrmeta sidecar)
+        self.meta_label = tk.Label(left_column, text="", fg="gray30", wraplength=300)
+        self.meta_label.pack()
+        self.cache_label = tk.Label(left_column, text="", fg="gray50")
+        self.cache_label.pack()
+
         # Input and control buttons under image panel
         control_frame = tk.Frame(left_column)
         control_frame.pack(pady=(15, 0))
@@ -77,24 +107,22 @@ class OCRCheckerGUI:
         tk.Button(action_btns, text="Confirm", command=self.confirm_cell, width=10).pack(side="left", padx=5)
         tk.Button(action_btns, text="Empty", command=self.clear_cell, width=10).pack(side="left", padx=5)
 
-        tk.Checkbutton(control_frame, text="Ignore 'NaN' Values", variable=self.ignore_nan_var).pack(pady=5)
-        tk.Button(control_frame, text="Save Now", command=self.save_csv, width=25).pack(pady=(0, 10))
+        tk.Checkbutton(control_frame, text="Ignore 'NaN' Values", variable=self.ignore_nan_var,
+                       command=self.toggle_ignore_nan).pack(pady=5)
+        tk.Button(control_frame, text="Save Now", command=self.save_csv, width=25).pack(pady=(0, 5))
+        undo_btns = tk.Frame(control_frame)
+        undo_btns.pack()
+        tk.Button(undo_btns, text="Undo", command=self.undo, width=10).pack(side="left", padx=5)
+        tk.Button(undo_btns, text="Redo", command=self.redo, width=10).pack(side="left", padx=5)
+        self.save_label = tk.Label(control_frame, text="", fg="gray50")
+        self.save_label.pack(pady=(0, 10))
 
         # Right side: text frame with scrollbars
         right_column = tk.Frame(content_frame)
         right_column.pack(side="left", padx=10, fill="both", expand=True)
 
-        self.text_display = tk.Text(right_column, height=18, width=100, wrap="none")
-        self.text_display.grid(row=0, column=0, sticky="nsew")
-        self.text_display.bind("<Button-1>", self.on_single_click_text)
-
-        y_scrollbar = tk.Scrollbar(right_column, orient="vertical", command=self.text_display.yview)
-        y_scrollbar.grid(row=0, column=1, sticky="ns")
-        self.text_display.config(yscrollcommand=y_scrollbar.set)
-
-        x_scrollbar = tk.Scrollbar(right_column, orient="horizontal", command=self.text_display.xview)
-        x_scrollbar.grid(row=1, column=0, columnspan=2, sticky="ew")
-        self.text_display.config(xscrollcommand=x_scrollbar.set)
+        self.grid_view = TableGridView(right_column, style=self.cell_color, on_click=self.on_cell_click)
+        self.grid_view.grid(row=0, column=0, sticky="nsew")
 
         right_column.grid_rowconfigure(0, weight=1)
         right_column.grid_columnconfigure(0, weight=1)
@@ -110,8 +138,10 @@ class OCRCheckerGUI:
         self.search_col = tk.Entry(search_frame, width=5)
         self.search_col.pack(side="left")
         tk.Button(search_frame, text="Go to Cell", command=self.goto_cell).pack(side="left", padx=5)
+        tk.Button(search_frame, text="Next Low Confidence", command=self.next_low_confidence_cell).pack(side="left", padx=5)
 
         tk.Button(top_inner, text="Add Decimal Prefix", command=self.add_decimal_prefix).grid(row=4, column=0, columnspan=2, pady=5)
+        tk.Button(top_inner, text="Review Queue (all tables)", command=self.start_queue).grid(row=5, column=0, columnspan=2, pady=5)
 
     def add_decimal_prefix(self):
 
@@ -125,6 +155,7 @@ class OCRCheckerGUI:
         if not confirm:
             return
 
+        edits = []
         for col in range(1, self.current_csv.shape[1]):
             for row in range(len(self.current_csv)):
                 val = str(self.current_csv.iat[row, col]).strip()
@@ -132,11 +163,13 @@ class OCRCheckerGUI:
                     try:
                         float(val)
                         if "." not in val:
+                            edits.append(self.edit_record(row, col, f".{val}"))
                             self.current_csv.iat[row, col] = f".{val}"
                     except ValueError:
                         continue
 
-        self.update_csv_display()
+        self.journal.append(edits)
+        self.find_outliers()
         messagebox.showinfo("Success", "Decimal prefixes added.")
 
 
@@ -167,38 +200,15 @@ class OCRCheckerGUI:
         self.load_cell(self.current_csv.iat[self.row_idx, self.col_idx])
 
 
-    def on_single_click_text(self, event):
+    def on_cell_click(self, row, col):
         """
-        Handles clicks on the text area. Allows user to select a specific cell based on mouse position.
+        Selects the clicked cell of the grid view (leaving the review queue).
         """
-        try:
-            index = self.text_display.index(f"@{event.x},{event.y}")
-            line_num, char_index = map(int, index.split('.'))
-
-            line_text = self.text_display.get(f"{line_num}.0", f"{line_num}.end")
-            if "Row" not in line_text:
-                return
+        self.leave_queue()
+        self.row_idx = row
+        self.col_idx = col
+        self.load_cell(self.current_csv.iat[self.row_idx, self.col_idx])
 
-            row_part, data_part = line_text.split(":", 1)
-            row_idx = int(row_part.strip().replace("➡", "").replace("Row", "").strip()) - 1
-
-            # find which column was clicked by measuring tab positions
-            tab_parts = data_part.strip().split('\t')
-            acc_len = 0
-            for i, part in enumerate(tab_parts):
-                acc_len += len(part) + 1  # +1 for tab
-                if acc_len > char_index - len(row_part) - 2:  # -2 for ": "
-                    col_idx = i
-                    break
-            else:
-                col_idx = len(tab_parts) - 1  # fallback to last col
-
-            self.row_idx = row_idx
-            self.col_idx = col_idx
-            self.load_cell(self.current_csv.iat[self.row_idx, self.col_idx])
-        except Exception as e:
-            print("Click parse error:", e)
-        
     def get_months(self):
 
         """
@@ -232,112 +242,180 @@ class OCRCheckerGUI:
         Loads the selected CSV file into memory and sets up the display.
         Initializes tracking indices and triggers outlier finding.
         """
-        self.month = self.month_var.get()
-        self.dtype = self.type_var.get()
-        self.csv_filename = self.csv_menu.get()
+        month = self.month_var.get()
+        dtype = self.type_var.get()
+        csv_filename = self.csv_menu.get()
 
-        path = os.path.join(BASE_DIR, self.month, self.dtype, "csv_output")
+        path = os.path.join(BASE_DIR, month, dtype, "csv_output")
         if not os.path.exists(path):
             messagebox.showerror("Error", f"No CSV folder at {path}")
             return
 
-        self.current_csv = pd.read_csv(os.path.join(path, self.csv_filename), header=None, dtype=str)
-        self.current_csv = self.current_csv.applymap(lambda x: "" if str(x).strip().lower() in {"x"} else x)
-
-        self.table_path = os.path.join(BASE_DIR, self.month, self.dtype, f"table_{self.csv_filename.split('_')[-1].replace('.csv', '')}")
+        self.leave_queue()
+        self.open_table(month, dtype, csv_filename)
         self.row_idx = 0
         self.col_idx = 0
         self.checking_outliers = False
-
-        self.find_outliers()  # ✅ make sure this runs before drawing
-        self.update_csv_display()
         self.load_next_invalid_cell()
 
-    def update_csv_display(self):
+    def open_table(self, month, dtype, csv_filename):
+        """
+        Makes a table the current one. Tables stay loaded (values, OCR metadata and
+        validation flags) for TABLE_CACHE_SIZE switches, so the review queue can move
+        between tables cheaply. Edits are saved through the edit journal.
+        """
+        csv_path = os.path.join(BASE_DIR, month, dtype, "csv_output", csv_filename)
+        if csv_path not in self.tables:
+            self.journal.compact()  # the file on disk must include this session's edits
+            df = pd.read_csv(csv_path, header=None, dtype=str)
+            df = df.replace(r"(?i)^\s*x\s*$", "", regex=True)
+            meta = load_metadata(csv_path)
+            low_conf = set(low_confidence_cells(meta)) if meta is not None else set()
+            table_path = os.path.join(BASE_DIR, month, dtype, f"table_{csv_filename.split('_')[-1].replace('.csv', '')}")
+            self.tables[csv_path] = {
+                "month": month, "dtype": dtype, "csv_filename": csv_filename, "csv": df, "meta": meta,
+                "low_conf": low_conf, "validator": ValidationEngine(df, dtype, self.ignore_nan_var.get()),
+                "table_path": table_path,
+            }
+            while len(self.tables) > TABLE_CACHE_SIZE:
+                self.tables.popitem(last=False)
+        self.tables.move_to_end(csv_path)
+
+        table = self.tables[csv_path]
+        self.month, self.dtype, self.csv_filename = month, dtype, csv_filename
+        self.current_csv = table["csv"]
+        self.meta = table["meta"]
+        self.low_conf_indices = table["low_conf"]
+        self.low_conf_sorted = sorted(self.low_conf_indices)
+        self.validator = table["validator"]
+        self.validator.set_ignore_nan(self.ignore_nan_var.get())
+        self.table_path = table["table_path"]
+        self.cells = self.store_for(self.table_path)
+        if self.grid_view.table is not self.current_csv:
+            self.grid_view.set_table(self.current_csv)
+
+    def current_csv_path(self):
+        return os.path.join(BASE_DIR, self.month, self.dtype, "csv_output", self.csv_filename)
+
+    def start_queue(self):
+        """
+        Switches to the archive-wide review queue: flagged cells of every table, most
+        severe first. The queue is built on first use (review_queue.py build rebuilds it).
+        """
+        if self.queue is None:
+            self.queue = ReviewQueue()
+        if not any(self.queue.stats().values()):
+            self.queue.rebuild(BASE_DIR, self.ignore_nan_var.get())
+        self.next_queue_item()
+
+    def next_queue_item(self):
+        """
+        Claims the next cell from the review queue, opening its table if needed.
+        """
+        while True:
+            self.queue_item = self.queue.claim()
+            if self.queue_item is None:
+                self.save_csv()
+                messagebox.showinfo("Done", "The review queue is empty. Edited tables have been saved.")
+                return
+            item = self.queue_item
+            self.open_table(item["month"], item["data_type"], os.path.basename(item["csv_path"]))
+            self.row_idx, self.col_idx = item["row"], item["col"]
+            if self.row_idx < len(self.current_csv) and self.col_idx < self.current_csv.shape[1]:
+                break
+            self.queue.finish(item)     # the table has changed shape since the queue was built
+        self.load_cell(self.current_csv.iat[self.row_idx, self.col_idx])
+        self.meta_label.config(text=f"{item['reason']} (severity {item['severity']:.1f}) - "
+                                    f"{self.csv_filename}\n{self.meta_label.cget('text')}")
+
+    def leave_queue(self):
         """
-        Updates the text area with the contents of the current CSV.
-        Highlights the current row.
+        Hands the claimed cell back to the queue, if any.
         """
-        self.text_display.delete(1.0, tk.END)
-
-        for row_idx, row in self.current_csv.iterrows():
-            prefix = "➡ " if row_idx == self.row_idx else "   "
-            self.text_display.insert(tk.END, f"{prefix}Row {row_idx + 1}: ")
+        if self.queue_item is not None:
+            self.queue.release(self.queue_item)
+            self.queue_item = None
 
-            for col_idx, value in enumerate(row):
-                cell_str = str(value)
-                self.text_display.insert(tk.END, cell_str)
-
-                if col_idx < len(row) - 1:
-                    self.text_display.insert(tk.END, "\t")
+    def on_close(self):
+        """
+        Hands back the claimed cell, folds the edit journal and closes the window,
+        which always closes even if saving fails (the journal is recovered later).
+        """
+        try:
+            self.leave_queue()
+        except Exception as e:
+            print(f"⚠️ Could not hand the claimed cell back to the review queue: {e}")
+        try:
+            if not self.journal.close():
+                messagebox.showwarning("Edits Not Saved Yet", "Some edits could not be written to the CSVs. "
+                                       "They are kept in the edit journal and applied the next time the checker starts.")
+            for store in self.stores.values():
+                store.close()
+        finally:
+            self.master.destroy()
 
-            self.text_display.insert(tk.END, "\n")
+    def update_csv_display(self):
+        """
+        Redraws the visible part of the grid view after many values changed at once.
+        Single edits go through grid_view.update_cell instead.
+        """
+        self.grid_view.refresh()
 
+    def cell_color(self, row, col, value):
+        """
+        Background colour of a cell in the grid view: invalid, low-confidence or
+        outlier cells are highlighted in place.
+        """
+        if self.validator.invalid[row, col]:
+            return "#ffc9c9"
+        if (row, col) in self.low_conf_indices:
+            return "#fff3bf"
+        if self.validator.outliers[row, col]:
+            return "#ffd8a8"
+        return None
 
+    def toggle_ignore_nan(self):
+        """
+        Re-checks the table when 'Ignore NaN Values' is switched.
+        """
+        if self.validator is not None:
+            self.validator.set_ignore_nan(self.ignore_nan_var.get())
+            self.update_csv_display()
 
     def is_invalid(self, value, is_first_col):
         """
         Determines whether a given CSV value is considered invalid based on rules.
         """
-        value = value.strip()
-        if value.lower() == "x" or value == "":
-            return True
-        if value.lower() == "nan" and self.ignore_nan_var.get():
-            return False
-        try:
-            if is_first_col:
-                num = int(value)
-                return not (1850 <= num <= 2025)
-            else:
-                num = float(value)
-                return not (-50 <= num <= 99)
-        except ValueError:
-            return True
+        return is_invalid_value(value, is_first_col, self.ignore_nan_var.get(), self.validator.schema)
 
     def find_outliers(self):
         """
-        Identifies outlier cells based on z-score (2 standard deviations from mean).
-        Adds their positions to outlier_indices set.
+        Recomputes the invalid and outlier flags of the whole table, after edits made
+        directly to the DataFrame. Single edits go through validator.update instead.
         """
-        self.outlier_indices.clear()
-        for col in range(1, self.current_csv.shape[1]):
-            try:
-                col_values = pd.to_numeric(self.current_csv.iloc[:, col], errors='coerce')
-                valid_vals = col_values.dropna()
-                if not valid_vals.empty:
-                    mean = valid_vals.mean()
-                    std = valid_vals.std()
-                    for row in range(len(col_values)):
-                        val = col_values.iat[row]
-                        if pd.notna(val) and abs(val - mean) > 2 * std:
-                            self.outlier_indices.add((row, col))
-            except Exception:
-                continue
+        self.validator.refresh()
+        self.grid_view.refresh()
 
     def load_next_invalid_cell(self):
         """
-        Loads the next invalid or outlier cell to be corrected by the user.
+        Loads the next invalid, low-confidence or outlier cell to be corrected by the user.
         If all are valid, it saves the file and ends the process.
         """
-        while self.row_idx < len(self.current_csv):
-            while self.col_idx < self.current_csv.shape[1]:
-                value = self.current_csv.iat[self.row_idx, self.col_idx]
-                if not self.checking_outliers:
-                    if self.is_invalid(str(value), self.col_idx == 0):
-                        self.load_cell(value)
-                        return
-                elif self.col_idx > 0 and (self.row_idx, self.col_idx) in self.outlier_indices:
-                    self.load_cell(value)
-                    return
-                self.col_idx += 1
-            self.col_idx = 0
-            self.row_idx += 1
+        position = (self.row_idx, self.col_idx)
+        if not self.checking_outliers:
+            found = [self.validator.next_invalid(position), next_position(self.low_conf_sorted, position)]
+        else:
+            found = [self.validator.next_outlier(position)]
+        found = [cell for cell in found if cell is not None]
+        if found:
+            self.row_idx, self.col_idx = min(found)
+            self.load_cell(self.current_csv.iat[self.row_idx, self.col_idx])
+            return
 
         if not self.checking_outliers:
             self.checking_outliers = True
             self.row_idx = 0
             self.col_idx = 0
-            self.find_outliers()
             self.load_next_invalid_cell()
         else:
             self.save_csv()
@@ -356,34 +434,135 @@ class OCRCheckerGUI:
         self.search_col.delete(0, tk.END)
         self.search_col.insert(0, str(self.col_idx + 1))
 
-        self.update_csv_display()
+        self.grid_view.set_current(self.row_idx, self.col_idx)
+        self.meta_label.config(text=describe_cell(self.meta, self.row_idx, self.col_idx))
 
-        img_path = os.path.join(self.table_path, f"row_{self.row_idx+1}", f"col_{self.col_idx+1}.png")
-        if os.path.exists(img_path):
-            img = cv2.imread(img_path)
-            img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-            img = cv2.resize(img, (300, 300))
+        img = self.thumbnails.get((self.table_path, self.row_idx, self.col_idx))
+        if img is not None:
             imgtk = ImageTk.PhotoImage(image=Image.fromarray(img))
             self.image_panel.configure(image=imgtk)
             self.image_panel.image = imgtk
+        if self.queue_item is not None:
+            upcoming = [(table_path, r, c) for _, table_path, r, c in self.queue.peek(PREFETCH)]
+        else:
+            upcoming = [(self.table_path, r, c) for r, c in self.upcoming_cells()]
+        self.thumbnails.prefetch(upcoming)
+        stats = self.thumbnails.stats()
+        self.cache_label.config(text=f"Thumbnails: {stats['hit_rate']:.0%} cached, {stats['mean_decode_ms']:.0f} ms per load")
+
+    def store_for(self, table_path):
+        """
+        Returns the CellStore of a table, opened once per session.
+        """
+        if table_path not in self.stores:
+            self.stores[table_path] = CellStore(table_path)
+        return self.stores[table_path]
+
+    def load_cell_image(self, key):
+        """
+        Loads one cell image for the thumbnail cache; key is (table_path, row, col).
+        """
+        table_path, row, col = key
+        return self.store_for(table_path).get_cell(row, col)
+
+    def upcoming_cells(self, n=PREFETCH):
+        """
+        Returns the next n cells in review order after the current one: flagged or
+        low-confidence cells in the first pass, outliers in the second.
+        """
+        position = (self.row_idx, self.col_idx + 1)
+        if not self.checking_outliers:
+            queues = [self.validator.invalid_index, self.low_conf_sorted]
+        else:
+            queues = [self.validator.outlier_index]
+        merged = heapq.merge(*(q[bisect_left(q, position):] for q in queues))
+        upcoming = []
+        for cell in merged:
+            if not upcoming or cell != upcoming[-1]:
+                upcoming.append(cell)
+            if len(upcoming) >= n:
+                break
+        return upcoming
 
     def confirm_cell(self):
         """
         Saves the current input value into the current cell and proceeds to the next.
         """
         value = self.current_text.get()
-        self.current_csv.iat[self.row_idx, self.col_idx] = "" if value.strip().lower() in {"x", "nan"} else value
-        self.col_idx += 1
-        self.load_next_invalid_cell()
+        self.set_value("" if value.strip().lower() in {"x", "nan"} else value)
+        self.advance()
 
     def clear_cell(self):
         """
         Clears the value of the current cell and proceeds to the next one.
         """
-        self.current_csv.iat[self.row_idx, self.col_idx] = ""
+        self.set_value("")
+        self.advance()
+
+    def advance(self):
+        """
+        Moves on after a cell was resolved: to the next queue item in queue mode,
+        otherwise to the next flagged cell of the table.
+        """
+        if self.queue_item is not None:
+            self.queue.finish(self.queue_item)
+            self.next_queue_item()
+            return
         self.col_idx += 1
         self.load_next_invalid_cell()
 
+    def set_value(self, value):
+        """
+        Writes a value into the current cell, updating its flags and the column's
+        outliers, and redraws only that column of the grid view.
+        """
+        self.journal.append([self.edit_record(self.row_idx, self.col_idx, value)])
+        self.validator.update(self.row_idx, self.col_idx, value)
+        self.grid_view.redraw_column(self.col_idx)
+
+    def edit_record(self, row, col, value):
+        """
+        Returns the journal record for setting a cell of the current table to value.
+        """
+        def plain(v):
+            return None if pd.isna(v) or str(v) == "" else str(v)
+        return {"csv": self.current_csv_path(), "row": row, "col": col,
+                "old": plain(self.current_csv.iat[row, col]), "new": plain(value)}
+
+    def apply_edits(self, edits):
+        """
+        Applies journal edits returned by undo/redo to the loaded tables and moves to
+        the last cell changed (leaving the review queue).
+        """
+        if not edits:
+            return
+        self.leave_queue()
+        for e in edits:
+            month, dtype, _, csv_filename = os.path.relpath(e["csv"], BASE_DIR).split(os.sep)
+            self.open_table(month, dtype, csv_filename)
+            self.validator.update(e["row"], e["col"], np.nan if e["new"] is None else e["new"])
+        self.find_outliers()
+        self.row_idx, self.col_idx = edits[-1]["row"], edits[-1]["col"]
+        self.load_cell(self.current_csv.iat[self.row_idx, self.col_idx])
+
+    def undo(self):
+        self.apply_edits(self.journal.undo())
+
+    def redo(self):
+        self.apply_edits(self.journal.redo())
+
+    def next_low_confidence_cell(self):
+        """
+        Jumps to the next cell (after the current one) whose OCR confidence was low.
+        """
+        if not self.low_conf_indices:
+            messagebox.showinfo("Low Confidence", "No low-confidence cells in this table.")
+            return
+        self.leave_queue()
+        after = sorted(cell for cell in self.low_conf_indices if cell > (self.row_idx, self.col_idx))
+        self.row_idx, self.col_idx = after[0] if after else min(self.low_conf_indices)
+        self.load_cell(self.current_csv.iat[self.row_idx, self.col_idx])
+
     def goto_cell(self):
         """
         Moves to a specific cell based on user-provided row and column numbers.
@@ -393,6 +572,7 @@ class OCRCheckerGUI:
             col = int(self.search_col.get()) - 1
             if row < 0 or col < 0 or row >= len(self.current_csv) or col >= self.current_csv.shape[1]:
                 raise ValueError("Out of bounds")
+            self.leave_queue()
             self.row_idx = row
             self.col_idx = col
             self.load_cell(self.current_csv.iat[row, col])
@@ -401,11 +581,12 @@ class OCRCheckerGUI:
 
     def save_csv(self):
         """
-        Saves the current in-memory DataFrame back to CSV format.
+        Folds the edit journal into the CSVs now, instead of waiting for the
+        background compaction. Only the edited cells are written, with the table
+        locked while it is rewritten, so other reviewers' edits to it are kept.
         """
-        save_path = os.path.join(BASE_DIR, self.month, self.dtype, "csv_output", self.csv_filename)
-        self.current_csv.to_csv(save_path, index=False, header=False)
-        messagebox.showinfo("Saved", f"CSV saved to: {save_path}")
+        n = self.journal.compact()
+        self.save_label.config(text=f"Saved {n} edits at {time.strftime('%H:%M:%S')}" if n else "All edits saved")
 
 if __name__ == "__main__":
     root = tk.Tk()
@@ -0,0 +1,240 @@
+import argparse
+import json
+import os
+import time
+import cv2
+import numpy as np
+
+from grid_detection import line_masks
+
+# === SETTINGS ===
+REPORT_NAME = "grid_check.json"
+BAND = 0.2                  # fraction of the cell size looked at on each side of a grid line
+CLEARANCE = 0.05            # fraction of the cell size next to every line that is ignored (ruling remnants)
+MIN_CUT = 0.15              # fraction of a cell's width with ink on both sides of a line that counts as a cut
+SUSPECT_CELLS = 0.25        # fraction of the cells along one line that must be cut before it is reported
+MAX_SHIFT = 0.3             # suggested shifts stay within this fraction of the median cell size
+# Until the thresholds above have been calibrated on known-good grids
+# (python grid_check.py --calibrate ...), a failed check only warns and
+# batch_ocr.py still OCRs the page
+BLOCKS_OCR = False
+
+
+def handwriting_mask(page):
+
+    """
+    Returns a boolean mask of the handwriting on a page: Otsu ink minus the ruling
+    lines (grid_detection.line_masks). The line masks are dilated well beyond the
+    printed stroke, so the ragged, slightly skewed edges the adaptive threshold
+    leaves around a line are not mistaken for handwriting.
+    """
+
+    gray = page if page.ndim == 2 else cv2.cvtColor(page, cv2.COLOR_BGR2GRAY)
+    _, ink = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    horizontal, vertical = line_masks(page)
+    horizontal = cv2.dilate(horizontal, np.ones((7, 3), np.uint8))
+    vertical = cv2.dilate(vertical, np.ones((3, 7), np.uint8))
+    return (ink > 0) & (cv2.bitwise_or(horizontal, vertical) == 0)
+
+
+def cut_fractions(ink, lines, cross_lines):
+
+    """
+    Measures the interior lines of one axis on a mask whose rows run along that axis
+    (the page mask for row lines, its transpose for column lines). For every line and
+    cell along it, returns the fraction of the cell's width that has ink both just
+    above and just below the line, as a (lines, cells) array. The bands on each side
+    scale with the median cell size and skip CLEARANCE next to the line; pixel columns
+    close to a crossing line are ignored, since a crossing is not handwriting. All
+    lines are measured at once with one gather over the mask.
+    """
+
+    interior = np.asarray(lines[1:-1], np.int64)
+    starts = np.asarray(cross_lines[:-1], np.int64)
+    widths = np.diff(np.asarray(cross_lines, np.int64))
+    if interior.size == 0 or starts.size == 0:
+        return np.zeros((interior.size, starts.size))
+    h, w = ink.shape
+    cell = float(np.median(np.diff(lines)))
+    gap = max(int(cell * CLEARANCE), 1)
+    band = max(int(cell * BAND), gap + 2)
+    above = ink[np.clip(interior[:, None] - np.arange(gap, band), 0, h - 1)].any(axis=1)
+    below = ink[np.clip(interior[:, None] + np.arange(gap, band), 0, h - 1)].any(axis=1)
+    cut = above & below                                                # (lines, width)
+
+    cross_gap = max(int(float(np.median(widths)) * CLEARANCE), 1)
+    near_cross = np.zeros(w, bool)
+    for x in cross_lines:
+        near_cross[max(x - cross_gap, 0):x + cross_gap + 1] = True
+    cut[:, near_cross] = False
+
+    counts = np.add.reduceat(cut.astype(np.int32), starts, axis=1)     # (lines, cells along the line)
+    return counts / np.maximum(widths - 2 * cross_gap, 1)
+
+
+def check_axis(ink, lines, cross_lines):
+
+    """
+    Checks the interior lines of one axis (see cut_fractions). A cell is cut by a line
+    if at least MIN_CUT of its width has ink on both sides; a line is suspect once
+    SUSPECT_CELLS of its cells are cut. Returns a list of {line, position, cut_cells,
+    suggested} for the suspect lines, where cut_cells are cell indices along the line
+    and suggested is a nearby position with less ink under it (or None).
+    """
+
+    fractions = cut_fractions(ink, lines, cross_lines)
+    if fractions.size == 0:
+        return []
+    interior = np.asarray(lines[1:-1], np.int64)
+    cut = fractions >= MIN_CUT
+    needed = max(int(np.ceil(cut.shape[1] * SUSPECT_CELLS)), 2)
+    suspect = np.flatnonzero(cut.sum(axis=1) >= needed)
+
+    h = ink.shape[0]
+    max_shift = max(int(np.median(np.diff(lines)) * MAX_SHIFT), 1)
+    window = np.arange(-max_shift, max_shift + 1)
+    profiles = ink[np.clip(interior[suspect, None] + window, 0, h - 1)].sum(axis=2)
+    # Least ink wins; ties go to the smallest shift
+    best = np.argmin(profiles * (2 * max_shift + 1) + np.abs(window), axis=1)
+
+    problems = []
+    for k, i in enumerate(suspect):
+        shift = int(window[best[k]])
+        problems.append({
+            "line": int(i) + 1,
+            "position": int(interior[i]),
+            "cut_cells": [int(c) for c in np.flatnonzero(cut[i])],
+            "suggested": int(interior[i]) + shift if shift and profiles[k, best[k]] < profiles[k, max_shift] else None,
+        })
+    return problems
+
+
+def check_grid(page, row_lines, col_lines):
+
+    """
+    Checks a grid (full lines, page edges included) against its rotated page for
+    lines that cut through handwriting, before any OCR is paid for. Returns a report
+    dict: ok, the suspect row and column lines (indices into row_lines/col_lines),
+    and the seconds the check took.
+    """
+
+    start = time.perf_counter()
+    ink = handwriting_mask(page)
+    rows = check_axis(ink, row_lines, col_lines)
+    cols = check_axis(ink.T, col_lines, row_lines)
+    return {"ok": not rows and not cols, "rows": rows, "cols": cols,
+            "seconds": round(time.perf_counter() - start, 3)}
+
+
+def describe(report):
+
+    """
+    Returns the report as printable lines (cells are 1-based like the checker).
+    """
+
+    out = []
+    for axis, name in (("rows", "Row"), ("cols", "Column")):
+        for p in report[axis]:
+            hint = f", try {p['suggested']}" if p["suggested"] is not None else ""
+            out.append(f"   ✂️ {name} line {p['line']} at {p['position']} cuts {len(p['cut_cells'])} cells{hint}")
+    return out
+
+
+def save_report(table_path, report):
+    with open(os.path.join(table_path, REPORT_NAME), "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=1)
+
+
+def load_report(table_path):
+
+    """
+    Returns the grid check report saved for a table, or None if it was never checked.
+    """
+
+    path = os.path.join(table_path, REPORT_NAME)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def check_table(table_path):
+
+    """
+    Checks the saved grid of a table and saves the report in its folder. Returns the
+    report, or None if the table has no grid or its page image is missing.
+    """
+
+    # Imported here: segmentation runs the check itself after cropping
+    from segmentation import load_grid, load_rotated_page
+
+    grid = load_grid(table_path)
+    page = load_rotated_page(grid) if grid else None
+    if page is None:
+        return None
+    report = check_grid(page, grid["row_lines"], grid["col_lines"])
+    save_report(table_path, report)
+    return report
+
+
+def calibrate(tables):
+
+    """
+    Measures known-good grids (tables whose grid was checked by hand) and prints, per
+    axis, how many cells their lines cut at the current MIN_CUT and the smallest
+    SUSPECT_CELLS that would pass all of them, so the thresholds can be set before
+    BLOCKS_OCR is turned on. Returns the worst cut-cell fraction per axis.
+    """
+
+    # Imported here: segmentation runs the check itself after cropping
+    from segmentation import load_grid, load_rotated_page
+
+    worst = {"rows": [], "cols": []}
+    for table_path in tables:
+        grid = load_grid(table_path)
+        page = load_rotated_page(grid) if grid else None
+        if page is None:
+            print(f"❌ {table_path}: no grid or page image")
+            continue
+        ink = handwriting_mask(page)
+        for axis, mask, lines, cross in (("rows", ink, grid["row_lines"], grid["col_lines"]),
+                                         ("cols", ink.T, grid["col_lines"], grid["row_lines"])):
+            fractions = cut_fractions(mask, lines, cross)
+            if fractions.size:
+                worst[axis].append(float((fractions >= MIN_CUT).mean(axis=1).max()))
+
+    result = {}
+    for axis, values in worst.items():
+        if not values:
+            continue
+        result[axis] = max(values)
+        print(f"{axis}: cut cells per line on good grids - median {np.median(values):.2f}, "
+              f"max {max(values):.2f} (SUSPECT_CELLS is {SUSPECT_CELLS})")
+    if result:
+        print(f"➡️ SUSPECT_CELLS must be above {max(result.values()):.2f} for these grids to pass")
+    return result
+
+
+if __name__ == "__main__":
+    from cell_store import find_gridded_tables
+
+    parser = argparse.ArgumentParser(description="Find grid lines that cut through handwriting, without any OCR.")
+    parser.add_argument("tables", nargs="*", help="table folders (default: every gridded table)")
+    parser.add_argument("--month")
+    parser.add_argument("--type", choices=["max", "min", "precipitation"])
+    parser.add_argument("--calibrate", action="store_true", help="the tables have known-good grids: measure them "
+                                                                 "to set the thresholds instead of checking")
+    args = parser.parse_args()
+
+    tables = args.tables or find_gridded_tables(month=args.month, data_type=args.type)
+    if args.calibrate:
+        calibrate(tables)
+    else:
+        for table_path in tables:
+            report = check_table(table_path)
+            if report is None:
+                print(f"❌ {table_path}: no grid or page image")
+                continue
+            print(f"{'✅' if report['ok'] else '⚠️'} {table_path} ({report['seconds']:.2f}s)")
+            for line in describe(report):
+                print(line)
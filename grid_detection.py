@@ -0,0 +1,134 @@
+import argparse
+import os
+import cv2
+import numpy as np
+
+# === SETTINGS ===
+KERNEL_FRACTION = 1 / 40    # morphological kernel length, as a fraction of the page width/height
+LINE_COVERAGE = 0.3         # a ruling line must span at least this fraction of the page
+MIN_SPACING = 0.012         # lines closer than this fraction of the page are merged
+SPACING_TOLERANCE = 0.35    # gaps within this much of the median gap count as regular
+AUTO_ACCEPT = 0.75          # confidence above which the detected grid is used without review
+
+
+def line_masks(img):
+
+    """
+    Returns (horizontal, vertical) uint8 masks of the long straight strokes in a page:
+    the ink is binarized adaptively, then opened with a long thin kernel along each
+    axis so only ruling lines survive (handwriting is far shorter than the kernel).
+    """
+
+    gray = img if img.ndim == 2 else cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    ink = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY_INV, 31, 15)
+    h, w = ink.shape
+    horizontal = cv2.morphologyEx(ink, cv2.MORPH_OPEN,
+                                  cv2.getStructuringElement(cv2.MORPH_RECT, (max(int(w * KERNEL_FRACTION), 1), 1)))
+    vertical = cv2.morphologyEx(ink, cv2.MORPH_OPEN,
+                                cv2.getStructuringElement(cv2.MORPH_RECT, (1, max(int(h * KERNEL_FRACTION), 1))))
+    return horizontal, vertical
+
+
+def find_lines(profile, min_gap):
+
+    """
+    Finds ruling lines in a projection profile (fraction of the page each pixel row
+    or column is covered by line strokes). Every run above LINE_COVERAGE becomes one
+    line at its weighted centre; lines closer than min_gap keep the stronger one.
+    Returns (positions, strengths).
+    """
+
+    above = np.concatenate(([0], (profile >= LINE_COVERAGE).astype(np.int8), [0]))
+    edges = np.diff(above)
+    starts, ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+    positions, strengths = [], []
+    for s, e in zip(starts, ends):
+        weights = profile[s:e]
+        pos = int(round(np.average(np.arange(s, e), weights=weights)))
+        strength = float(weights.max())
+        if positions and pos - positions[-1] < min_gap:
+            if strength > strengths[-1]:
+                positions[-1], strengths[-1] = pos, strength
+            continue
+        positions.append(pos)
+        strengths.append(strength)
+    return positions, strengths
+
+
+def axis_confidence(positions, strengths):
+
+    """
+    Scores the lines found along one axis between 0 and 1: the share of gaps close
+    to the median gap (printed ledgers are ruled evenly, apart from a wider first
+    column or header) times how far across the page the median line reaches.
+    """
+
+    if len(positions) < 3:
+        return 0.0
+    gaps = np.diff(positions)
+    median = np.median(gaps)
+    regular = np.mean(np.abs(gaps - median) <= SPACING_TOLERANCE * median)
+    return float(regular * min(1.0, np.median(strengths)))
+
+
+def detect_grid(img):
+
+    """
+    Proposes the ruling lines of a (deskewed) page. Returns a dict with row_lines and
+    col_lines (interior lines only, like the ones drawn by hand) and a confidence
+    between 0 and 1, the lower of the two axis scores.
+    """
+
+    h, w = img.shape[:2]
+    horizontal, vertical = line_masks(img)
+    row_profile = np.count_nonzero(horizontal, axis=1) / w
+    col_profile = np.count_nonzero(vertical, axis=0) / h
+
+    rows, row_strengths = find_lines(row_profile, MIN_SPACING * h)
+    cols, col_strengths = find_lines(col_profile, MIN_SPACING * w)
+    row_conf = axis_confidence(rows, row_strengths)
+    col_conf = axis_confidence(cols, col_strengths)
+    return {
+        "row_lines": [y for y in rows if 0 < y < h],
+        "col_lines": [x for x in cols if 0 < x < w],
+        "confidence": min(row_conf, col_conf),
+        "row_confidence": row_conf,
+        "col_confidence": col_conf,
+    }
+
+
+if __name__ == "__main__":
+    # Imported here: batch_ocr pulls in the whole GUI/OCR stack, which the detector itself doesn't need
+    from app import OUTPUT_ROOT, get_output_folder
+    from batch_ocr import DATA_TYPES, find_pages
+    from deskew import cached_skew
+    from preprocessing import chain_for
+    from segmentation import GRID_FILE, rotate_image, start_segmentation
+
+    parser = argparse.ArgumentParser(description="Detect grids for every page that doesn't have one yet.")
+    parser.add_argument("--month", action="append", help="only this month (repeatable)")
+    parser.add_argument("--type", action="append", choices=DATA_TYPES, help="only this data type (repeatable)")
+    parser.add_argument("--min-confidence", type=float, default=AUTO_ACCEPT)
+    parser.add_argument("--dry-run", action="store_true", help="only report the confidence of each page")
+    args = parser.parse_args()
+
+    for page in find_pages(months=args.month, data_types=args.type):
+        name = f"{page['month']}/{page['data_type']}/table_{page['table_number']}"
+        # Not get_output_folder yet: it creates the folder, and a dry run must not
+        table_path = os.path.join(OUTPUT_ROOT, page["month"], page["data_type"], f"table_{page['table_number']}")
+        if os.path.exists(os.path.join(table_path, GRID_FILE)):
+            print(f"⏭️ {name}: already has a grid")
+            continue
+        if args.dry_run:
+            # Deskewed like the headless run below, so the confidence is the one it will see
+            img = cv2.imread(page["image_path"])
+            grid = (detect_grid(rotate_image(img, cached_skew(page["image_path"], img))) if img is not None
+                    else {"confidence": 0.0, "row_lines": [], "col_lines": []})
+            print(f"🔎 {name}: {len(grid['row_lines'])} rows, {len(grid['col_lines'])} cols, "
+                  f"confidence {grid['confidence']:.2f}")
+            continue
+        table_path = get_output_folder(page["month"], page["data_type"], page["table_number"])
+        ok = start_segmentation(page["image_path"], table_path, chain=chain_for(page["month"], page["data_type"]),
+                                headless=True, min_confidence=args.min_confidence)
+        print(f"✅ {name}: grid saved" if ok else f"✋ {name}: needs manual review")
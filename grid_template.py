@@ -0,0 +1,221 @@
+import argparse
+import json
+import math
+import os
+from functools import lru_cache
+import cv2
+import numpy as np
+
+from segmentation import GRID_FILE, load_grid, rotation_matrix
+
+# === SETTINGS ===
+TEMPLATE_DIR = os.path.join("output", "grid_templates")
+REGISTER_WIDTH = 1200       # pages are registered at this width, then the transform is scaled back up
+ORB_FEATURES = 5000
+MIN_INLIERS = 40            # feature matches needed before trusting the transform
+GOOD_INLIERS = 200          # inliers at which the transfer counts as fully confident
+TEMPLATE_ACCEPT = 0.5       # below this the template is not used and the grid is detected on the page instead
+FALLBACK_CONFIDENCE = 0.2   # ceiling for the translation-only fallback, which cannot see rotation or scale
+
+
+def template_path(name):
+    return os.path.join(TEMPLATE_DIR, f"{name}.json")
+
+
+def save_template(table_path, name):
+
+    """
+    Saves the grid of a segmented table as a named template (e.g. "april_max") so
+    the other pages of the same ledger can reuse it. Returns the template path,
+    or None if the table has no saved grid.
+    """
+
+    grid = load_grid(table_path)
+    if grid is None:
+        return None
+    os.makedirs(TEMPLATE_DIR, exist_ok=True)
+    path = template_path(name)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(dict(grid, source_table=table_path), f, indent=1)
+    return path
+
+
+def load_template(name):
+
+    """
+    Returns a saved template, or None if there is none with that name.
+    """
+
+    path = template_path(name)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def downscale(img):
+    gray = img if img.ndim == 2 else cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    scale = min(1.0, REGISTER_WIDTH / gray.shape[1])
+    return cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA), scale
+
+
+@lru_cache(maxsize=8)
+def template_features(image_path):
+
+    """
+    Returns (keypoints, descriptors, scale, shape) of a template page, computed once
+    per page so a whole ledger can be registered against it cheaply.
+    """
+
+    img = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+    if img is None:
+        return None
+    small, scale = downscale(img)
+    keypoints, descriptors = cv2.ORB_create(ORB_FEATURES).detectAndCompute(small, None)
+    return keypoints, descriptors, scale, img.shape
+
+
+def estimate_transform(template_image_path, page):
+
+    """
+    Estimates the similarity transform (rotation, uniform scale, translation) that
+    maps the template page onto `page`, by ORB feature matching and RANSAC on
+    downscaled copies. Falls back to phase correlation (translation only) if too few
+    features match; that estimate is never more than FALLBACK_CONFIDENCE, so it
+    cannot pass TEMPLATE_ACCEPT. Returns (2x3 matrix in full-resolution pixels,
+    confidence 0..1), or (None, 0.0) if the template page is missing.
+    """
+
+    features = template_features(template_image_path)
+    if features is None:
+        return None, 0.0
+    t_keypoints, t_descriptors, t_scale, t_shape = features
+    small, scale = downscale(page)
+
+    matrix, inliers = None, 0
+    keypoints, descriptors = cv2.ORB_create(ORB_FEATURES).detectAndCompute(small, None)
+    if descriptors is not None and t_descriptors is not None:
+        matches = cv2.BFMatcher(cv2.NORM_HAMMING, crossCheck=True).match(t_descriptors, descriptors)
+        if len(matches) >= MIN_INLIERS:
+            src = np.float32([t_keypoints[m.queryIdx].pt for m in matches])
+            dst = np.float32([keypoints[m.trainIdx].pt for m in matches])
+            matrix, mask = cv2.estimateAffinePartial2D(src, dst, method=cv2.RANSAC, ransacReprojThreshold=3.0)
+            inliers = int(mask.sum()) if mask is not None else 0
+
+    if matrix is None or inliers < MIN_INLIERS:
+        # Translation only, on pages brought to the same size
+        t_small = cv2.resize(cv2.imread(template_image_path, cv2.IMREAD_GRAYSCALE), (small.shape[1], small.shape[0]),
+                             interpolation=cv2.INTER_AREA)
+        (dx, dy), response = cv2.phaseCorrelate(np.float32(t_small), np.float32(small))
+        sx, sy = small.shape[1] / (t_shape[1] * t_scale), small.shape[0] / (t_shape[0] * t_scale)
+        matrix = np.array([[sx, 0, dx], [0, sy, dy]], np.float64)
+        confidence = float(min(FALLBACK_CONFIDENCE, max(response, 0.0)))
+    else:
+        confidence = min(1.0, inliers / GOOD_INLIERS)
+
+    # Undo the downscaling: full-res template -> small template -> small page -> full-res page
+    to_small = np.diag([t_scale, t_scale, 1.0])
+    from_small = np.diag([1 / scale, 1 / scale, 1.0])
+    full = from_small @ np.vstack([matrix, [0, 0, 1]]) @ to_small
+    return full[:2], confidence
+
+
+def to_3x3(matrix):
+    return np.vstack([matrix, [0, 0, 1]])
+
+
+def transfer_grid(template, page):
+
+    """
+    Maps a template's grid onto a new page. The page is rotated so that its table is
+    as upright as the template's, and every line is carried over through the
+    registration transform. Returns a proposal for start_segmentation (rotation_angle,
+    interior row_lines/col_lines, confidence), or None if the template page is missing.
+    """
+
+    matrix, confidence = estimate_transform(template["image_path"], page)
+    if matrix is None:
+        return None
+
+    t_shape = template_features(template["image_path"])[3]
+    # Rotation the registration adds, in rotate_image's convention (counter-clockwise degrees)
+    phi = math.degrees(math.atan2(matrix[1, 0], matrix[0, 0]))
+    angle = template["rotation_angle"] + phi
+
+    # rotated template -> template -> page -> rotated page; what is left is scale + shift
+    combined = (to_3x3(rotation_matrix(page.shape, angle)) @ to_3x3(matrix)
+                @ np.linalg.inv(to_3x3(rotation_matrix(t_shape, template["rotation_angle"]))))
+    h, w = page.shape[:2]
+    row_lines = [int(round(combined[1, 1] * y + combined[1, 2])) for y in template["row_lines"][1:-1]]
+    col_lines = [int(round(combined[0, 0] * x + combined[0, 2])) for x in template["col_lines"][1:-1]]
+    return {
+        "rotation_angle": round(angle, 3),
+        "row_lines": [y for y in row_lines if 0 < y < h],
+        "col_lines": [x for x in col_lines if 0 < x < w],
+        "confidence": confidence,
+    }
+
+
+def propose_from_template(name, image_path, min_confidence=TEMPLATE_ACCEPT):
+
+    """
+    Returns the grid proposal for a page from the named template, or None if the
+    template or either page image is missing, or if the registration is less
+    confident than min_confidence (the caller then detects the grid on the page).
+    """
+
+    template = load_template(name)
+    page = cv2.imread(image_path) if template else None
+    if page is None:
+        return None
+    proposal = transfer_grid(template, page)
+    if proposal is not None and proposal["confidence"] < min_confidence:
+        print(f"⚠️ Template {name} does not register onto this page "
+              f"(confidence {proposal['confidence']:.2f}), detecting the grid instead")
+        return None
+    return proposal
+
+
+if __name__ == "__main__":
+    # Imported here: batch_ocr pulls in the whole GUI/OCR stack
+    from app import get_output_folder
+    from batch_ocr import DATA_TYPES, find_pages
+    from preprocessing import chain_for
+    from grid_detection import AUTO_ACCEPT
+    from segmentation import start_segmentation
+
+    parser = argparse.ArgumentParser(description="Save a table's grid as a template, or transfer templates to pages without a grid.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    save = sub.add_parser("save", help="save the grid of one table as the template of its ledger")
+    save.add_argument("month")
+    save.add_argument("type", choices=DATA_TYPES)
+    save.add_argument("table_number")
+    save.add_argument("--name", help="template name (default <month>_<type>)")
+    apply = sub.add_parser("apply", help="grid every page without a grid from its ledger's template")
+    apply.add_argument("--month", action="append", help="only this month (repeatable)")
+    apply.add_argument("--type", action="append", choices=DATA_TYPES, help="only this data type (repeatable)")
+    apply.add_argument("--name", help="use this template for every page instead of <month>_<type>")
+    apply.add_argument("--min-confidence", type=float, default=AUTO_ACCEPT)
+    args = parser.parse_args()
+
+    if args.command == "save":
+        path = save_template(get_output_folder(args.month, args.type, args.table_number),
+                             args.name or f"{args.month}_{args.type}")
+        print(f"✅ Template saved: {path}" if path else "❌ That table has no saved grid.")
+    else:
+        for page in find_pages(months=args.month, data_types=args.type):
+            name = f"{page['month']}/{page['data_type']}/table_{page['table_number']}"
+            table_path = get_output_folder(page["month"], page["data_type"], page["table_number"])
+            if os.path.exists(os.path.join(table_path, GRID_FILE)):
+                print(f"⏭️ {name}: already has a grid")
+                continue
+            template = args.name or f"{page['month']}_{page['data_type']}"
+            if load_template(template) is None:
+                print(f"❌ {name}: no template for this ledger")
+                continue
+            # Below TEMPLATE_ACCEPT the proposal is None and the grid is detected on the deskewed page
+            proposal = propose_from_template(template, page["image_path"])
+            ok = start_segmentation(page["image_path"], table_path, chain=chain_for(page["month"], page["data_type"]),
+                                    headless=True, min_confidence=args.min_confidence, proposal=proposal)
+            how = "transferred" if proposal else "detected"
+            print(f"✅ {name}: grid {how}" if ok else f"✋ {name}: needs manual review (grid {how})")
@@ -0,0 +1,237 @@
+import tkinter as tk
+
+# === SETTINGS ===
+ROW_HEIGHT = 22
+COL_WIDTH = 64
+HEADER_WIDTH = 72           # the "Row n" column on the left
+FONT = ("TkFixedFont", 10)
+CURRENT_ROW_COLOR = "#dbe8ff"
+HEADER_COLOR = "#eeeeee"
+
+
+class TableGridView(tk.Frame):
+
+    """
+    A scrollable view of a DataFrame drawn on a Canvas. Only the cells inside the
+    visible window have canvas items; scrolling hands the items of cells that left
+    the window to the ones that entered it. Changing a value or moving the current
+    cell touches only the items involved, so the cost of a keystroke does not grow
+    with the table.
+
+    style(row, col, value) returns the background colour of a cell (None for
+    plain white); on_click(row, col) is called when a cell is clicked.
+    """
+
+    def __init__(self, master, style=None, on_click=None, width=800, height=400):
+        super().__init__(master)
+        self.style = style or (lambda r, c, value: None)
+        self.on_click = on_click
+        self.table = None
+        self.current = (0, 0)
+        self.items = {}         # (row, col) -> (rect, text); col -1 is the row header
+        self.free = []          # items of cells scrolled out of view, ready for reuse
+
+        self.canvas = tk.Canvas(self, width=width, height=height, bg="white", highlightthickness=0)
+        self.canvas.grid(row=0, column=0, sticky="nsew")
+        y_scrollbar = tk.Scrollbar(self, orient="vertical", command=self.yview)
+        y_scrollbar.grid(row=0, column=1, sticky="ns")
+        x_scrollbar = tk.Scrollbar(self, orient="horizontal", command=self.xview)
+        x_scrollbar.grid(row=1, column=0, sticky="ew")
+        self.canvas.config(yscrollcommand=y_scrollbar.set, xscrollcommand=x_scrollbar.set)
+        self.grid_rowconfigure(0, weight=1)
+        self.grid_columnconfigure(0, weight=1)
+
+        # One outline for the current cell, moved rather than redrawn
+        self.cursor = self.canvas.create_rectangle(0, 0, 0, 0, outline="red", width=2, state="hidden")
+
+        self.canvas.bind("<Configure>", lambda e: self.render())
+        self.canvas.bind("<Button-1>", self.handle_click)
+        self.canvas.bind("<MouseWheel>", lambda e: self.yview("scroll", -1 if e.delta > 0 else 1, "units"))
+        self.canvas.bind("<Button-4>", lambda e: self.yview("scroll", -1, "units"))
+        self.canvas.bind("<Button-5>", lambda e: self.yview("scroll", 1, "units"))
+
+    def set_table(self, table):
+
+        """
+        Shows a new table (a DataFrame, read through .iat, so in-place edits are seen
+        by update_cell and refresh).
+        """
+
+        self.table = table
+        for cell in list(self.items):
+            self.release(cell)
+        rows, cols = table.shape
+        self.canvas.config(scrollregion=(0, 0, HEADER_WIDTH + cols * COL_WIDTH, rows * ROW_HEIGHT),
+                           yscrollincrement=ROW_HEIGHT, xscrollincrement=COL_WIDTH)
+        self.canvas.yview_moveto(0)
+        self.canvas.xview_moveto(0)
+        self.current = (0, 0)
+        self.render()
+
+    def yview(self, *args):
+        self.canvas.yview(*args)
+        self.render()
+
+    def xview(self, *args):
+        self.canvas.xview(*args)
+        self.render()
+
+    def visible_range(self):
+
+        """
+        Returns (first row, last row + 1, first col, last col + 1) of the cells in view.
+        """
+
+        rows, cols = self.table.shape
+        top, left = self.canvas.canvasy(0), self.canvas.canvasx(0)
+        bottom = top + self.canvas.winfo_height()
+        right = left + self.canvas.winfo_width()
+        r0, r1 = max(int(top // ROW_HEIGHT), 0), min(int(bottom // ROW_HEIGHT) + 1, rows)
+        c0 = max(int((left - HEADER_WIDTH) // COL_WIDTH), 0)
+        c1 = min(int((right - HEADER_WIDTH) // COL_WIDTH) + 1, cols)
+        return r0, r1, c0, c1
+
+    def release(self, cell):
+        rect, text = self.items.pop(cell)
+        self.canvas.itemconfigure(rect, state="hidden")
+        self.canvas.itemconfigure(text, state="hidden")
+        self.free.append((rect, text))
+
+    def render(self):
+
+        """
+        Brings the canvas items in line with the visible window: cells that scrolled
+        out give their items back, cells that scrolled in take one and are drawn.
+        """
+
+        if self.table is None:
+            return
+        r0, r1, c0, c1 = self.visible_range()
+        wanted = {(r, c) for r in range(r0, r1) for c in range(c0, c1)}
+        wanted.update((r, -1) for r in range(r0, r1))
+        for cell in [cell for cell in self.items if cell not in wanted]:
+            self.release(cell)
+        for cell in wanted:
+            if cell not in self.items:
+                if self.free:
+                    self.items[cell] = self.free.pop()
+                else:
+                    self.items[cell] = (self.canvas.create_rectangle(0, 0, 0, 0, outline="#cccccc"),
+                                        self.canvas.create_text(0, 0, anchor="w", font=FONT))
+                self.draw(*cell)
+        # Keep the row headers in place while scrolling sideways
+        left = self.canvas.canvasx(0)
+        for r in range(r0, r1):
+            self.place(r, -1, left)
+        self.canvas.tag_raise(self.cursor)
+
+    def place(self, row, col, left=0):
+        rect, text = self.items[(row, col)]
+        x0 = left if col < 0 else HEADER_WIDTH + col * COL_WIDTH
+        x1 = x0 + (HEADER_WIDTH if col < 0 else COL_WIDTH)
+        y0 = row * ROW_HEIGHT
+        self.canvas.coords(rect, x0, y0, x1, y0 + ROW_HEIGHT)
+        self.canvas.coords(text, x0 + 4, y0 + ROW_HEIGHT // 2)
+        if col < 0:
+            self.canvas.tag_raise(rect)
+            self.canvas.tag_raise(text)
+
+    def draw(self, row, col):
+
+        """
+        Draws one cell (or, with col -1, one row header) into its canvas items.
+        """
+
+        rect, text = self.items[(row, col)]
+        if col < 0:
+            label = f"➡ Row {row + 1}" if row == self.current[0] else f"Row {row + 1}"
+            fill = CURRENT_ROW_COLOR if row == self.current[0] else HEADER_COLOR
+            self.place(row, col, self.canvas.canvasx(0))
+        else:
+            value = self.table.iat[row, col]
+            label = "" if value is None or value != value else str(value)   # NaN shows as empty
+            fill = self.style(row, col, value) or (CURRENT_ROW_COLOR if row == self.current[0] else "white")
+            self.place(row, col)
+        self.canvas.itemconfigure(rect, fill=fill, state="normal")
+        self.canvas.itemconfigure(text, text=label, state="normal")
+
+    def update_cell(self, row, col):
+
+        """
+        Redraws one cell after its value changed; a no-op if it is out of view.
+        """
+
+        if (row, col) in self.items:
+            self.draw(row, col)
+
+    def redraw_row(self, row):
+        for cell in self.items:
+            if cell[0] == row:
+                self.draw(*cell)
+
+    def redraw_column(self, col):
+
+        """
+        Redraws the visible cells of a column, e.g. after an edit moved its outliers.
+        """
+
+        for cell in self.items:
+            if cell[1] == col:
+                self.draw(*cell)
+
+    def refresh(self):
+
+        """
+        Redraws the visible cells, e.g. after many values or the colouring rules changed.
+        """
+
+        for cell in self.items:
+            self.draw(*cell)
+
+    def set_current(self, row, col):
+
+        """
+        Moves the current-cell marker, redrawing only the old and new current rows,
+        and scrolls the cell into view if needed.
+        """
+
+        old_row = self.current[0]
+        self.current = (row, col)
+        if old_row != row:
+            self.redraw_row(old_row)
+            self.redraw_row(row)
+        self.see(row, col)
+        x0, y0 = HEADER_WIDTH + col * COL_WIDTH, row * ROW_HEIGHT
+        self.canvas.coords(self.cursor, x0, y0, x0 + COL_WIDTH, y0 + ROW_HEIGHT)
+        self.canvas.itemconfigure(self.cursor, state="normal")
+        self.canvas.tag_raise(self.cursor)
+
+    def see(self, row, col):
+
+        """
+        Scrolls the minimum needed for a cell to be fully visible.
+        """
+
+        rows, cols = self.table.shape
+        top, left = self.canvas.canvasy(0), self.canvas.canvasx(0)
+        height, width = self.canvas.winfo_height(), self.canvas.winfo_width()
+        y0, x0 = row * ROW_HEIGHT, HEADER_WIDTH + col * COL_WIDTH
+        moved = False
+        if y0 < top or y0 + ROW_HEIGHT > top + height:
+            self.canvas.yview_moveto(max(y0 - height // 2, 0) / (rows * ROW_HEIGHT))
+            moved = True
+        if x0 - HEADER_WIDTH < left or x0 + COL_WIDTH > left + width:
+            self.canvas.xview_moveto(max(x0 - HEADER_WIDTH - width // 2, 0) / (HEADER_WIDTH + cols * COL_WIDTH))
+            moved = True
+        if moved:
+            self.render()
+
+    def handle_click(self, event):
+        if self.table is None or self.on_click is None:
+            return
+        x, y = self.canvas.canvasx(event.x), self.canvas.canvasy(event.y)
+        row, col = int(y // ROW_HEIGHT), int((x - HEADER_WIDTH) // COL_WIDTH)
+        if x - self.canvas.canvasx(0) < HEADER_WIDTH:
+            col = 0   # a click on the row header selects the row's first cell
+        if 0 <= row < self.table.shape[0] and 0 <= col < self.table.shape[1]:
+            self.on_click(row, col)
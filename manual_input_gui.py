@@ -13,6 +13,8 @@ import pandas as pd
 import cv2
 from PIL import Image, ImageTk
 
+from cell_store import CellStore
+
 # Validate CLI arguments
 if len(sys.argv) != 4:
     print("Usage: python manual_input_gui.py <month> <type_folder> <table_number>")
@@ -36,21 +38,11 @@ class ManualInputGUI:
         self.data = []
         self.selected_file = None
 
-        self.images = self.collect_images(segment_path)
+        self.cells = CellStore(segment_path)
         self.setup_gui()
         self.load_or_prompt_csv()
         self.load_image()
 
-    def collect_images(self, path):
-        all_imgs = []
-        for row_folder in sorted(os.listdir(path)):
-            row_path = os.path.join(path, row_folder)
-            if os.path.isdir(row_path) and row_folder.startswith("row_"):
-                for col_file in sorted(os.listdir(row_path), key=lambda x: int(x.split('_')[1].split('.')[0])):
-                    if col_file.lower().endswith(('.png', '.jpg', '.jpeg')):
-                        all_imgs.append(os.path.join(row_path, col_file))
-        return all_imgs
-
     def setup_gui(self):
         self.left = tk.Frame(self.root)
         self.left.pack(side="left", padx=10, pady=10)
@@ -79,12 +71,10 @@ class ManualInputGUI:
         if self.row_idx >= self.rows:
             self.finish()
             return
-        img_index = self.row_idx * self.cols + self.col_idx
-        if img_index >= len(self.images):
+        if (self.row_idx, self.col_idx) not in self.cells:
             self.finish()
             return
-        img_path = self.images[img_index]
-        img = cv2.imread(img_path)
+        img = self.cells.get_cell(self.row_idx, self.col_idx)
         if img is None:
             self.img_panel.config(text="(Could not load image)")
             return
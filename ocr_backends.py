@@ -0,0 +1,464 @@
+import hashlib
+import os
+import random
+import threading
+import time
+
+# === SETTINGS ===
+KEY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "key")
+
+# Features a backend can be asked for
+TEXT = "text"          # short text in a small image (one cell)
+DOCUMENT = "document"  # dense text on a full page; results carry word boxes
+
+
+class OCRResult:
+
+    """
+    The outcome of reading one image.
+    `words` holds (text, separator, (x0, y0, x1, y1)) tuples when the backend reports
+    word positions, `raw` the serialized backend response kept in the cache,
+    `confidence` a 0-1 score if the backend has one, `bbox` the (x0, y0, x1, y1) box of
+    the text, `alternates` other plausible readings, `backend` the name of the backend
+    that produced it, and `retryable` marks per-image errors worth sending again.
+    """
+
+    def __init__(self, text="", raw=None, words=None, error=None, retryable=False,
+                 confidence=None, backend=None, bbox=None, alternates=None):
+        self.text = text
+        self.raw = raw
+        self.words = words or []
+        self.error = error
+        self.retryable = retryable
+        self.confidence = confidence
+        self.backend = backend
+        self.bbox = bbox
+        self.alternates = alternates or []
+
+    def meta(self):
+
+        """
+        Returns the per-cell metadata kept alongside the text (cache and sidecar).
+        """
+
+        return {"confidence": self.confidence, "bbox": self.bbox,
+                "alternates": self.alternates, "backend": self.backend}
+
+
+class OCRBackend:
+
+    """
+    Base class for OCR backends. Subclasses implement annotate_batch() and may
+    override the batching and rate-limit hints used by the OCR engine.
+    """
+
+    name = "base"
+    batch_size = 16
+    images_per_second = None  # None = no rate limit
+
+    def settings(self):
+
+        """
+        Returns everything that changes what the backend reads; part of each cache key.
+        """
+
+        return {"backend": self.name}
+
+    def annotate_batch(self, contents, feature=TEXT):
+
+        """
+        Reads a list of encoded images and returns one OCRResult per image, in order.
+        """
+
+        raise NotImplementedError
+
+    def is_retryable(self, exc):
+
+        """
+        Returns True if an exception raised by annotate_batch is transient.
+        """
+
+        return False
+
+    def share_quota(self, fraction):
+
+        """
+        Scales the backend's rate limit down when several processes share one quota.
+        """
+
+        if self.images_per_second:
+            self.images_per_second *= fraction
+
+
+def find_credentials():
+
+    """
+    Points GOOGLE_APPLICATION_CREDENTIALS at the first .json key in the key/ folder
+    unless it is already set.
+    """
+
+    if os.environ.get("GOOGLE_APPLICATION_CREDENTIALS") or not os.path.isdir(KEY_DIR):
+        return
+    for filename in os.listdir(KEY_DIR):
+        if filename.endswith(".json"):
+            os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = os.path.join(KEY_DIR, filename)
+            break
+
+
+class VisionBackend(OCRBackend):
+
+    """
+    Google Cloud Vision. The client (and the gRPC channel behind it) is created on
+    first use, so importing the pipeline needs neither credentials nor network.
+    """
+
+    name = "vision"
+    batch_size = 16                # Vision allows at most 16 images per batch_annotate_images call
+    images_per_second = 25.0       # default project quota is 1800 images/minute
+
+    # google.rpc.Code values reported per image inside a batch response
+    RETRYABLE_CODES = {4, 8, 13, 14}  # DEADLINE_EXCEEDED, RESOURCE_EXHAUSTED, INTERNAL, UNAVAILABLE
+
+    # Break types after which a space or newline separates words
+    SPACE_BREAKS = {1, 2}        # SPACE, SURE_SPACE
+    LINE_BREAKS = {3, 5}         # EOL_SURE_SPACE, LINE_BREAK
+
+    def __init__(self, language_hints=("en",)):
+        self.language_hints = list(language_hints)
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        with self._lock:
+            if self._client is None:
+                from google.cloud import vision
+                find_credentials()
+                self._client = vision.ImageAnnotatorClient()
+        return self._client
+
+    def settings(self):
+        return {"backend": self.name, "language_hints": self.language_hints}
+
+    def is_retryable(self, exc):
+        from google.api_core import exceptions as gexc
+        return isinstance(exc, (
+            gexc.ResourceExhausted,
+            gexc.TooManyRequests,
+            gexc.ServiceUnavailable,
+            gexc.DeadlineExceeded,
+            gexc.InternalServerError,
+        ))
+
+    def annotate_batch(self, contents, feature=TEXT):
+        from google.cloud import vision
+
+        feature_type = (vision.Feature.Type.DOCUMENT_TEXT_DETECTION if feature == DOCUMENT
+                        else vision.Feature.Type.TEXT_DETECTION)
+        requests = [
+            vision.AnnotateImageRequest(
+                image=vision.Image(content=content),
+                features=[vision.Feature(type_=feature_type)],
+                image_context=vision.ImageContext(language_hints=self.language_hints),
+            )
+            for content in contents
+        ]
+        batch = self.client.batch_annotate_images(requests=requests)
+        return [self.to_result(response, feature) for response in batch.responses]
+
+    def to_result(self, response, feature=TEXT):
+
+        """
+        Converts an AnnotateImageResponse into an OCRResult.
+        """
+
+        from google.cloud import vision
+
+        if response.error.message:
+            return OCRResult(error=response.error.message,
+                             retryable=response.error.code in self.RETRYABLE_CODES)
+        texts = response.text_annotations
+        bbox = None
+        if texts:
+            xs = [v.x for v in texts[0].bounding_poly.vertices]
+            ys = [v.y for v in texts[0].bounding_poly.vertices]
+            bbox = (min(xs), min(ys), max(xs), max(ys))
+        return OCRResult(
+            text=texts[0].description.strip() if texts else "",
+            raw=vision.AnnotateImageResponse.serialize(response),
+            words=self.extract_words(response) if feature == DOCUMENT else None,
+            confidence=self.symbol_confidence(response),
+            backend=self.name,
+            bbox=bbox,
+        )
+
+    def symbol_confidence(self, response):
+
+        """
+        Returns the lowest symbol confidence in the response, or None if Vision did not
+        report any (text_detection often leaves them at 0).
+        """
+
+        confidences = [symbol.confidence
+                       for page in response.full_text_annotation.pages
+                       for block in page.blocks
+                       for paragraph in block.paragraphs
+                       for word in paragraph.words
+                       for symbol in word.symbols]
+        confidences = [c for c in confidences if c > 0]
+        return min(confidences) if confidences else None
+
+    def extract_words(self, response):
+
+        """
+        Returns every word of a document_text_detection response as
+        (text, separator, (x0, y0, x1, y1)) tuples, where separator is the whitespace
+        Vision reports after the word.
+        """
+
+        words = []
+        for page in response.full_text_annotation.pages:
+            for block in page.blocks:
+                for paragraph in block.paragraphs:
+                    for word in paragraph.words:
+                        text = "".join(s.text for s in word.symbols)
+                        if not text:
+                            continue
+                        brk = word.symbols[-1].property.detected_break.type_
+                        sep = "\n" if brk in self.LINE_BREAKS else " " if brk in self.SPACE_BREAKS else ""
+                        xs = [v.x for v in word.bounding_box.vertices]
+                        ys = [v.y for v in word.bounding_box.vertices]
+                        words.append((text, sep, (min(xs), min(ys), max(xs), max(ys))))
+        return words
+
+
+class TesseractBackend(OCRBackend):
+
+    """
+    Offline OCR through a local Tesseract install (pytesseract).
+    Restricted to the characters that appear in our tables.
+    """
+
+    name = "tesseract"
+    batch_size = 1
+    CONFIG = "--psm 7 -c tessedit_char_whitelist=0123456789.-"
+
+    def settings(self):
+        return {"backend": self.name, "config": self.CONFIG}
+
+    def annotate_batch(self, contents, feature=TEXT):
+        try:
+            import pytesseract
+        except ImportError:
+            raise ImportError("The tesseract backend needs 'pytesseract' and a Tesseract install.")
+        import cv2
+        import numpy as np
+
+        results = []
+        for content in contents:
+            img = cv2.imdecode(np.frombuffer(content, np.uint8), cv2.IMREAD_GRAYSCALE)
+            if img is None:
+                results.append(OCRResult(error="Could not decode image"))
+                continue
+            if feature == DOCUMENT:
+                results.append(self.read_page(pytesseract, img))
+                continue
+            text = pytesseract.image_to_string(img, config=self.CONFIG).strip()
+            results.append(OCRResult(text=text, raw=text.encode("utf-8"), backend=self.name))
+        return results
+
+    def read_page(self, pytesseract, img):
+
+        """
+        Reads a full page with sparse-text segmentation and returns the word boxes.
+        """
+
+        data = pytesseract.image_to_data(img, config="--psm 11", output_type=pytesseract.Output.DICT)
+        words = []
+        for text, x, y, w, h in zip(data["text"], data["left"], data["top"], data["width"], data["height"]):
+            if text.strip():
+                words.append((text.strip(), " ", (x, y, x + w, y + h)))
+        text = " ".join(w[0] for w in words)
+        return OCRResult(text=text, raw=text.encode("utf-8"), words=words)
+
+
+class DigitBackend(OCRBackend):
+
+    """
+    Offline reader for short handwritten numbers using the model trained by
+    digit_model.py. Every result carries a confidence.
+    """
+
+    name = "digits"
+    batch_size = 64
+
+    def __init__(self, model_path=None):
+        self.model_path = model_path
+        self._model = None
+
+    @property
+    def model(self):
+        if self._model is None:
+            from digit_model import DigitModel, MODEL_PATH
+            self._model = DigitModel.load(self.model_path or MODEL_PATH)
+        return self._model
+
+    def settings(self):
+        return {"backend": self.name, "model": self.model.fingerprint()}
+
+    def annotate_batch(self, contents, feature=TEXT):
+        import cv2
+        import numpy as np
+
+        results = []
+        for content in contents:
+            img = cv2.imdecode(np.frombuffer(content, np.uint8), cv2.IMREAD_GRAYSCALE)
+            if img is None:
+                results.append(OCRResult(error="Could not decode image"))
+                continue
+            text, confidence, alternates, bbox = self.model.read(img, details=True)
+            results.append(OCRResult(text=text, raw=text.encode("utf-8"), confidence=confidence,
+                                     backend=self.name, bbox=bbox, alternates=alternates))
+        return results
+
+
+class CascadeBackend(OCRBackend):
+
+    """
+    Reads every cell with the local digit model first and only sends cells whose
+    confidence is below `threshold` to the remote backend. Page requests go straight
+    to the remote backend. Remote calls are throttled here, so cells answered
+    locally never wait on the remote quota.
+    """
+
+    name = "cascade"
+
+    def __init__(self, threshold=0.9, remote="vision", model_path=None):
+        from ocr_engine import TokenBucket
+
+        self.threshold = threshold
+        self.local = DigitBackend(model_path)
+        self.remote = get_backend(remote) if isinstance(remote, str) else remote
+        self.batch_size = self.remote.batch_size
+        rate = self.remote.images_per_second
+        self.bucket = TokenBucket(rate) if rate else None
+        self.local_count = 0
+        self.remote_count = 0
+        self._lock = threading.Lock()
+
+    def settings(self):
+        return {"backend": self.name, "threshold": self.threshold,
+                "local": self.local.settings(), "remote": self.remote.settings()}
+
+    def is_retryable(self, exc):
+        return self.remote.is_retryable(exc)
+
+    def share_quota(self, fraction):
+        from ocr_engine import TokenBucket
+
+        self.remote.share_quota(fraction)
+        rate = self.remote.images_per_second
+        self.bucket = TokenBucket(rate) if rate else None
+
+    def annotate_remote(self, contents, feature):
+        if self.bucket:
+            self.bucket.acquire(len(contents))
+        results = self.remote.annotate_batch(contents, feature)
+        for result in results:
+            result.backend = result.backend or self.remote.name
+        return results
+
+    def annotate_batch(self, contents, feature=TEXT):
+        if feature != TEXT:
+            return self.annotate_remote(contents, feature)
+
+        results = self.local.annotate_batch(contents)
+        unsure = [i for i, r in enumerate(results)
+                  if r.error or r.confidence is None or r.confidence < self.threshold]
+        if unsure:
+            remote_results = self.annotate_remote([contents[i] for i in unsure], feature)
+            for i, result in zip(unsure, remote_results):
+                # Keep the local reading as an alternate for the reviewer
+                local = results[i]
+                if local.text and local.text != result.text and local.text not in result.alternates:
+                    result.alternates = result.alternates + [local.text]
+                results[i] = result
+
+        with self._lock:
+            self.local_count += len(contents) - len(unsure)
+            self.remote_count += len(unsure)
+        return results
+
+
+class FakeTransientError(Exception):
+
+    """
+    Raised by FakeBackend to simulate a quota or availability error.
+    """
+
+
+class FakeBackend(OCRBackend):
+
+    """
+    Deterministic stand-in for load tests and benchmarks without the cloud.
+    Each image reads as a number derived from a hash of its bytes (or from
+    `responses` if given). `latency` seconds are spent per batch and a seeded
+    share of batches (`error_rate`) fails with a retryable error.
+    """
+
+    name = "fake"
+
+    def __init__(self, latency=0.0, error_rate=0.0, seed=0, responses=None, batch_size=16):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.responses = responses or {}
+        self.batch_size = batch_size
+        self.calls = 0
+        self.images = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def settings(self):
+        return {"backend": self.name}
+
+    def is_retryable(self, exc):
+        return isinstance(exc, FakeTransientError)
+
+    def read(self, content):
+        digest = hashlib.sha256(content).hexdigest()
+        if digest in self.responses:
+            return self.responses[digest]
+        return str(int(digest[:8], 16) % 100)
+
+    def annotate_batch(self, contents, feature=TEXT):
+        with self._lock:
+            self.calls += 1
+            fail = self._random.random() < self.error_rate
+        if self.latency:
+            time.sleep(self.latency)
+        if fail:
+            raise FakeTransientError("Injected transient error")
+        with self._lock:
+            self.images += len(contents)
+        return [OCRResult(text=t, raw=t.encode("utf-8"), confidence=1.0, backend=self.name)
+                for t in map(self.read, contents)]
+
+
+BACKENDS = {
+    VisionBackend.name: VisionBackend,
+    TesseractBackend.name: TesseractBackend,
+    DigitBackend.name: DigitBackend,
+    CascadeBackend.name: CascadeBackend,
+    FakeBackend.name: FakeBackend,
+}
+
+
+def get_backend(name, **options):
+
+    """
+    Creates a backend by name (see BACKENDS).
+    """
+
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown OCR backend '{name}'. Choose from: {', '.join(BACKENDS)}")
+    return BACKENDS[name](**options)
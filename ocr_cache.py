@@ -0,0 +1,154 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# === SETTINGS ===
+CACHE_PATH = os.path.join("output", "ocr_cache.sqlite")
+MAX_CACHE_BYTES = 512 * 1024 * 1024  # evict least recently used entries beyond this
+
+
+def cache_key(content, settings):
+
+    """
+    Returns the content-addressed key for an encoded cell image and the OCR settings
+    (backend, feature, language hints...) it was read with.
+    """
+
+    h = hashlib.sha256()
+    h.update(json.dumps(settings, sort_keys=True).encode("utf-8"))
+    h.update(b"\0")
+    h.update(content)
+    return h.hexdigest()
+
+
+class OCRCache:
+
+    """
+    Persistent SQLite cache of OCR results keyed on a hash of the cell image bytes
+    plus the OCR settings. Stores the extracted text, the raw serialized response and
+    a small JSON blob of per-cell metadata (confidence, box, alternates), counts hits
+    and misses, and evicts least recently used entries once the stored
+    responses exceed `max_bytes`.
+    """
+
+    def __init__(self, path=CACHE_PATH, max_bytes=MAX_CACHE_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self._conn = None
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            # Several batch worker processes may share the cache; wait for their locks
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=60)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " key TEXT PRIMARY KEY, text TEXT NOT NULL, response BLOB,"
+                " size INTEGER NOT NULL, last_used REAL NOT NULL, meta TEXT)"
+            )
+            columns = [row[1] for row in self._conn.execute("PRAGMA table_info(entries)")]
+            if "meta" not in columns:  # caches created before metadata was stored
+                self._conn.execute("ALTER TABLE entries ADD COLUMN meta TEXT")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON entries(last_used)")
+            self._conn.commit()
+        return self._conn
+
+    def get_many(self, keys):
+
+        """
+        Looks up several keys at once. Returns a dict of key -> (text, response bytes,
+        metadata dict) for the keys that were found and updates the hit/miss counters.
+        """
+
+        keys = list(keys)
+        found = {}
+        with self.lock:
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                rows = self.conn.execute(
+                    f"SELECT key, text, response, meta FROM entries WHERE key IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+                found.update((k, (text, response, json.loads(meta) if meta else {}))
+                             for k, text, response, meta in rows)
+            now = time.time()
+            self.conn.executemany("UPDATE entries SET last_used = ? WHERE key = ?",
+                                  [(now, k) for k in found])
+            self.conn.commit()
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def get(self, key):
+        return self.get_many([key]).get(key)
+
+    def put_many(self, entries):
+
+        """
+        Stores (key, text, response bytes, metadata dict) tuples and evicts old entries
+        if needed.
+        """
+
+        now = time.time()
+        rows = []
+        for k, text, response, meta in entries:
+            meta = json.dumps(meta) if meta else None
+            rows.append((k, text, response, len(text) + len(response or b"") + len(meta or ""), now, meta))
+        if not rows:
+            return
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO entries (key, text, response, size, last_used, meta)"
+                " VALUES (?, ?, ?, ?, ?, ?)", rows)
+            self.conn.commit()
+            self._evict()
+
+    def put(self, key, text, response=None, meta=None):
+        self.put_many([(key, text, response, meta)])
+
+    def _evict(self):
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Drop oldest entries until we are back under 90% of the budget
+        excess = total - int(self.max_bytes * 0.9)
+        freed = 0
+        doomed = []
+        for key, size in self.conn.execute("SELECT key, size FROM entries ORDER BY last_used"):
+            doomed.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        self.conn.executemany("DELETE FROM entries WHERE key = ?", doomed)
+        self.conn.commit()
+
+    def stats(self):
+
+        """
+        Returns hit/miss counters for this session and the current size of the cache.
+        """
+
+        with self.lock:
+            entries, size = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+        }
+
+    def clear(self):
+        with self.lock:
+            self.conn.execute("DELETE FROM entries")
+            self.conn.commit()
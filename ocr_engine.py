@@ -0,0 +1,158 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from ocr_backends import TEXT
+
+# === SETTINGS ===
+MAX_WORKERS = 8             # concurrent batch requests in flight
+MAX_RETRIES = 5
+BASE_DELAY = 1.0            # seconds, doubled on every retry
+MAX_DELAY = 32.0
+
+
+class TokenBucket:
+
+    """
+    Thread-safe token bucket. Tokens refill continuously at `rate` per second
+    up to `capacity`; acquire() blocks until enough tokens are available.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(rate, 1.0))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+
+        """
+        Blocks until `tokens` tokens have been taken from the bucket.
+        Requests larger than the capacity are allowed to drain the bucket fully.
+        """
+
+        tokens = min(float(tokens), self.capacity)
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait = (tokens - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class OCREngine:
+
+    """
+    Runs an OCR backend over many images concurrently.
+    Images are grouped into batches of the backend's batch size, sent from a bounded
+    thread pool, throttled by a token bucket (if the backend has a rate limit) and
+    retried with exponential backoff on transient errors. Results always come back
+    in input order.
+    """
+
+    def __init__(self, backend, max_workers=MAX_WORKERS, batch_size=None,
+                 images_per_second=None, max_retries=MAX_RETRIES):
+        self.backend = backend
+        self.max_workers = max_workers
+        self.batch_size = batch_size or backend.batch_size
+        self.max_retries = max_retries
+        rate = images_per_second or backend.images_per_second
+        self.bucket = TokenBucket(rate) if rate else None
+
+    def _backoff(self, attempt):
+        delay = min(MAX_DELAY, BASE_DELAY * (2 ** attempt))
+        time.sleep(delay * (0.5 + random.random() / 2))
+
+    def _annotate_batch(self, contents, feature=TEXT):
+
+        """
+        Sends one batch and returns its results in order. Images that fail with a
+        transient per-image error are resent on their own until they succeed or the
+        retry budget runs out, in which case the last error result is kept.
+        """
+
+        results = [None] * len(contents)
+        pending = list(range(len(contents)))
+        attempt = 0
+
+        while pending:
+            if self.bucket:
+                self.bucket.acquire(len(pending))
+            try:
+                batch = self.backend.annotate_batch([contents[i] for i in pending], feature)
+            except Exception as e:
+                if not self.backend.is_retryable(e) or attempt >= self.max_retries:
+                    raise
+                print(f"⚠️ OCR batch failed ({e.__class__.__name__}), retrying...")
+                self._backoff(attempt)
+                attempt += 1
+                continue
+
+            retry = []
+            for i, result in zip(pending, batch):
+                results[i] = result
+                if result.retryable and attempt < self.max_retries:
+                    retry.append(i)
+
+            pending = retry
+            if pending:
+                self._backoff(attempt)
+                attempt += 1
+
+        return results
+
+    def annotate(self, contents, feature=TEXT, on_batch=None):
+
+        """
+        Reads a list of encoded images (bytes) and returns an OCRResult for each one,
+        in the same order as `contents`. Pass feature=DOCUMENT for dense pages.
+        If given, on_batch(start, results) is called on the calling thread as each batch
+        completes, with the index of the batch's first image in `contents`.
+        """
+
+        contents = list(contents)
+        results = [None] * len(contents)
+        if not contents:
+            return results
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {
+                pool.submit(self._annotate_batch, contents[i:i + self.batch_size], feature): i
+                for i in range(0, len(contents), self.batch_size)
+            }
+            delivered = set()
+            try:
+                for future in as_completed(futures):
+                    start = futures[future]
+                    batch = future.result()
+                    results[start:start + len(batch)] = batch
+                    delivered.add(future)
+                    if on_batch:
+                        on_batch(start, batch)
+            except BaseException:
+                # Don't keep spending quota on a run that is going to fail anyway, but
+                # batches already sent have been paid for: wait for them and hand them
+                # to on_batch so they are cached and journaled before re-raising
+                for future in futures:
+                    future.cancel()
+                for future in futures:
+                    if future in delivered or future.cancelled():
+                        continue
+                    try:
+                        batch = future.result()
+                    except BaseException:
+                        continue
+                    if on_batch:
+                        try:
+                            on_batch(futures[future], batch)
+                        except Exception as e:
+                            print(f"⚠️ Could not keep a finished OCR batch: {e}")
+                raise
+
+        return results
@@ -0,0 +1,171 @@
+import hashlib
+import json
+import os
+import sys
+import threading
+
+from ocr_backends import OCRResult
+from preprocessing import RECORD_NAME
+from segmentation import GRID_FILE
+
+# === SETTINGS ===
+JOURNAL_NAME = "ocr_journal.jsonl"
+
+
+def atomic_write_csv(df, csv_path):
+
+    """
+    Writes a DataFrame as a header-less CSV via a temporary file and a rename, so
+    readers never see a half-written table.
+    """
+
+    tmp_path = csv_path + ".tmp"
+    df.to_csv(tmp_path, index=False, header=False)
+    os.replace(tmp_path, csv_path)
+
+
+def cells_fingerprint(table_path):
+
+    """
+    Returns a hash of what a table's cells are cut from: its saved grid and the
+    preprocessing chain recorded when they were cropped. Re-gridding or re-cropping
+    the table changes it, even if the row and column counts stay the same.
+    """
+
+    digest = hashlib.sha256()
+    for name in (GRID_FILE, RECORD_NAME):
+        path = os.path.join(table_path, name)
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                digest.update(name.encode() + b"\0" + f.read())
+    return digest.hexdigest()
+
+
+class OCRJournal:
+
+    """
+    Append-only journal of the cells of one table that have finished OCR.
+    The first line describes the run (table shape, OCR settings and a fingerprint
+    of the grid and preprocessing the cells were cropped with); every
+    following line is one completed cell. A run that crashes or hits its quota
+    can be restarted and resumes from the journal instead of starting over.
+    """
+
+    def __init__(self, table_path):
+        self.table_path = table_path
+        self.path = os.path.join(table_path, JOURNAL_NAME)
+        self.total = 0
+        self.done = 0
+        self.lock = threading.Lock()
+        self._file = None
+
+    def resume(self, shape, settings):
+
+        """
+        Opens the journal for a run over a table of `shape` (rows, cols) read with
+        `settings`. Returns the cells completed by an earlier, interrupted run of the
+        same table and settings as {(row, col): OCRResult, or None if the cell was
+        skipped as blank}. A journal from a different grid, preprocessing chain or
+        backend is discarded (see cells_fingerprint).
+        """
+
+        rows, cols = shape
+        header = {"shape": [rows, cols], "settings": settings, "cells": cells_fingerprint(self.table_path)}
+        self.total = rows * cols
+        done = {}
+
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                lines = f.readlines()
+            if lines and json.loads(lines[0]) == header:
+                for line in lines[1:]:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        break  # torn write from a crash; everything before it is good
+                    key = (entry["row"], entry["col"])
+                    done[key] = None if entry.get("skipped") else OCRResult(
+                        text=entry["text"], **entry.get("meta", {}))
+
+        # Rewrite the journal so it only holds the header and the cells we keep. The
+        # new journal is written beside the old one and renamed over it, so a crash
+        # here still leaves every completed cell on disk.
+        tmp_path = self.path + ".tmp"
+        self._file = open(tmp_path, "w", encoding="utf-8")
+        self._file.write(json.dumps(header) + "\n")
+        for (r, c), result in done.items():
+            self._write(r, c, result)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        os.replace(tmp_path, self.path)
+        self._file = open(self.path, "a", encoding="utf-8")
+        self.done = len(done)
+        if done:
+            print(f"⏯️ Resuming OCR: {self.done}/{self.total} cells already done")
+        return done
+
+    def _write(self, row, col, result):
+        if result is None:
+            entry = {"row": row, "col": col, "skipped": True}
+        else:
+            entry = {"row": row, "col": col, "text": result.text, "meta": result.meta()}
+        self._file.write(json.dumps(entry) + "\n")
+
+    def record(self, row, col, result):
+
+        """
+        Appends one completed cell (result None = skipped as blank) and flushes it.
+        """
+
+        with self.lock:
+            self._write(row, col, result)
+            self._file.flush()
+            self.done += 1
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def finish(self):
+
+        """
+        Closes and removes the journal once the table's CSV has been written.
+        """
+
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def read_progress(table_path):
+
+    """
+    Returns (done, total) cells of a run in flight (or interrupted) on a table,
+    or None if there is no journal. Safe to call from another process.
+    """
+
+    path = os.path.join(table_path, JOURNAL_NAME)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        header = f.readline()
+        if not header.strip():
+            return None
+        rows, cols = json.loads(header)["shape"]
+        done = sum(1 for line in f if line.endswith("\n"))
+    return done, rows * cols
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python ocr_journal.py <table_folder>")
+        sys.exit(1)
+
+    progress = read_progress(sys.argv[1])
+    if progress is None:
+        print("No OCR run in progress.")
+    else:
+        done, total = progress
+        print(f"{done}/{total} cells done ({done / total:.0%})" if total else "0/0 cells")
@@ -0,0 +1,116 @@
+import json
+import os
+import shutil
+import numpy as np
+
+# === SETTINGS ===
+MAX_ALTERNATES = 3
+ALTERNATE_WIDTH = 12        # characters kept per alternate reading
+LOW_CONFIDENCE = 0.8        # cells below this are sent to the reviewer first
+SKIPPED = "skipped"         # backend name recorded for cells not sent to OCR (blank pre-pass)
+
+
+def metadata_dir(csv_path):
+
+    """
+    Returns the sidecar folder of an OCR CSV: april_max_1.csv -> april_max_1.ocrmeta/
+    """
+
+    return os.path.splitext(csv_path)[0] + ".ocrmeta"
+
+
+def save_metadata(csv_path, cells):
+
+    """
+    Writes per-cell OCR metadata next to a CSV as plain .npy arrays, so they can be
+    memory-mapped by the checker:
+      confidence.npy  float32 (rows, cols), NaN where unknown
+      bbox.npy        int32   (rows, cols, 4) x0, y0, x1, y1 in cell pixels, -1 if none
+      alternates.npy  str     (rows, cols, MAX_ALTERNATES)
+      backend.npy     uint8   (rows, cols), index into backends.json
+    `cells` is a list of rows of OCRResult, with None for cells that were skipped.
+    """
+
+    n_rows = len(cells)
+    n_cols = max((len(row) for row in cells), default=0)
+    confidence = np.full((n_rows, n_cols), np.nan, np.float32)
+    bbox = np.full((n_rows, n_cols, 4), -1, np.int32)
+    alternates = np.full((n_rows, n_cols, MAX_ALTERNATES), "", f"<U{ALTERNATE_WIDTH}")
+    backend = np.zeros((n_rows, n_cols), np.uint8)
+    backends = [SKIPPED]
+
+    for r, row in enumerate(cells):
+        for c, result in enumerate(row):
+            if result is None:
+                continue
+            if result.confidence is not None:
+                confidence[r, c] = result.confidence
+            if result.bbox:
+                bbox[r, c] = result.bbox
+            for k, alt in enumerate(result.alternates[:MAX_ALTERNATES]):
+                alternates[r, c, k] = alt[:ALTERNATE_WIDTH]
+            name = result.backend or "unknown"
+            if name not in backends:
+                backends.append(name)
+            backend[r, c] = backends.index(name)
+
+    folder = metadata_dir(csv_path)
+    if os.path.isdir(folder):
+        shutil.rmtree(folder)
+    os.makedirs(folder)
+    np.save(os.path.join(folder, "confidence.npy"), confidence)
+    np.save(os.path.join(folder, "bbox.npy"), bbox)
+    np.save(os.path.join(folder, "alternates.npy"), alternates)
+    np.save(os.path.join(folder, "backend.npy"), backend)
+    with open(os.path.join(folder, "backends.json"), "w", encoding="utf-8") as f:
+        json.dump(backends, f)
+    return folder
+
+
+def load_metadata(csv_path):
+
+    """
+    Returns the sidecar arrays of a CSV, memory-mapped read-only, as a dict with the
+    keys confidence, bbox, alternates, backend and backends; or None if there is none.
+    """
+
+    folder = metadata_dir(csv_path)
+    if not os.path.isdir(folder):
+        return None
+    meta = {name: np.load(os.path.join(folder, f"{name}.npy"), mmap_mode="r")
+            for name in ("confidence", "bbox", "alternates", "backend")}
+    with open(os.path.join(folder, "backends.json"), encoding="utf-8") as f:
+        meta["backends"] = json.load(f)
+    return meta
+
+
+def low_confidence_cells(meta, threshold=LOW_CONFIDENCE):
+
+    """
+    Returns the (row, col) positions whose confidence is below `threshold`,
+    least confident first.
+    """
+
+    confidence = np.asarray(meta["confidence"])
+    rows, cols = np.nonzero(confidence < threshold)  # NaN compares False, so unknowns are left out
+    order = np.argsort(confidence[rows, cols], kind="stable")
+    return [(int(rows[i]), int(cols[i])) for i in order]
+
+
+def describe_cell(meta, row, col):
+
+    """
+    Returns a short human-readable summary of a cell's OCR metadata for the checker.
+    """
+
+    if meta is None or row >= meta["confidence"].shape[0] or col >= meta["confidence"].shape[1]:
+        return ""
+    backend = meta["backends"][int(meta["backend"][row, col])]
+    conf = float(meta["confidence"][row, col])
+    parts = [f"OCR: {backend}"]
+    if not np.isnan(conf):
+        parts.append(f"confidence {conf:.0%}")
+    alternates = [a for a in meta["alternates"][row, col] if a]
+    if alternates:
+        parts.append("alternates: " + ", ".join(alternates))
+    return " | ".join(parts)
@@ -1,45 +1,219 @@
 import os
 import pandas as pd
-from google.cloud import vision
 
-# Initialize Google Vision client
-client = vision.ImageAnnotatorClient()
+from ocr_backends import OCRBackend, OCRResult, TEXT, get_backend
+from ocr_engine import OCREngine
+from ocr_cache import OCRCache, cache_key
+from blank_detection import blank_reason, decode, decode_color, detect_blank_cells, save_report
+from ocr_metadata import save_metadata
+from ocr_journal import OCRJournal, atomic_write_csv
+from edit_journal import locked
+from cell_store import CellStore
+from cell_encoding import encode_named
 
-def process_image(image_path):
+# Backend used when none is given: "vision", "tesseract" or "fake" (see ocr_backends.py)
+OCR_BACKEND = os.environ.get("OCR_BACKEND", "vision")
+# How cells are encoded for upload: "png" (as cropped), "gray", "ocr", "bilevel" or "webp" (see cell_encoding.py)
+OCR_ENCODING = os.environ.get("OCR_ENCODING", "png")
+
+cache = OCRCache()
+_engines = {}
+
+def get_engine(backend=None):
+
+    """
+    Returns the OCR engine for a backend name (default OCR_BACKEND) or backend instance.
+    Engines are created on first use, so no client is built at import time.
+    """
+
+    if isinstance(backend, OCRBackend):
+        key = id(backend)
+    else:
+        backend = backend or OCR_BACKEND
+        key = backend
+    if key not in _engines:
+        _engines[key] = OCREngine(backend if isinstance(backend, OCRBackend) else get_backend(backend))
+    return _engines[key]
+
+
+def configure_engine(backend=None, quota_share=1.0, **engine_options):
+
+    """
+    (Re)creates the engine for a backend name with custom options, e.g. when several
+    worker processes each get `quota_share` of the backend's rate limit.
+    """
+
+    backend = backend or OCR_BACKEND
+    instance = get_backend(backend)
+    instance.share_quota(quota_share)
+    _engines[backend] = OCREngine(instance, **engine_options)
+    return _engines[backend]
+
+
+def ocr_results(contents, backend=None, on_result=None):
+
+    """
+    Returns an OCRResult for each encoded image in `contents`, in order.
+    Cached results are reused; only cache misses are sent to the OCR engine.
+    If given, on_result(index, result) is called as soon as each result is known.
+    """
+
+    engine = get_engine(backend)
+    settings = dict(engine.backend.settings(), feature=TEXT)
+    keys = [cache_key(c, settings) for c in contents]
+    cached = cache.get_many(set(keys))
+
+    # Identical cells (e.g. several blank ones) only need to be sent once
+    positions = {}
+    missing = {}
+    for i, (key, content) in enumerate(zip(keys, contents)):
+        positions.setdefault(key, []).append(i)
+        if key not in cached and key not in missing:
+            missing[key] = content
+
+    results = {}
+    for key, (text, raw, meta) in cached.items():
+        results[key] = OCRResult(text=text, raw=raw, **meta)
+        if on_result:
+            for i in positions[key]:
+                on_result(i, results[key])
+
+    missing_keys = list(missing)
+
+    def store(start, batch):
+        new_entries = []
+        for key, result in zip(missing_keys[start:start + len(batch)], batch):
+            if result.error:
+                print(f"⚠️ OCR error: {result.error}")
+            else:
+                new_entries.append((key, result.text, result.raw, result.meta()))
+            results[key] = result
+            if on_result:
+                for i in positions[key]:
+                    on_result(i, result)
+        cache.put_many(new_entries)
+
+    engine.annotate(missing.values(), on_batch=store)
+    return [results[k] for k in keys]
+
+
+def ocr_contents(contents, backend=None):
+
+    """
+    Returns the text of each encoded image in `contents`, in order (see ocr_results).
+    """
+
+    return [r.text for r in ocr_results(contents, backend)]
+
+
+def process_image(image_path, backend=None):
     with open(image_path, "rb") as f:
         content = f.read()
 
-    image = vision.Image(content=content)
-    image_context = vision.ImageContext(language_hints=["en"])  #Hint for English
+    if blank_reason(decode(content))[0]:
+        return ""
+    return ocr_contents([content], backend)[0]
+
+
+def run_ocr_on_table(table_path, csv_output_folder, month, data_type, table_number, backend=None):
+
+    """
+    Runs OCR over the cells of a segmented table and saves the CSV. Cells come from
+    the table's CellStore, so they are cut from the page on demand if it has a grid.
+    """
 
-    response = client.text_detection(image=image, image_context=image_context)
-    texts = response.text_annotations
+    store = CellStore(table_path)
+    try:
+        return ocr_table(table_path, store.row_lengths, store.read,
+                         csv_output_folder, month, data_type, table_number, backend)
+    finally:
+        store.close()
 
-    return texts[0].description.strip() if texts else ""
 
+def ocr_table(table_path, row_lengths, read_cell, csv_output_folder, month, data_type, table_number, backend=None):
 
-def run_ocr_on_table(table_path, csv_output_folder, month, data_type, table_number):
-    data = []
+    """
+    OCRs one table whose cells are supplied by read_cell(row, col), which returns
+    (encoded image, decoded image or None). Cells finished by an interrupted earlier
+    run are taken from the journal and never read. Writes the CSV and its metadata
+    sidecar and returns the CSV path.
+    """
 
-    # Process all row folders
-    for row_folder in sorted(os.listdir(table_path), key=lambda x: int(x.split('_')[-1])):
-        row_path = os.path.join(table_path, row_folder)
-        if not os.path.isdir(row_path):
-            continue
+    engine = get_engine(backend)
 
-        row_data = []
-        for col_file in sorted(os.listdir(row_path), key=lambda x: int(x.split('_')[-1].split('.')[0])):
-            col_path = os.path.join(row_path, col_file)
-            if col_file.lower().endswith(".png"):
-                extracted_text = process_image(col_path)
-                row_data.append(extracted_text)
+    # Cells finished by an interrupted earlier run are taken from the journal
+    journal = OCRJournal(table_path)
+    done = journal.resume((len(row_lengths), max(row_lengths, default=0)),
+                          dict(engine.backend.settings(), month=month, encoding=OCR_ENCODING))
 
-        data.append(row_data)
+    # Read the cells that still need work
+    contents = []
+    images = []
+    for r, n_cols in enumerate(row_lengths):
+        row_contents = []
+        row_images = []
+        for c in range(n_cols):
+            content, img = (None, None) if (r, c) in done else read_cell(r, c)
+            row_contents.append(content)
+            row_images.append(img)
+        contents.append(row_contents)
+        images.append(row_images)
+
+    # Blank cells (impossible days, no ink) are emitted as "" without calling the API
+    skip, report = detect_blank_cells(contents, month, images)
+    save_report(report, table_path)
+
+    cells = [[done.get((r, c)) for c in range(n_cols)] for r, n_cols in enumerate(row_lengths)]
+    pending = []
+    for r, row in enumerate(contents):
+        for c, content in enumerate(row):
+            if content is None:
+                continue
+            if skip[r][c]:
+                journal.record(r, c, None)
+            else:
+                pending.append((r, c))
+
+    # Re-encode the cells that are actually uploaded, unless they go as cropped
+    if OCR_ENCODING != "png":
+        for r, c in pending:
+            img = decode_color(contents[r][c]) if images[r][c] is None else images[r][c]
+            contents[r][c] = encode_named(img, OCR_ENCODING)
+
+    # OCR the rest concurrently; every result is journaled as it arrives
+    failed = []
+
+    def on_result(i, result):
+        r, c = pending[i]
+        cells[r][c] = result
+        if result.error:
+            failed.append((r, c))
+        else:
+            journal.record(r, c, result)
+
+    try:
+        ocr_results([contents[r][c] for r, c in pending], backend, on_result=on_result)
+    finally:
+        journal.close()
+
+    data = [["" if r is None else r.text for r in row] for row in cells]
 
     # Save CSV
     os.makedirs(csv_output_folder, exist_ok=True)
     csv_filename = f"{month}_{data_type}_{table_number}.csv"
     csv_path = os.path.join(csv_output_folder, csv_filename)
-    pd.DataFrame(data).to_csv(csv_path, index=False, header=False)
+    # Under the same lock as the checker's edit folds, so they cannot interleave
+    with locked(csv_path):
+        atomic_write_csv(pd.DataFrame(data), csv_path)
+        save_metadata(csv_path, cells)
+
+    if failed:
+        # Keep the journal so the next run only retries the failed cells
+        print(f"⚠️ {len(failed)} cells failed OCR and were left empty; run OCR again to retry them.")
+    else:
+        journal.finish()
 
+    stats = cache.stats()
+    print(f"♻️ OCR cache: {stats['hits']} hits, {stats['misses']} misses ({stats['entries']} entries)")
     print(f"✅ OCR finished and saved: {csv_path}")
+    return csv_path
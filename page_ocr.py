@@ -0,0 +1,187 @@
+import json
+import os
+import sys
+import cv2
+import numpy as np
+import pandas as pd
+
+from segmentation import load_grid, rotate_image
+from ocr_backends import DOCUMENT, OCRResult
+from ocr_processor import get_engine, ocr_results
+from ocr_journal import atomic_write_csv
+from edit_journal import locked
+from ocr_metadata import save_metadata
+from cell_store import CellStore
+
+# === SETTINGS ===
+ASSIGN_FRACTION = 0.75       # share of a word's box that must fall inside one cell
+MAX_UPLOAD_BYTES = 7_000_000 # stay well under the Vision request size limit
+REPORT_NAME = "page_ocr_report.json"
+
+
+def encode_page(img):
+
+    """
+    Encodes the rotated page for upload, falling back to JPEG if PNG is too large.
+    """
+
+    ok, buf = cv2.imencode(".png", img)
+    if ok and len(buf) <= MAX_UPLOAD_BYTES:
+        return buf.tobytes()
+    for quality in (95, 85, 75):
+        ok, buf = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        if len(buf) <= MAX_UPLOAD_BYTES:
+            break
+    return buf.tobytes()
+
+
+def assign_words(words, row_lines, col_lines):
+
+    """
+    Assigns each word to the grid cell its bounding box overlaps most.
+    Returns (cells, ambiguous): cells maps (row, col) to the words inside it and
+    ambiguous is the set of cells touched by words that straddle a boundary.
+    """
+
+    rows = np.asarray(row_lines)
+    cols = np.asarray(col_lines)
+    cells = {}
+    ambiguous = set()
+
+    for text, sep, (x0, y0, x1, y1) in words:
+        # Overlap of the box with every row band and every column band at once
+        oy = np.clip(np.minimum(rows[1:], y1) - np.maximum(rows[:-1], y0), 0, None)
+        ox = np.clip(np.minimum(cols[1:], x1) - np.maximum(cols[:-1], x0), 0, None)
+        if not oy.any() or not ox.any():
+            continue
+        r, c = int(oy.argmax()), int(ox.argmax())
+        fy = oy[r] / max(y1 - y0, 1)
+        fx = ox[c] / max(x1 - x0, 1)
+        if fy >= ASSIGN_FRACTION and fx >= ASSIGN_FRACTION:
+            cells.setdefault((r, c), []).append((x0, y0, text, sep))
+        else:
+            for rr in np.flatnonzero(oy):
+                for cc in np.flatnonzero(ox):
+                    ambiguous.add((int(rr), int(cc)))
+    return cells, ambiguous
+
+
+def join_words(words):
+
+    """
+    Rebuilds the text of a cell from its words in reading order.
+    """
+
+    words = sorted(words, key=lambda w: (w[1], w[0]))
+    return "".join(text + sep for _, _, text, sep in words).strip()
+
+
+def run_page_ocr(table_path, backend=None):
+
+    """
+    OCRs a whole table with a single document_text_detection request on the rotated
+    page and assigns the words to cells using the saved grid. Cells touched by words
+    straddling a grid line fall back to per-cell OCR.
+    Returns (results, stats) where results is the table as rows of OCRResult (page
+    words carry no confidence, so only fallback cells have one).
+    """
+
+    grid = load_grid(table_path)
+    if grid is None:
+        raise FileNotFoundError(f"No saved grid in {table_path}; run segmentation first.")
+    img = cv2.imread(grid["image_path"])
+    if img is None:
+        raise FileNotFoundError(f"Could not load image: {grid['image_path']}")
+
+    rotated = rotate_image(img, grid["rotation_angle"])
+    row_lines, col_lines = grid["row_lines"], grid["col_lines"]
+
+    result = get_engine(backend).annotate([encode_page(rotated)], feature=DOCUMENT)[0]
+    if result.error:
+        raise RuntimeError(f"Page OCR failed: {result.error}")
+
+    cells, ambiguous = assign_words(result.words, row_lines, col_lines)
+
+    n_rows, n_cols = len(row_lines) - 1, len(col_lines) - 1
+    results = [[OCRResult(text=join_words(cells.get((r, c), [])), backend=result.backend)
+                for c in range(n_cols)] for r in range(n_rows)]
+
+    # Per-cell fallback for boundary-straddling words
+    fallback = sorted(ambiguous)
+    if fallback:
+        store = CellStore(table_path)
+        crops = [store.read(r, c)[0] for r, c in fallback]
+        store.close()
+        for (r, c), cell_result in zip(fallback, ocr_results(crops, backend)):
+            results[r][c] = cell_result
+
+    stats = {"requests": 1 + len(fallback), "words": sum(len(w) for w in cells.values()),
+             "fallback_cells": [[r + 1, c + 1] for r, c in fallback]}
+    print(f"📄 Page OCR: {stats['words']} words assigned, {len(fallback)} cells fell back to per-cell OCR")
+    return results, stats
+
+
+def run_page_ocr_on_table(table_path, csv_output_folder, month, data_type, table_number, backend=None):
+
+    """
+    Page-level counterpart of run_ocr_on_table: writes the same CSV layout, atomically,
+    and replaces its metadata sidecar so it never describes an earlier run.
+    """
+
+    results, _ = run_page_ocr(table_path, backend)
+    os.makedirs(csv_output_folder, exist_ok=True)
+    csv_path = os.path.join(csv_output_folder, f"{month}_{data_type}_{table_number}.csv")
+    with locked(csv_path):
+        atomic_write_csv(pd.DataFrame([[r.text for r in row] for row in results]), csv_path)
+        save_metadata(csv_path, results)
+    print(f"✅ Page OCR finished and saved: {csv_path}")
+
+
+def compare_with_cell_ocr(table_path, csv_path, backend=None):
+
+    """
+    Runs page-level OCR and compares it against an existing per-cell OCR CSV.
+    Writes the agreement rate and every disagreeing cell to the table folder so
+    each ledger can be assigned the better mode.
+    """
+
+    results, stats = run_page_ocr(table_path, backend)
+    cell_df = pd.read_csv(csv_path, header=None, dtype=str, keep_default_na=False)
+    page_df = pd.DataFrame([[r.text for r in row] for row in results]).reindex(index=cell_df.index, columns=cell_df.columns).fillna("")
+
+    cell_vals = cell_df.apply(lambda s: s.str.strip())
+    page_vals = page_df.astype(str).apply(lambda s: s.str.strip())
+    differs = cell_vals.values != page_vals.values
+
+    rows, cols = np.nonzero(differs)
+    report = {
+        "table": table_path,
+        "cell_csv": csv_path,
+        "cells": int(differs.size),
+        "agreement": float(1 - differs.mean()) if differs.size else 1.0,
+        "page_requests": stats["requests"],
+        "fallback_cells": stats["fallback_cells"],
+        "differences": [
+            {"row": int(r) + 1, "col": int(c) + 1, "cell": cell_vals.iat[r, c], "page": page_vals.iat[r, c]}
+            for r, c in zip(rows, cols)
+        ],
+    }
+    path = os.path.join(table_path, REPORT_NAME)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=1)
+    print(f"📊 Page vs cell OCR agreement: {report['agreement']:.1%} "
+          f"({len(report['differences'])} differing cells). Report: {path}")
+    return report
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4:
+        print("Usage: python page_ocr.py <month> <type> <table_number>")
+        sys.exit(1)
+
+    from app import get_output_folder, get_csv_output_folder
+
+    month, data_type, table_number = sys.argv[1:]
+    table_path = get_output_folder(month, data_type, table_number)
+    csv_path = os.path.join(get_csv_output_folder(month, data_type), f"{month}_{data_type}_{table_number}.csv")
+    compare_with_cell_ocr(table_path, csv_path)
@@ -0,0 +1,127 @@
+import json
+import os
+import cv2
+import numpy as np
+
+from grid_detection import line_masks
+
+# === SETTINGS ===
+CONFIG_PATH = "preprocessing.json"      # per-ledger filter chains, keyed "<month>_<type>" or "default"
+RECORD_NAME = "preprocess.json"         # the chain a table was cropped with, kept in its folder
+DEFAULT_CHAIN = [{"name": "sharpen"}]
+
+
+def sharpen_image(img):
+
+    """
+    Applies a sharpening kernel to the given image and returns the sharpened image.
+    """
+
+    kernel = np.array([[0, -1, 0],
+                       [-1, 5, -1],
+                       [0, -1, 0]])
+    return cv2.filter2D(img, -1, kernel)
+
+
+def to_gray(img):
+    return img if img.ndim == 2 else cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+
+
+def like(result, img):
+
+    """
+    Returns a grayscale filter result in the same number of channels as its input,
+    so filters can be chained in any order and cells stay BGR for the rest of the pipeline.
+    """
+
+    return cv2.cvtColor(result, cv2.COLOR_GRAY2BGR) if img.ndim == 3 else result
+
+
+def denoise(img, strength=10):
+    return like(cv2.fastNlMeansDenoising(to_gray(img), None, strength, 7, 21), img)
+
+
+def binarize(img, block_size=31, offset=15):
+    return like(cv2.adaptiveThreshold(to_gray(img), 255, cv2.ADAPTIVE_THRESH_MEAN_C,
+                                      cv2.THRESH_BINARY, block_size, offset), img)
+
+
+def remove_lines(img):
+
+    """
+    Paints the long horizontal and vertical ruling lines of a page white, leaving
+    the handwriting (see grid_detection.line_masks).
+    """
+
+    horizontal, vertical = line_masks(img)
+    lines = cv2.dilate(cv2.bitwise_or(horizontal, vertical), np.ones((3, 3), np.uint8))
+    out = img.copy()
+    out[lines > 0] = 255
+    return out
+
+
+def normalize_contrast(img, clip_limit=2.0, tile_size=16):
+    clahe = cv2.createCLAHE(clipLimit=clip_limit, tileGridSize=(tile_size, tile_size))
+    return like(clahe.apply(to_gray(img)), img)
+
+
+FILTERS = {
+    "sharpen": sharpen_image,
+    "denoise": denoise,
+    "binarize": binarize,
+    "remove_lines": remove_lines,
+    "normalize": normalize_contrast,
+}
+
+
+def apply_chain(img, chain):
+
+    """
+    Runs a filter chain over an image. A chain is a list of {"name": filter, ...params}
+    steps, applied in order; an empty chain returns the image unchanged.
+    """
+
+    for step in chain:
+        params = {k: v for k, v in step.items() if k != "name"}
+        if step["name"] not in FILTERS:
+            raise ValueError(f"Unknown filter '{step['name']}'. Choose from: {', '.join(FILTERS)}")
+        img = FILTERS[step["name"]](img, **params)
+    return img
+
+
+def chain_for(month, data_type):
+
+    """
+    Returns the filter chain configured for a ledger in preprocessing.json, falling
+    back to its "default" entry and then to DEFAULT_CHAIN.
+    """
+
+    config = {}
+    if os.path.exists(CONFIG_PATH):
+        with open(CONFIG_PATH, encoding="utf-8") as f:
+            config = json.load(f)
+    return config.get(f"{month}_{data_type}", config.get("default", DEFAULT_CHAIN))
+
+
+def record_chain(table_path, chain):
+
+    """
+    Records the chain a table's cells were produced with, next to its grid.
+    """
+
+    with open(os.path.join(table_path, RECORD_NAME), "w", encoding="utf-8") as f:
+        json.dump({"chain": chain}, f, indent=1)
+
+
+def recorded_chain(table_path):
+
+    """
+    Returns the chain a table was cropped with, or DEFAULT_CHAIN for tables cropped
+    before chains were recorded (they were sharpened).
+    """
+
+    path = os.path.join(table_path, RECORD_NAME)
+    if not os.path.exists(path):
+        return DEFAULT_CHAIN
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)["chain"]
@@ -0,0 +1,258 @@
+import argparse
+import getpass
+import os
+import socket
+import sqlite3
+import threading
+import time
+import numpy as np
+import pandas as pd
+
+from ocr_metadata import LOW_CONFIDENCE, load_metadata
+from validation import OUTLIER_Z, column_stats, invalid_mask, numeric_values, schema_for
+
+# === SETTINGS ===
+OUTPUT_ROOT = "output"
+QUEUE_PATH = os.path.join("output", "review_queue.sqlite")
+LEASE_SECONDS = 600         # a claimed cell goes back to the queue if not resolved within this time
+INVALID_SEVERITY = 10.0     # invalid values come before everything else
+LOW_CONFIDENCE_SEVERITY = 5.0   # plus how far below full confidence the OCR was
+SEVERITY_CHANGE = 0.5       # a resolved cell is reopened if its severity moves by more than this
+
+
+def find_csvs(output_root=OUTPUT_ROOT):
+
+    """
+    Returns (csv_path, month, data_type, table_path) for every OCR CSV under output_root.
+    """
+
+    found = []
+    for month in sorted(os.listdir(output_root)) if os.path.isdir(output_root) else []:
+        for data_type in ("max", "min", "precipitation"):
+            csv_dir = os.path.join(output_root, month, data_type, "csv_output")
+            if not os.path.isdir(csv_dir):
+                continue
+            for name in sorted(os.listdir(csv_dir)):
+                if name.endswith(".csv"):
+                    number = name[:-4].split("_")[-1]
+                    found.append((os.path.join(csv_dir, name), month, data_type,
+                                  os.path.join(output_root, month, data_type, f"table_{number}")))
+    return found
+
+
+def scan_archive(output_root=OUTPUT_ROOT, ignore_nan=False):
+
+    """
+    Reads every OCR CSV once and returns its flagged cells as (csv_path, row, col,
+    month, data_type, table_path, reason, severity, value) rows. Outliers are
+    measured against all tables of the same month and type together (each column
+    pooled over every year), so their severity is the z-score and comparable across
+    the archive. Note that this differs from the checker, which measures outliers
+    within the open table only: the pooled mean and spread are steadier, so the
+    queue and the checker's highlighting can disagree on cells near OUTLIER_Z, and a
+    table whose whole column runs hot or cold is flagged here but not there.
+    """
+
+    ledgers = {}
+    for csv_path, month, data_type, table_path in find_csvs(output_root):
+        df = pd.read_csv(csv_path, header=None, dtype=str)
+        ledgers.setdefault((month, data_type), []).append((csv_path, table_path, df))
+
+    items = []
+    for (month, data_type), tables in ledgers.items():
+        schema = schema_for(data_type)
+        values = [numeric_values(df, schema) for _, _, df in tables]
+        width = max(v.shape[1] for v in values)
+        pooled = np.vstack([np.pad(v, ((0, 0), (0, width - v.shape[1])), constant_values=np.nan) for v in values])
+        count, total, squares = column_stats(pooled)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = total / count
+            std = np.sqrt(np.maximum(squares - count * mean ** 2, 0.0) / (count - 1))
+
+        for (csv_path, table_path, df), v in zip(tables, values):
+            severity = np.zeros(v.shape)
+            reason = np.full(v.shape, "", dtype=object)
+
+            with np.errstate(invalid="ignore", divide="ignore"):
+                z = np.abs(v - mean[:v.shape[1]]) / std[:v.shape[1]]
+            outlier = np.nan_to_num(z) > OUTLIER_Z
+            outlier[:, :1] = False
+            severity[outlier] = z[outlier]
+            reason[outlier] = "outlier"
+
+            meta = load_metadata(csv_path)
+            if meta is not None and meta["confidence"].shape == v.shape:
+                confidence = np.asarray(meta["confidence"])
+                low = confidence < LOW_CONFIDENCE
+                score = LOW_CONFIDENCE_SEVERITY + 1 - np.nan_to_num(confidence)
+                take = low & (score > severity)
+                severity[take] = score[take]
+                reason[take] = "low confidence"
+
+            invalid = invalid_mask(df, schema, ignore_nan, v)
+            severity[invalid] = INVALID_SEVERITY
+            reason[invalid] = "invalid"
+
+            for r, c in zip(*np.nonzero(severity)):
+                value = df.iat[r, c]
+                items.append((csv_path, int(r), int(c), month, data_type, table_path,
+                              reason[r, c], float(severity[r, c]), "" if pd.isna(value) else str(value)))
+    return items
+
+
+def reviewer_name():
+    return f"{getpass.getuser()}@{socket.gethostname()}:{os.getpid()}"
+
+
+class ReviewQueue:
+
+    """
+    Persistent, prioritised queue of every flagged cell in the archive, highest
+    severity first, shared through SQLite by any number of reviewers. claim() hands
+    out a cell atomically under a lease, so two reviewers never get the same cell;
+    cells whose lease expires (a reviewer closed the checker) go back to the queue.
+    Resolved cells stay resolved when the queue is rebuilt, unless they are flagged
+    again with a different value, reason or severity.
+    """
+
+    def __init__(self, path=QUEUE_PATH, reviewer=None):
+        self.path = path
+        self.reviewer = reviewer or reviewer_name()
+        self.lock = threading.Lock()
+        self._conn = None
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            # Transactions are explicit (BEGIN IMMEDIATE), so claims from other
+            # reviewers' processes wait for each other instead of colliding
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=60, isolation_level=None)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS items ("
+                " csv_path TEXT NOT NULL, row INTEGER NOT NULL, col INTEGER NOT NULL,"
+                " month TEXT, data_type TEXT, table_path TEXT, reason TEXT, severity REAL NOT NULL,"
+                " status TEXT NOT NULL DEFAULT 'open', reviewer TEXT, lease_until REAL, value TEXT,"
+                " PRIMARY KEY (csv_path, row, col))"
+            )
+            columns = [row[1] for row in self._conn.execute("PRAGMA table_info(items)")]
+            if "value" not in columns:  # queues created before the flagged value was stored
+                self._conn.execute("ALTER TABLE items ADD COLUMN value TEXT")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_next ON items(status, severity DESC)")
+        return self._conn
+
+    def rebuild(self, output_root=OUTPUT_ROOT, ignore_nan=False):
+
+        """
+        Rescans the archive and replaces the open cells with what is flagged now.
+        Claimed cells stay claimed. A resolved cell that is flagged again stays
+        resolved only if its value and reason are unchanged and its severity moved
+        by at most SEVERITY_CHANGE; otherwise it is reopened. Returns the number of
+        open cells.
+        """
+
+        keys = ("csv_path", "row", "col", "month", "data_type", "table_path", "reason", "severity", "value")
+        items = [dict(zip(keys, item), tolerance=SEVERITY_CHANGE) for item in scan_archive(output_root, ignore_nan)]
+        # Rows stored before values were kept have none to compare
+        reopen = ("items.status = 'done' AND ((items.value IS NOT NULL AND excluded.value IS NOT items.value)"
+                  " OR excluded.reason IS NOT items.reason OR ABS(excluded.severity - items.severity) > :tolerance)")
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                self.conn.execute("DELETE FROM items WHERE status = 'open'")
+                self.conn.executemany(
+                    "INSERT INTO items (csv_path, row, col, month, data_type, table_path, reason, severity, value)"
+                    " VALUES (:csv_path, :row, :col, :month, :data_type, :table_path, :reason, :severity, :value)"
+                    " ON CONFLICT (csv_path, row, col) DO UPDATE SET"
+                    f" status = CASE WHEN {reopen} THEN 'open' ELSE items.status END,"
+                    f" reviewer = CASE WHEN {reopen} THEN NULL ELSE items.reviewer END,"
+                    " reason = excluded.reason, severity = excluded.severity, value = excluded.value", items)
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        return self.stats()["open"]
+
+    def claim(self):
+
+        """
+        Takes the most severe cell nobody is working on and leases it to this
+        reviewer. Returns it as a dict, or None if the queue is drained.
+        """
+
+        now = time.time()
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self.conn.execute(
+                    "SELECT csv_path, row, col, month, data_type, table_path, reason, severity FROM items"
+                    " WHERE status = 'open' OR (status = 'claimed' AND lease_until < ?)"
+                    " ORDER BY severity DESC LIMIT 1", (now,)).fetchone()
+                if row is not None:
+                    self.conn.execute(
+                        "UPDATE items SET status = 'claimed', reviewer = ?, lease_until = ?"
+                        " WHERE csv_path = ? AND row = ? AND col = ?",
+                        (self.reviewer, now + LEASE_SECONDS, row[0], row[1], row[2]))
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        if row is None:
+            return None
+        keys = ("csv_path", "row", "col", "month", "data_type", "table_path", "reason", "severity")
+        return dict(zip(keys, row))
+
+    def peek(self, n):
+
+        """
+        Returns the next n open cells (csv_path, table_path, row, col) without
+        claiming them, e.g. to prefetch their tables and thumbnails.
+        """
+
+        with self.lock:
+            return self.conn.execute(
+                "SELECT csv_path, table_path, row, col FROM items WHERE status = 'open'"
+                " ORDER BY severity DESC LIMIT ?", (n,)).fetchall()
+
+    def finish(self, item, status="done"):
+
+        """
+        Marks a claimed cell resolved ("done"), or with status "open" hands it back.
+        Only this reviewer's claims are changed.
+        """
+
+        with self.lock:
+            self.conn.execute(
+                "UPDATE items SET status = ?, reviewer = CASE WHEN ? = 'open' THEN NULL ELSE reviewer END,"
+                " lease_until = NULL WHERE csv_path = ? AND row = ? AND col = ? AND reviewer = ?",
+                (status, status, item["csv_path"], item["row"], item["col"], self.reviewer))
+
+    def release(self, item):
+        self.finish(item, "open")
+
+    def stats(self):
+
+        """
+        Returns the number of cells per status.
+        """
+
+        with self.lock:
+            counts = dict(self.conn.execute("SELECT status, COUNT(*) FROM items GROUP BY status").fetchall())
+        return {status: counts.get(status, 0) for status in ("open", "claimed", "done")}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or inspect the archive-wide review queue.")
+    parser.add_argument("command", choices=["build", "status", "top"])
+    parser.add_argument("--ignore-nan", action="store_true", help="don't flag 'nan' values as invalid")
+    parser.add_argument("-n", type=int, default=20, help="cells shown by 'top'")
+    args = parser.parse_args()
+
+    queue = ReviewQueue()
+    if args.command == "build":
+        print(f"✅ {queue.rebuild(ignore_nan=args.ignore_nan)} cells waiting for review")
+    elif args.command == "top":
+        for csv_path, _, r, c in queue.peek(args.n):
+            print(f"{os.path.basename(csv_path)} row {r + 1} col {c + 1}")
+    else:
+        print(queue.stats())
@@ -0,0 +1,283 @@
+import argparse
+import json
+import os
+from collections import Counter
+import cv2
+import numpy as np
+import pandas as pd
+
+from app import OUTPUT_ROOT, calendar_order
+from cell_store import CellStore
+from preprocessing import sharpen_image
+from blank_detection import BLANK_DENSITY, BORDER_MARGIN, ink_density, ink_mask, is_impossible_day
+from ocr_backends import DOCUMENT
+from edit_journal import locked
+from ocr_journal import atomic_write_csv
+from ocr_processor import get_engine
+from page_ocr import join_words
+from validation import invalid_mask, is_invalid_value, numeric_values, outlier_mask, schema_for
+
+# === SETTINGS ===
+UPSCALE = 2
+SEPARATOR = 48              # white gap between tiles so words never run across them
+MOSAIC_WIDTH = 2400
+MOSAIC_MAX_HEIGHT = 2400
+ASSIGN_FRACTION = 0.75      # share of a word's box that must fall inside one tile's slot
+MIN_AGREEMENT = 3           # variants that must read the same value before it is accepted
+REPORT_NAME = "second_pass_report.json"
+
+
+# --- Preprocessing variants (cells on disk are already sharpened once) ---
+
+def to_gray(img):
+    return img if img.ndim == 2 else cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+
+def variant_plain(img):
+    return to_gray(img)
+
+def variant_sharpen(img):
+    return to_gray(sharpen_image(img))
+
+def variant_binarized(img):
+    _, binary = cv2.threshold(to_gray(img), 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    return binary
+
+def variant_line_removed(img):
+    gray = to_gray(img)
+    h, w = gray.shape
+    my, mx = int(h * BORDER_MARGIN), int(w * BORDER_MARGIN)
+    out = np.full_like(gray, 255)
+    ink = ink_mask(gray)
+    out[my:my + ink.shape[0], mx:mx + ink.shape[1]][ink] = 0
+    return out
+
+def variant_upscaled(img):
+    return cv2.resize(variant_binarized(img), None, fx=UPSCALE, fy=UPSCALE, interpolation=cv2.INTER_CUBIC)
+
+VARIANTS = {
+    "plain": variant_plain,
+    "sharpen": variant_sharpen,
+    "binarized": variant_binarized,
+    "line_removed": variant_line_removed,
+    "upscaled": variant_upscaled,
+}
+
+
+def find_tables(month=None, data_type=None, table_number=None):
+
+    """
+    Returns (csv_path, table_path, month) for every OCR CSV in the output folder,
+    optionally restricted to one month, type or table number.
+    """
+
+    tables = []
+    for m in calendar_order:
+        if month and m != month:
+            continue
+        for dtype in ["max", "min", "precipitation"]:
+            if data_type and dtype != data_type:
+                continue
+            csv_dir = os.path.join(OUTPUT_ROOT, m, dtype, "csv_output")
+            if not os.path.isdir(csv_dir):
+                continue
+            for name in sorted(os.listdir(csv_dir)):
+                if not name.endswith(".csv"):
+                    continue
+                number = name[:-4].split("_")[-1]
+                if table_number and number != str(table_number):
+                    continue
+                table_path = os.path.join(OUTPUT_ROOT, m, dtype, f"table_{number}")
+                if os.path.isdir(table_path):
+                    tables.append((os.path.join(csv_dir, name), table_path, m))
+    return tables
+
+
+def data_type_of(table_path):
+    return os.path.basename(os.path.dirname(os.path.normpath(table_path)))
+
+
+def flagged_cells(df, store, month, data_type=None):
+
+    """
+    Returns the cells the checker would flag: invalid or outlier values under the
+    data type's schema, plus empty cells that still contain ink. Empty cells with no
+    ink and days that do not exist in the month are left alone.
+    """
+
+    schema = schema_for(data_type)
+    values = numeric_values(df, schema)
+    empty = df.astype(str).apply(lambda s: s.str.strip().str.lower()).isin(["", "nan"]).to_numpy()
+    possible = np.array([not is_impossible_day(month, c + 1) for c in range(df.shape[1])], dtype=bool)
+    invalid = invalid_mask(df, schema, values=values) & ~empty & possible
+    flagged = outlier_mask(values) | invalid
+    for r, c in zip(*np.nonzero(empty & possible)):
+        img = store.get_cell(r, c)
+        if img is not None and ink_density(img) >= BLANK_DENSITY:
+            flagged[r, c] = True
+    return [(int(r), int(c)) for r, c in zip(*np.nonzero(flagged))]
+
+
+def pack_mosaics(tiles):
+
+    """
+    Packs grayscale tiles into as few mosaic images as possible (shelf packing,
+    rows of tiles separated by white gaps). Returns a list of (mosaic, slots) where
+    slots[i] = (tile index, (x0, y0, x1, y1)) is the tile's area including half the
+    surrounding gap.
+    """
+
+    mosaics = []
+    placed = []
+    x = y = SEPARATOR
+    shelf = 0
+    half = SEPARATOR // 2
+
+    def flush():
+        height = y + shelf + SEPARATOR
+        width = max(x1 for _, (_, _, x1, _) in placed) + half
+        mosaic = np.full((height, width), 255, np.uint8)
+        for i, (x0, y0, x1, y1) in placed:
+            tile = tiles[i]
+            mosaic[y0 + half:y0 + half + tile.shape[0], x0 + half:x0 + half + tile.shape[1]] = tile
+        mosaics.append((mosaic, list(placed)))
+
+    for i, tile in enumerate(tiles):
+        h, w = tile.shape
+        if x + w + SEPARATOR > MOSAIC_WIDTH and x > SEPARATOR:
+            x, y, shelf = SEPARATOR, y + shelf + SEPARATOR, 0
+        if y + h + SEPARATOR > MOSAIC_MAX_HEIGHT and placed:
+            flush()
+            placed, x, y, shelf = [], SEPARATOR, SEPARATOR, 0
+        placed.append((i, (x - half, y - half, x + w + half, y + h + half)))
+        x += w + SEPARATOR
+        shelf = max(shelf, h)
+    if placed:
+        flush()
+    return mosaics
+
+
+def read_tiles(words, slots):
+
+    """
+    Assigns the words of one mosaic to its tiles. Returns {tile index: text}.
+    Words that straddle two tiles are dropped.
+    """
+
+    if not slots:
+        return {}
+    ids = np.array([i for i, _ in slots])
+    rects = np.array([r for _, r in slots])
+    found = {}
+    for text, sep, (x0, y0, x1, y1) in words:
+        ox = np.clip(np.minimum(rects[:, 2], x1) - np.maximum(rects[:, 0], x0), 0, None)
+        oy = np.clip(np.minimum(rects[:, 3], y1) - np.maximum(rects[:, 1], y0), 0, None)
+        share = ox * oy / max((x1 - x0) * (y1 - y0), 1)
+        best = int(share.argmax())
+        if share[best] >= ASSIGN_FRACTION:
+            found.setdefault(int(ids[best]), []).append((x0, y0, text, sep))
+    return {i: join_words(w) for i, w in found.items()}
+
+
+def vote(readings, is_first_col, data_type=None):
+
+    """
+    Returns the value most variants agree on, or None if fewer than MIN_AGREEMENT
+    variants agree or the agreed value is still invalid.
+    """
+
+    normalized = [r.replace(" ", "").replace("\n", "") for r in readings if r]
+    if not normalized:
+        return None
+    value, count = Counter(normalized).most_common(1)[0]
+    if count < MIN_AGREEMENT or is_invalid_value(value, is_first_col, schema=schema_for(data_type)):
+        return None
+    return value
+
+
+def run_second_pass(tables, backend=None):
+
+    """
+    Re-OCRs only the flagged cells of the given tables under every preprocessing
+    variant, packed into mosaics so one request covers many cells. A reading replaces
+    the cell value only when enough variants agree. Updates the CSVs in place, each
+    locked (edit_journal.locked) and re-read first so that a value a reviewer changed
+    meanwhile is kept, and writes a report per table.
+    """
+
+    cells = []   # (table index, row, col)
+    tiles = []   # (cell index, variant name, image)
+    frames = []
+    for t, (csv_path, table_path, month) in enumerate(tables):
+        df = pd.read_csv(csv_path, header=None, dtype=str, keep_default_na=False)
+        frames.append(df)
+        store = CellStore(table_path)
+        for r, c in flagged_cells(df, store, month, data_type_of(table_path)):
+            img = store.get_cell(r, c)
+            if img is None:
+                continue
+            cells.append((t, r, c))
+            for name, fn in VARIANTS.items():
+                tiles.append((len(cells) - 1, name, fn(img)))
+        store.close()
+
+    if not tiles:
+        print("✅ No flagged cells to re-OCR.")
+        return []
+
+    # Tiles of the same variant have similar sizes, so pack them next to each other
+    order = sorted(range(len(tiles)), key=lambda i: list(VARIANTS).index(tiles[i][1]))
+    mosaics = pack_mosaics([tiles[i][2] for i in order])
+    encoded = [cv2.imencode(".png", m)[1].tobytes() for m, _ in mosaics]
+    print(f"🔁 Re-OCRing {len(cells)} flagged cells x {len(VARIANTS)} variants in {len(mosaics)} requests")
+
+    readings = [dict() for _ in cells]
+    for (mosaic, slots), result in zip(mosaics, get_engine(backend).annotate(encoded, feature=DOCUMENT)):
+        if result.error:
+            print(f"⚠️ Mosaic OCR failed: {result.error}")
+            continue
+        for slot, text in read_tiles(result.words, slots).items():
+            cell, name, _ = tiles[order[slot]]
+            readings[cell][name] = text
+
+    reports = [[] for _ in tables]
+    for (t, r, c), texts in zip(cells, readings):
+        df = frames[t]
+        accepted = vote(list(texts.values()), c == 0, data_type_of(tables[t][1]))
+        reports[t].append({"row": r + 1, "col": c + 1, "old": df.iat[r, c],
+                           "readings": texts, "accepted": accepted})
+
+    summary = []
+    for (csv_path, table_path, _), report in zip(tables, reports):
+        if not report:
+            continue
+        fixed = 0
+        with locked(csv_path):
+            # A checker may have folded edits into the CSV since it was read above
+            df = pd.read_csv(csv_path, header=None, dtype=str, keep_default_na=False)
+            for e in report:
+                r, c = e["row"] - 1, e["col"] - 1
+                if e["accepted"] is None:
+                    continue
+                if r >= df.shape[0] or c >= df.shape[1] or df.iat[r, c] != e["old"]:
+                    e["accepted"] = None
+                    e["skipped"] = "changed since the second pass read it"
+                    continue
+                df.iat[r, c] = e["accepted"]
+                fixed += 1
+            atomic_write_csv(df, csv_path)
+        with open(os.path.join(table_path, REPORT_NAME), "w", encoding="utf-8") as f:
+            json.dump({"variants": list(VARIANTS), "min_agreement": MIN_AGREEMENT, "cells": report}, f, indent=1)
+        print(f"✅ {os.path.basename(csv_path)}: {fixed}/{len(report)} flagged cells resolved")
+        summary.append((csv_path, fixed, len(report)))
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-OCR flagged cells under several preprocessing variants.")
+    parser.add_argument("--month")
+    parser.add_argument("--type", choices=["max", "min", "precipitation"])
+    parser.add_argument("--table", help="table number")
+    parser.add_argument("--backend")
+    args = parser.parse_args()
+
+    run_second_pass(find_tables(args.month, args.type, args.table), backend=args.backend)
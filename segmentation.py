@@ -1,36 +1,221 @@
 import cv2
 import os
+import json
 import math
 import numpy as np
 
-for filename in os.listdir(os.path.join(os.path.dirname(__file__), "key")):
-    if filename.endswith(".json"):
-        os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = os.path.join(os.path.dirname(__file__), "key", filename)
-        break
+from grid_detection import AUTO_ACCEPT, detect_grid
+from deskew import cached_skew
+from preprocessing import DEFAULT_CHAIN, apply_chain, record_chain, recorded_chain
+from cell_container import container_path, encode_cell, remove_container, write_container
+from grid_check import check_grid, describe, save_report
+
+GRID_FILE = "grid.json"
+WINDOW_SIZE = (1600, 800)   # the grid window; the page is shown downscaled to fit it
+
+def rotation_matrix(shape, angle):
+
+    """
+    Returns the 2x3 affine matrix rotate_image applies to an image of `shape`.
+    """
+
+    center = (shape[1] // 2, shape[0] // 2)
+    return cv2.getRotationMatrix2D(center, angle, 1.0)
+
+def rotate_image(img, angle):
+
+    """
+    Rotates an image about its centre by `angle` degrees, keeping the original size.
+    This is the rotation the grid lines are drawn against.
+    """
+
+    return cv2.warpAffine(img, rotation_matrix(img.shape, angle), (img.shape[1], img.shape[0]))
+
+def save_grid(output_dir, image_path, rotation_angle, row_lines, col_lines):
+
+    """
+    Saves the grid of a table next to its output so it can be reused without redrawing.
+    `row_lines`/`col_lines` are the cell boundaries (including the page edges) in the
+    coordinates of the rotated page.
+    """
+
+    path = os.path.abspath(image_path)
+    rel = os.path.relpath(path)
+    grid = {
+        "image_path": path if rel.startswith("..") else rel,
+        "rotation_angle": rotation_angle,
+        "row_lines": [int(y) for y in row_lines],
+        "col_lines": [int(x) for x in col_lines],
+    }
+    with open(os.path.join(output_dir, GRID_FILE), "w", encoding="utf-8") as f:
+        json.dump(grid, f, indent=1)
+
+def load_grid(output_dir):
+
+    """
+    Returns the saved grid of a table folder, or None if it was never saved.
+    """
+
+    path = os.path.join(output_dir, GRID_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def iter_cells(rotated_img, row_lines, col_lines):
+
+    """
+    Yields (row, col, crop) for every cell of the grid, 0-based, in reading order.
+    Crops are views into the rotated page, not copies.
+    """
+
+    for i in range(len(row_lines) - 1):
+        for j in range(len(col_lines) - 1):
+            yield i, j, rotated_img[row_lines[i]:row_lines[i+1], col_lines[j]:col_lines[j+1]]
+
+def cell_path(output_dir, row, col):
+    return os.path.join(output_dir, f"row_{row+1}", f"col_{col+1}.png")
+
+def crop_cells(rotated_img, row_lines, col_lines, output_dir, tree=False):
+
+    """
+    Packs every cell of the grid into output_dir's cell container, or with tree,
+    writes them as output_dir/row_i/col_j.png instead and removes any container,
+    which readers would otherwise still prefer over the new files.
+    """
+
+    if not tree:
+        cells = ((i, j, encode_cell(crop), crop.shape[:2])
+                 for i, j, crop in iter_cells(rotated_img, row_lines, col_lines))
+        write_container(container_path(output_dir), (len(row_lines) - 1, len(col_lines) - 1), cells)
+    else:
+        for i in range(len(row_lines) - 1):
+            os.makedirs(os.path.join(output_dir, f"row_{i+1}"), exist_ok=True)
+        for i, j, cell_crop in iter_cells(rotated_img, row_lines, col_lines):
+            cv2.imwrite(cell_path(output_dir, i, j), cell_crop)
+        remove_container(output_dir)
+
+    print(f"✅ Saved {len(row_lines)-1} rows and {len(col_lines)-1} columns to {output_dir}")
+
+def load_rotated_page(grid):
+
+    """
+    Returns the page image of a saved grid, rotated the way the grid was drawn,
+    or None if the image is missing.
+    """
+
+    img = cv2.imread(grid["image_path"])
+    if img is None:
+        print(f"❌ Could not load image: {grid['image_path']}")
+        return None
+    return rotate_image(img, grid["rotation_angle"])
+
+def crop_from_grid(output_dir, chain=None):
+
+    """
+    Re-crops a table from its saved grid without any user interaction, preprocessing
+    the page with `chain` (default: the chain the table was cropped with before).
+    Returns False if the table has no saved grid or its page image is missing.
+    """
+
+    grid = load_grid(output_dir)
+    if grid is None:
+        return False
+    rotated_img = load_rotated_page(grid)
+    if rotated_img is None:
+        return False
+    chain = recorded_chain(output_dir) if chain is None else chain
+    crop_cells(apply_chain(rotated_img, chain), grid["row_lines"], grid["col_lines"], output_dir)
+    record_chain(output_dir, chain)
+    return True
+
+def finish_grid(img, image_path, output_dir, rotation_angle, row_lines, col_lines, chain=DEFAULT_CHAIN):
+
+    """
+    Adds the page edges to the interior lines, saves the grid, runs the preprocessing
+    chain once over the whole rotated page and crops the cells from the result. The
+    grid is then checked for lines cutting through handwriting (see grid_check.py)
+    and the report saved next to it. Returns the report.
+    """
+
+    row_lines = sorted(set(row_lines))
+    col_lines = sorted(set(col_lines))
+    row_lines.insert(0, 0)
+    row_lines.append(img.shape[0])
+    col_lines.insert(0, 0)
+    col_lines.append(img.shape[1])
+
+    rotated_img = rotate_image(img, rotation_angle)
+    save_grid(output_dir, image_path, rotation_angle, row_lines, col_lines)
+    crop_cells(apply_chain(rotated_img, chain), row_lines, col_lines, output_dir)
+    record_chain(output_dir, chain)
+
+    report = check_grid(rotated_img, row_lines, col_lines)
+    save_report(output_dir, report)
+    if not report["ok"]:
+        print("⚠️ Some grid lines seem to cut through handwriting:")
+        for line in describe(report):
+            print(line)
+    return report
+
+def start_segmentation(image_path, output_dir, chain=DEFAULT_CHAIN, auto_grid=True,
+                       headless=False, min_confidence=AUTO_ACCEPT, proposal=None):
+
+    """
+    Lets the user draw the grid of a page and crops its cells from the page after
+    the preprocessing `chain` (see preprocessing.py) has run over it. The grid
+    starts from `proposal` if given (a dict with rotation_angle, interior
+    row_lines/col_lines and a confidence, e.g. a transferred template), otherwise,
+    with auto_grid, from the ruling lines detected on the automatically deskewed
+    page; the user only corrects it. With headless, no window is opened: the
+    proposed grid is saved if its confidence reaches min_confidence.
+    Returns True if a grid was saved.
+    """
 
-def start_segmentation(image_path, output_dir):
     img = cv2.imread(image_path)
     if img is None:
         print(f"❌ Could not load image: {image_path}")
-        return
+        return False
 
-    img_original = img.copy()
-    img_copy = img.copy()
+    img_copy = None
     row_lines = []
     col_lines = []
     drawing_mode = ["row"]  # Can be "row", "col", or "rotate"
     rotation_angle = [0.0]  # float for precise angle control
 
+    if proposal is None and (auto_grid or headless):
+        angle = cached_skew(image_path, img)
+        proposal = dict(detect_grid(rotate_image(img, angle)), rotation_angle=angle)
+    if proposal is not None:
+        row_lines, col_lines = list(proposal["row_lines"]), list(proposal["col_lines"])
+        rotation_angle[0] = proposal["rotation_angle"]
+        print(f"🔎 Proposed {len(row_lines)} row and {len(col_lines)} column lines "
+              f"(confidence {proposal['confidence']:.2f})")
+        if headless:
+            if proposal["confidence"] < min_confidence:
+                return False
+            finish_grid(img, image_path, output_dir, rotation_angle[0], row_lines, col_lines, chain)
+            return True
+
+    # The window shows a downscaled copy of the page, rotated once per angle; a click
+    # only redraws the line overlay on a copy of it. Lines are kept in full-resolution
+    # coordinates and scaled for display.
+    scale = min(1.0, WINDOW_SIZE[0] / img.shape[1], WINDOW_SIZE[1] / img.shape[0])
+    preview = cv2.resize(img, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    rotated_previews = {}
+
     def redraw_lines():
         nonlocal img_copy
-        center = (img.shape[1] // 2, img.shape[0] // 2)
-        rot_matrix = cv2.getRotationMatrix2D(center, rotation_angle[0], 1.0)
-        rotated = cv2.warpAffine(img, rot_matrix, (img.shape[1], img.shape[0]))
-        img_copy = rotated.copy()
+        angle = rotation_angle[0]
+        if angle not in rotated_previews:
+            rotated_previews[angle] = rotate_image(preview, angle)
+        img_copy = rotated_previews[angle].copy()
         for y in row_lines:
-            cv2.line(img_copy, (0, y), (img.shape[1], y), (0, 255, 0), 2)
+            y = int(round(y * scale))
+            cv2.line(img_copy, (0, y), (img_copy.shape[1], y), (0, 255, 0), 1)
         for x in col_lines:
-            cv2.line(img_copy, (x, 0), (x, img.shape[0]), (255, 0, 0), 2)
+            x = int(round(x * scale))
+            cv2.line(img_copy, (x, 0), (x, img_copy.shape[0]), (255, 0, 0), 1)
         if drawing_mode[0] == "rotate":
             cv2.putText(img_copy, f"Rotation: {rotation_angle[0]:.2f}", (10, 30),
                         cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 255), 2)
@@ -40,9 +225,9 @@ def start_segmentation(image_path, output_dir):
         if drawing_mode[0] in ["row", "col"]:
             if event == cv2.EVENT_LBUTTONDOWN:
                 if drawing_mode[0] == "row":
-                    row_lines.append(y)
+                    row_lines.append(min(int(round(y / scale)), img.shape[0] - 1))
                 elif drawing_mode[0] == "col":
-                    col_lines.append(x)
+                    col_lines.append(min(int(round(x / scale)), img.shape[1] - 1))
                 redraw_lines()
                 cv2.imshow("Draw Grid", img_copy)
             elif event == cv2.EVENT_RBUTTONDOWN:
@@ -75,7 +260,7 @@ def start_segmentation(image_path, output_dir):
                 cv2.imshow("Draw Grid", img_copy)
 
     cv2.namedWindow("Draw Grid", cv2.WINDOW_NORMAL)
-    cv2.resizeWindow("Draw Grid", 1600, 800)
+    cv2.resizeWindow("Draw Grid", preview.shape[1], preview.shape[0])
     cv2.setMouseCallback("Draw Grid", draw_line)
 
     print("📏 Draw ROW lines (left click to add, right click to undo). Press 'r' to rotate. Press any key to continue to columns.")
@@ -88,7 +273,7 @@ def start_segmentation(image_path, output_dir):
         if key == 27:
             cv2.destroyAllWindows()
             print("🛑 Segmentation canceled.")
-            return
+            return False
         elif key == ord('r'):
             drawing_mode[0] = "rotate"
             redraw_lines()
@@ -110,7 +295,7 @@ def start_segmentation(image_path, output_dir):
         if key == 27:
             cv2.destroyAllWindows()
             print("🛑 Segmentation canceled.")
-            return
+            return False
         elif key == ord('r'):
             drawing_mode[0] = "rotate"
             redraw_lines()
@@ -124,23 +309,5 @@ def start_segmentation(image_path, output_dir):
 
     cv2.destroyAllWindows()
 
-    row_lines = sorted(set(row_lines))
-    col_lines = sorted(set(col_lines))
-    row_lines.insert(0, 0)
-    row_lines.append(img.shape[0])
-    col_lines.insert(0, 0)
-    col_lines.append(img.shape[1])
-
-    center = (img.shape[1] // 2, img.shape[0] // 2)
-    rot_matrix = cv2.getRotationMatrix2D(center, rotation_angle[0], 1.0)
-    rotated_img = cv2.warpAffine(img, rot_matrix, (img.shape[1], img.shape[0]))
-
-    for i in range(len(row_lines) - 1):
-        row_folder = os.path.join(output_dir, f"row_{i+1}")
-        os.makedirs(row_folder, exist_ok=True)
-        for j in range(len(col_lines) - 1):
-            cell_crop = rotated_img[row_lines[i]:row_lines[i+1], col_lines[j]:col_lines[j+1]]
-            cell_path = os.path.join(row_folder, f"col_{j+1}.png")
-            cv2.imwrite(cell_path, cell_crop)
-
-    print(f"✅ Saved {len(row_lines)-1} rows and {len(col_lines)-1} columns to {output_dir}")
+    finish_grid(img, image_path, output_dir, rotation_angle[0], row_lines, col_lines, chain)
+    return True
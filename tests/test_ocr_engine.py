@@ -0,0 +1,61 @@
+import os
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ocr_backends import OCRBackend, OCRResult
+from ocr_engine import OCREngine
+
+
+class FailingBackend(OCRBackend):
+
+    """
+    Reads every image as its own bytes. The batch holding b"fail" raises as soon as
+    the other `in_flight` batches have been sent, while they are still running.
+    """
+
+    name = "failing"
+    batch_size = 2
+
+    def __init__(self, in_flight):
+        self.sent = []
+        self.lock = threading.Lock()
+        self.started = threading.Semaphore(0)
+        self.in_flight = in_flight
+
+    def annotate_batch(self, contents, feature=None):
+        if b"fail" in contents:
+            for _ in range(self.in_flight):
+                self.started.acquire()
+            raise ValueError("batch failed")
+        self.started.release()
+        time.sleep(0.2)
+        with self.lock:
+            self.sent.extend(contents)
+        return [OCRResult(text=c.decode()) for c in contents]
+
+
+class AnnotateFailureTest(unittest.TestCase):
+
+    def test_finished_batches_reach_on_batch_when_one_fails(self):
+        contents = [f"cell{i}".encode() for i in range(8)]
+        contents[4] = b"fail"
+        backend = FailingBackend(in_flight=3)
+        delivered = {}
+
+        def on_batch(start, results):
+            delivered[start] = [r.text for r in results]
+
+        engine = OCREngine(backend, max_workers=4)
+        with self.assertRaises(ValueError):
+            engine.annotate(contents, on_batch=on_batch)
+
+        self.assertEqual(sorted(delivered), [0, 2, 6])
+        self.assertEqual(sorted(t.encode() for texts in delivered.values() for t in texts), sorted(backend.sent))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+import threading
+import time
+from collections import OrderedDict
+import cv2
+
+# === SETTINGS ===
+THUMB_SIZE = (300, 300)     # the checker's image panel
+CACHE_SIZE = 512            # thumbnails kept (about 270 KB each)
+PREFETCH = 8                # upcoming cells prefetched after every move
+
+
+class ThumbnailCache:
+
+    """
+    A size-bounded LRU cache of cell thumbnails (RGB arrays, resized for the image
+    panel), filled ahead of the reviewer by a background thread. Keys are
+    (table_path, row, col) and `loader(key)` returns the cell image (BGR) or None.
+    Only decoded arrays are cached: Tk images must still be made on the Tk thread,
+    which is cheap.
+    """
+
+    def __init__(self, loader, capacity=CACHE_SIZE, size=THUMB_SIZE):
+        self.loader = loader
+        self.capacity = capacity
+        self.size = size
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+        self.pending = []
+        self.wakeup = threading.Condition(self.lock)
+        self.worker = None
+        self.hits = self.misses = self.prefetched = 0
+        self.decode_seconds = 0.0
+        self.decodes = 0
+
+    def load(self, key):
+
+        """
+        Loads, converts and resizes one cell, timing it. Returns None if the cell
+        has no image.
+        """
+
+        start = time.perf_counter()
+        img = self.loader(key)
+        if img is not None:
+            img = cv2.resize(cv2.cvtColor(img, cv2.COLOR_BGR2RGB), self.size, interpolation=cv2.INTER_AREA)
+        with self.lock:
+            self.decode_seconds += time.perf_counter() - start
+            self.decodes += 1
+        return img
+
+    def put(self, key, thumb):
+        with self.lock:
+            self.items[key] = thumb
+            self.items.move_to_end(key)
+            while len(self.items) > self.capacity:
+                self.items.popitem(last=False)
+
+    def get(self, key):
+
+        """
+        Returns the thumbnail of a cell, loading it now on a cache miss.
+        """
+
+        with self.lock:
+            if key in self.items:
+                self.hits += 1
+                self.items.move_to_end(key)
+                return self.items[key]
+            self.misses += 1
+        thumb = self.load(key)
+        if thumb is not None:
+            self.put(key, thumb)
+        return thumb
+
+    def prefetch(self, keys):
+
+        """
+        Queues cells for loading in the background, most urgent first. Replaces what
+        was still queued, since the reviewer has moved on.
+        """
+
+        with self.lock:
+            self.pending = [k for k in keys if k not in self.items]
+            if self.worker is None:
+                self.worker = threading.Thread(target=self.run, daemon=True)
+                self.worker.start()
+            self.wakeup.notify()
+
+    def run(self):
+        while True:
+            with self.lock:
+                while not self.pending:
+                    self.wakeup.wait()
+                key = self.pending.pop(0)
+                if key in self.items:
+                    continue
+            try:
+                thumb = self.load(key)
+            except Exception as e:
+                print(f"⚠️ Thumbnail prefetch failed for {key}: {e}")
+                continue
+            if thumb is not None:
+                self.put(key, thumb)
+                with self.lock:
+                    self.prefetched += 1
+
+    def stats(self):
+
+        """
+        Returns hit rate and decode latency, for sizing the cache.
+        """
+
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self.items),
+                "capacity": self.capacity,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "prefetched": self.prefetched,
+                "mean_decode_ms": 1000 * self.decode_seconds / self.decodes if self.decodes else 0.0,
+            }
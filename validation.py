@@ -0,0 +1,252 @@
+from bisect import bisect_left, insort
+import numpy as np
+import pandas as pd
+
+# === SETTINGS ===
+YEAR_RANGE = (1850, 2025)   # valid years in the first column
+VALUE_RANGE = (-50, 99)     # valid temperature readings in every other column
+PRECIPITATION_RANGE = (0, 10)   # valid precipitation in inches, after precipitation_inches
+OUTLIER_Z = 2               # cells further than this many standard deviations from their column mean
+
+
+def precipitation_inches(text):
+
+    """
+    Converts precipitation readings (a Series of strings) to inches. The ledgers,
+    and so the OCR CSVs, write inches with a leading point (".02", "1.25"); when the
+    point is lost ("02", "2") or the value was saved as whole hundredths by pandas
+    ("2.0", as in collected_csvs) the number is in hundredths. "T" (trace) is 0.
+    Returns floats, NaN where a cell is not a reading.
+    """
+
+    text = text.astype(str).str.strip()
+    number = pd.to_numeric(text, errors="coerce")
+    hundredths = ~text.str.contains(".", regex=False) | text.str.endswith(".0")
+    return number.where(~hundredths, number / 100).mask(text.str.upper() == "T", 0.0)
+
+
+# Validation rules per data type: the year range of the first column, the range of
+# the readings in the other columns in `unit`, and optionally how the text of a
+# reading is turned into that unit (default: read as a plain number)
+SCHEMAS = {
+    "max": {"years": YEAR_RANGE, "values": VALUE_RANGE, "unit": "°F"},
+    "min": {"years": YEAR_RANGE, "values": VALUE_RANGE, "unit": "°F"},
+    "precipitation": {"years": YEAR_RANGE, "values": PRECIPITATION_RANGE, "unit": "in",
+                      "reading": precipitation_inches},
+}
+DEFAULT_SCHEMA = {"years": YEAR_RANGE, "values": VALUE_RANGE}
+
+
+def schema_for(data_type):
+    return SCHEMAS.get(data_type, DEFAULT_SCHEMA)
+
+
+def reading_value(value, schema=DEFAULT_SCHEMA):
+
+    """
+    Returns one reading in the schema's unit, or NaN if it is not a number.
+    """
+
+    series = pd.Series([value])
+    reading = schema.get("reading")
+    return float((pd.to_numeric(series, errors="coerce") if reading is None else reading(series)).iat[0])
+
+
+def is_invalid_value(value, is_first_col, ignore_nan=False, schema=DEFAULT_SCHEMA):
+
+    """
+    Determines whether a CSV value is invalid: empty, 'x', not a number, or outside
+    the year range (first column) or the reading range (other columns) of the schema.
+    Readings are converted to the schema's unit first (see reading_value).
+    """
+
+    value = str(value).strip()
+    if value.lower() == "x" or value == "":
+        return True
+    if value.lower() == "nan" and ignore_nan:
+        return False
+    try:
+        if is_first_col:
+            num = int(value)
+            low, high = schema["years"]
+        else:
+            num = reading_value(value, schema)
+            low, high = schema["values"]
+        return not (low <= num <= high)
+    except ValueError:
+        return True
+
+
+def numeric_values(df, schema=DEFAULT_SCHEMA):
+
+    """
+    Returns the table as a float array, NaN wherever a cell is not a number. The
+    readings (every column but the first) are in the schema's unit.
+    """
+
+    values = df.apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float)
+    reading = schema.get("reading")
+    if reading is not None and df.shape[1] > 1:
+        values[:, 1:] = df.iloc[:, 1:].apply(reading).to_numpy(dtype=float)
+    return values
+
+
+def invalid_mask(df, schema=DEFAULT_SCHEMA, ignore_nan=False, values=None):
+
+    """
+    is_invalid_value for a whole table at once. Returns a boolean array.
+    """
+
+    text = df.astype(str).apply(lambda s: s.str.strip())
+    lower = text.apply(lambda s: s.str.lower()).to_numpy(dtype=str)
+    values = numeric_values(df, schema) if values is None else values
+
+    low, high = schema["values"]
+    valid = (values >= low) & (values <= high)
+    if df.shape[1]:
+        # Years must be plain integers, as int() would have them
+        low, high = schema["years"]
+        is_int = text.iloc[:, 0].str.fullmatch(r"[+-]?\d+").to_numpy(dtype=bool)
+        valid[:, 0] = is_int & (values[:, 0] >= low) & (values[:, 0] <= high)
+    if ignore_nan:
+        valid |= lower == "nan"
+    return ~valid | (lower == "") | (lower == "x")
+
+
+def column_stats(values):
+
+    """
+    Returns per-column (count, sum, sum of squares) of the numeric cells, the running
+    totals outliers are measured against.
+    """
+
+    present = ~np.isnan(values)
+    filled = np.where(present, values, 0.0)
+    return present.sum(axis=0), filled.sum(axis=0), (filled ** 2).sum(axis=0)
+
+
+def outlier_columns(values, count, total, squares):
+
+    """
+    Flags cells more than OUTLIER_Z sample standard deviations from their column mean,
+    for the columns in `values` and their stats. Columns with fewer than two numbers
+    have no outliers.
+    """
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = total / count
+        std = np.sqrt(np.maximum(squares - count * mean ** 2, 0.0) / (count - 1))
+        return (count > 1) & (np.abs(values - mean) > OUTLIER_Z * std)
+
+
+def outlier_mask(values):
+
+    """
+    Outlier flags for a whole table (see outlier_columns). The first (year) column
+    is not checked.
+    """
+
+    mask = outlier_columns(values, *column_stats(values))
+    mask[:, :1] = False
+    return mask
+
+
+def find_outlier_positions(df):
+
+    """
+    Returns the (row, col) positions of numeric cells more than OUTLIER_Z standard
+    deviations from their column mean. The first (year) column is not checked.
+    """
+
+    return {(int(r), int(c)) for r, c in zip(*np.nonzero(outlier_mask(numeric_values(df))))}
+
+
+def next_position(positions, after):
+
+    """
+    Returns the first (row, col) in a sorted list at or after `after`, or None.
+    """
+
+    i = bisect_left(positions, after)
+    return positions[i] if i < len(positions) else None
+
+
+class ValidationEngine:
+
+    """
+    Invalid and outlier flags for one table, computed in a single NumPy pass and then
+    kept up to date edit by edit: update() re-checks the edited cell and recomputes
+    only its column's statistics and outliers. The flagged cells are also kept as
+    sorted (row, col) lists, so finding the next one is a binary search.
+    """
+
+    def __init__(self, df, data_type=None, ignore_nan=False):
+        self.df = df
+        self.schema = schema_for(data_type)
+        self.ignore_nan = ignore_nan
+        self.refresh()
+
+    def refresh(self):
+
+        """
+        Recomputes every flag from the table, e.g. after edits made outside update().
+        """
+
+        self.values = numeric_values(self.df, self.schema)
+        self.count, self.total, self.squares = column_stats(self.values)
+        self.invalid = invalid_mask(self.df, self.schema, self.ignore_nan, self.values)
+        self.outliers = outlier_mask(self.values)
+        self.invalid_index = self.positions(self.invalid)
+        self.outlier_index = self.positions(self.outliers)
+
+    @staticmethod
+    def positions(mask):
+        return [(int(r), int(c)) for r, c in zip(*np.nonzero(mask))]
+
+    def set_ignore_nan(self, ignore_nan):
+        if ignore_nan != self.ignore_nan:
+            self.ignore_nan = ignore_nan
+            self.invalid = invalid_mask(self.df, self.schema, ignore_nan, self.values)
+            self.invalid_index = self.positions(self.invalid)
+
+    def update(self, row, col, value):
+
+        """
+        Writes a value into the table and updates the flags it affects.
+        """
+
+        self.df.iat[row, col] = value
+        cell = (row, col)
+
+        invalid = is_invalid_value(value, col == 0, self.ignore_nan, self.schema)
+        if invalid != self.invalid[row, col]:
+            self.invalid[row, col] = invalid
+            if invalid:
+                insort(self.invalid_index, cell)
+            else:
+                self.invalid_index.remove(cell)
+
+        old = self.values[row, col]
+        new = reading_value(value, self.schema if col else DEFAULT_SCHEMA)
+        self.values[row, col] = new
+        if col == 0 or (np.isnan(old) and np.isnan(new)) or old == new:
+            return
+        for x, sign in ((old, -1), (new, 1)):
+            if not np.isnan(x):
+                self.count[col] += sign
+                self.total[col] += sign * x
+                self.squares[col] += sign * x * x
+
+        column = outlier_columns(self.values[:, col], self.count[col], self.total[col], self.squares[col])
+        for r in np.flatnonzero(column != self.outliers[:, col]):
+            if column[r]:
+                insort(self.outlier_index, (int(r), col))
+            else:
+                self.outlier_index.remove((int(r), col))
+        self.outliers[:, col] = column
+
+    def next_invalid(self, after=(0, 0)):
+        return next_position(self.invalid_index, after)
+
+    def next_outlier(self, after=(0, 0)):
+        return next_position(self.outlier_index, after)